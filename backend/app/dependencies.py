@@ -1,20 +1,73 @@
 from fastapi import Request, Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from collections import OrderedDict
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from postgrest import AsyncPostgrestClient
+from supabase_auth import AsyncGoTrueClient
+from supabase_auth.types import User
+import hashlib
+import httpx
+import jwt
+import os
+import threading
+
+from app.utils.blocking import run_blocking
 import time
 import logging
 
+load_dotenv()
+
 security = HTTPBearer(auto_error=True)
 logger = logging.getLogger("app.dependencies")
 
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+POSTGREST_MAX_CONNECTIONS = int(os.getenv("POSTGREST_MAX_CONNECTIONS", "100"))
+POSTGREST_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("POSTGREST_MAX_KEEPALIVE_CONNECTIONS", "20"))
+POSTGREST_TIMEOUT_SECONDS = float(os.getenv("POSTGREST_TIMEOUT_SECONDS", "30"))
+ASYMMETRIC_JWT_ALGORITHMS = ("RS256", "ES256")
+
 
 def get_supabase(request: Request):
     return request.app.state.supabase
 
 
+def get_auth_client(request: Request) -> AsyncGoTrueClient:
+    """Return an auth client private to this request.
+
+    Calls that act on a caller's session (``set_session``, ``update_user``,
+    ``sign_out``, sign-in flows) must not run on the shared ``app.state.supabase``:
+    its session is process-wide, so another request could replace it between two
+    awaits. This client holds no session beyond the request and shares only the
+    connection pool.
+    """
+    base_supabase = request.app.state.supabase
+    transport = getattr(request.app.state, "postgrest_transport", None)
+    if not base_supabase or transport is None:
+        raise HTTPException(status_code=500, detail="Supabase client not configured")
+
+    return AsyncGoTrueClient(
+        url=str(base_supabase.auth_url),
+        headers=dict(base_supabase.options.headers),
+        auto_refresh_token=False,
+        persist_session=False,
+        http_client=httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(POSTGREST_TIMEOUT_SECONDS),
+            follow_redirects=True,
+            trust_env=False,
+        ),
+    )
+
+
 def get_user_token(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> str:
+) -> dict:
     access_token = credentials.credentials if credentials else None
     refresh_token = request.headers.get("x-refresh-token") or request.cookies.get("refresh_token")
 
@@ -24,104 +77,229 @@ def get_user_token(
     return {"access_token": access_token, "refresh_token": refresh_token}
 
 
-def get_supabase_for_user(request: Request, token: str = Depends(get_user_token)):
-    """Return a postgrest client bound to the provided token (useful for postgrest calls).
+class VerifiedUserCache:
+    """Bounded LRU cache of verified users keyed by the SHA-256 of the access token.
 
-    Falls back to returning the base client if binding fails.
+    Entries expire at the earlier of the token's ``exp`` claim and the cache TTL,
+    so a revoked-but-unexpired token is re-checked at least every TTL seconds.
     """
-    base_supabase = request.app.state.supabase
-    if not base_supabase:
-        raise HTTPException(status_code=500, detail="Supabase client not configured")
 
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[User, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> User | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, key: str, user: User, token_exp: float | None) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        with self._lock:
+            self._entries[key] = (user, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+verified_user_cache = VerifiedUserCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
+_jwks_client: jwt.PyJWKClient | None = None
+
+
+def _get_jwks_client() -> jwt.PyJWKClient | None:
+    global _jwks_client
+    if _jwks_client is None and SUPABASE_URL:
+        _jwks_client = jwt.PyJWKClient(
+            f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json",
+            cache_keys=True,
+            lifespan=600,
+        )
+    return _jwks_client
+
+
+async def _decode_access_token(token: str) -> dict | None:
+    """Verify signature, expiry and audience locally.
+
+    Returns the claims, or ``None`` when no verification key is configured for the
+    token's algorithm (HS256 without ``SUPABASE_JWT_SECRET``).
+    """
     try:
-        return base_supabase.postgrest.auth(token)
-    except Exception:
-        logger.debug("get_supabase_for_user: falling back to base client")
-        return base_supabase
+        alg = jwt.get_unverified_header(token).get("alg")
+        if alg == "HS256":
+            if not SUPABASE_JWT_SECRET:
+                return None
+            key = SUPABASE_JWT_SECRET
+        elif alg in ASYMMETRIC_JWT_ALGORITHMS:
+            jwks_client = _get_jwks_client()
+            if jwks_client is None:
+                return None
+            # PyJWKClient fetches over urllib; keep the (rare) JWKS refresh off the loop.
+            key = (await run_blocking(jwks_client.get_signing_key_from_jwt, token)).key
+        else:
+            raise HTTPException(status_code=401, detail="Unauthorized: unsupported token algorithm")
 
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[alg],
+            audience=SUPABASE_JWT_AUDIENCE,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Unauthorized: token expired")
+    except jwt.PyJWKClientError as exc:
+        logger.warning("JWKS lookup failed: %s", exc)
+        return None
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
 
-def get_supabase_for_user_session(
-    request: Request,
-    token: str = Depends(get_user_token),
-):
-    """Ensure the Supabase client has a usable session for the provided token.
 
-    Strategy:
-    1. Try `set_session(access_token=token, refresh_token="")`.
-    2. If that doesn't yield a usable session, call `get_user(token)` to validate
-       the token and synthesize a Session object, then save it in-memory.
+def _user_from_claims(claims: dict) -> User:
+    aud = claims.get("aud")
+    if isinstance(aud, list):
+        aud = aud[0] if aud else ""
+    return User(
+        id=claims["sub"],
+        aud=aud or "",
+        email=claims.get("email") or None,
+        phone=claims.get("phone") or None,
+        role=claims.get("role"),
+        app_metadata=claims.get("app_metadata") or {},
+        user_metadata=claims.get("user_metadata") or {},
+        is_anonymous=bool(claims.get("is_anonymous", False)),
+        # Access tokens do not carry the account creation time; use the issue time.
+        created_at=datetime.fromtimestamp(claims.get("iat", 0), tz=timezone.utc),
+    )
 
-    Raises HTTP 401 for invalid tokens and HTTP 500 for server-side issues.
+
+async def get_current_user(request: Request, tokens: dict = Depends(get_user_token)) -> User:
+    """Return the authenticated Supabase user without a GoTrue round trip.
+
+    Tokens are verified locally against ``SUPABASE_JWT_SECRET`` (HS256) or the
+    project JWKS (RS256/ES256). When neither is available the token is checked
+    once with ``auth.get_user`` and the result is cached like a local decode.
     """
+    token = tokens["access_token"]
+    cache_key = verified_user_cache.key_for(token)
+    user = verified_user_cache.get(cache_key)
+    if user is not None:
+        return user
+
+    claims = await _decode_access_token(token)
+    if claims is not None:
+        user = _user_from_claims(claims)
+        verified_user_cache.put(cache_key, user, claims.get("exp"))
+        return user
+
     base_supabase = request.app.state.supabase
     if not base_supabase:
         raise HTTPException(status_code=500, detail="Supabase client not configured")
 
-    # 1) Try to set session directly
     try:
-        base_supabase.auth.set_session(access_token=token, refresh_token="")
-        if base_supabase.auth.get_session() is not None:
-            return base_supabase
-        logger.debug("set_session did not create a usable session; falling back")
+        resp = await base_supabase.auth.get_user(token)
     except Exception as exc:
-        logger.debug("set_session raised: %s", exc)
+        logger.debug("get_user fallback failed: %s", exc)
+        raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
+    if not resp or not resp.user:
+        raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
 
-    # 2) Validate token and synthesize a session
     try:
-        resp = base_supabase.auth.get_user(token)
-        if not resp or not getattr(resp, "user", None):
-            raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
-
-        # Lazy import Session model
-        try:
-            from supabase_auth.types import Session as SupabaseSession
-        except Exception as exc:
-            logger.exception("Failed to import Supabase Session type: %s", exc)
-            raise HTTPException(status_code=500, detail="Server configuration error")
-
-        # Determine expires_in; prefer session value if present
-        expires_in = 3600
-        if getattr(resp, "session", None) and getattr(resp.session, "expires_in", None):
-            try:
-                expires_in = int(resp.session.expires_in)
-            except Exception:
-                pass
-
-        now = round(time.time())
-        expires_at = now + int(expires_in)
-
-        session_obj = SupabaseSession(
-            access_token=token,
-            refresh_token="",
-            expires_in=int(expires_in),
-            expires_at=expires_at,
-            token_type="bearer",
-            user=resp.user,
+        token_exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.InvalidTokenError:
+        token_exp = None
+    verified_user_cache.put(cache_key, resp.user, token_exp)
+    return resp.user
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client bound to one caller, sharing the process-wide connection pool.
+
+    Every instance gets its own lightweight ``httpx.AsyncClient`` on top of the
+    shared transport. Older postgrest-py releases write the client's base URL and
+    auth headers onto the HTTP session, so a session shared between requests would
+    send one user's token with another user's query. Only the transport (the
+    connection pool) is shared; headers never are.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        transport: httpx.AsyncBaseTransport,
+        schema: str = "public",
+        headers: dict[str, str],
+    ):
+        session = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            transport=transport,
+            timeout=httpx.Timeout(POSTGREST_TIMEOUT_SECONDS),
+            follow_redirects=True,
+            trust_env=False,
         )
+        super().__init__(base_url, schema=schema, headers=headers, http_client=session)
+        self.transport = transport
+
+    def schema(self, schema: str) -> "PooledPostgrestClient":
+        return PooledPostgrestClient(
+            str(self.base_url),
+            schema=schema,
+            headers=dict(self.headers),
+            transport=self.transport,
+        )
+
+    async def aclose(self) -> None:
+        # The pool belongs to ``main.lifespan``; closing the session would close it for everyone
+        return None
+
+
+def create_postgrest_transport() -> httpx.AsyncBaseTransport:
+    """Build the connection pool shared by every per-request PostgREST client."""
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=POSTGREST_MAX_CONNECTIONS,
+            max_keepalive_connections=POSTGREST_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        http2=True,
+    )
+
+
+def get_supabase_for_user(
+    request: Request,
+    tokens: dict = Depends(get_user_token),
+) -> PooledPostgrestClient:
+    """Return a PostgREST client bound to the caller's access token.
+
+    Each request gets its own client and HTTP session (just headers), so
+    concurrent requests from different users never see each other's auth state.
+    All of them share the pooled transport created in ``main.lifespan``.
+    """
+    base_supabase = request.app.state.supabase
+    transport = getattr(request.app.state, "postgrest_transport", None)
+    if not base_supabase or transport is None:
+        raise HTTPException(status_code=500, detail="Supabase client not configured")
 
-        # Try to save session via internal API, else set in-memory session directly
-        try:
-            base_supabase.auth._save_session(session_obj)
-        except Exception as exc:
-            logger.debug("_save_session failed: %s", exc)
-            logger.error("No public API available to set session in-memory; cannot proceed without manipulating private attributes.")
-            raise HTTPException(status_code=500, detail="Unable to set Supabase session using public APIs")
-        # Final verification
-        try:
-            if base_supabase.auth.get_session() is None:
-                debug = {
-                    "has_in_memory": hasattr(base_supabase.auth, "_in_memory_session"),
-                    "in_memory_is_set": bool(getattr(base_supabase.auth, "_in_memory_session", None)),
-                    "persist_session": bool(getattr(base_supabase.auth, "_persist_session", False)),
-                    "storage_present": hasattr(base_supabase.auth, "_storage"),
-                }
-                logger.debug("session still not set after synthesize: %s", debug)
-                raise HTTPException(status_code=401, detail=f"Unauthorized: unable to set session ({debug})")
-        except AttributeError:
-            logger.debug("auth client missing get_session method")
-            raise HTTPException(status_code=500, detail="Supabase client missing required methods")
-
-        return base_supabase
-
-    except HTTPException:
-        raise
\ No newline at end of file
+    return PooledPostgrestClient(
+        str(base_supabase.rest_url),
+        headers={
+            "apikey": base_supabase.supabase_key,
+            "Authorization": f"Bearer {tokens['access_token']}",
+        },
+        transport=transport,
+    )
@@ -10,8 +10,14 @@ from .routers.bot.bot import router as bot_router
 from .routers.investments.investments import router as investments_router
 from .utils.external.yfinance.yfinance_api import router as yfinance_router
 from .routers.finance.finance import router as finance_router
-from supabase import create_client, Client
-
+from .routers.finance.categories.catalogue import category_catalogue
+from .dependencies import create_postgrest_transport
+from .utils.blocking import monitor_event_loop_lag, shutdown_executor
+from .utils.external.exchangeRate.fx_rates import fx_service
+from supabase import acreate_client
+
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -19,11 +25,27 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_KEY")
 
+logger = logging.getLogger("app.main")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    app.state.supabase = await acreate_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    app.state.postgrest_transport = create_postgrest_transport()
+    loop_monitor = asyncio.create_task(monitor_event_loop_lag())
+    fx_refresher = asyncio.create_task(fx_service.run_refresh_loop())
+    try:
+        await category_catalogue.ensure_loaded(app.state.supabase)
+    except Exception as exc:
+        logger.warning("Category catalogue not loaded at startup, loading on first request: %s", exc)
+    category_refresher = asyncio.create_task(category_catalogue.run_refresh_loop(app.state.supabase))
     yield
+    loop_monitor.cancel()
+    fx_refresher.cancel()
+    category_refresher.cancel()
+    await app.state.postgrest_transport.aclose()
+    app.state.postgrest_transport = None
     app.state.supabase = None
+    shutdown_executor()
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(account_router)
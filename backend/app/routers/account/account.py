@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel, EmailStr
 
-from app.dependencies import get_supabase, get_user_token
+from app.dependencies import get_auth_client, get_current_user, get_supabase, get_supabase_for_user, get_user_token
 
 router = APIRouter(prefix="/account", tags=["account"])
 auth_scheme = HTTPBearer(auto_error=True)
@@ -33,7 +33,7 @@ async def get_user(
         credentials=Depends(get_user_token)
 ):
     try:
-        resp = supabase.auth.get_user(credentials.get("access_token"))
+        resp = await supabase.auth.get_user(credentials.get("access_token"))
         if not resp or not resp.user:
             raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
 
@@ -56,14 +56,14 @@ async def get_user(
 @router.patch("/", response_model=UserResponse, status_code=status.HTTP_200_OK)
 async def update_user(
         request: UpdateUserRequest,
-        supabase=Depends(get_supabase),
+        auth=Depends(get_auth_client),
         credentials: str = Depends(get_user_token),
 ):
     try:
         if not request.email and not request.display_name and not request.currency:
             raise HTTPException(status_code=400, detail="No update requested")
 
-        supabase.auth.set_session(credentials.get("access_token"), request.refresh_token)
+        await auth.set_session(credentials.get("access_token"), request.refresh_token)
 
         update_payload: Dict[str, Any] = {}
         if request.email:
@@ -77,7 +77,7 @@ async def update_user(
         if data:
             update_payload["data"] = data
 
-        resp = supabase.auth.update_user(update_payload)
+        resp = await auth.update_user(update_payload)
         if not resp or not resp.user:
             raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
         return UserResponse(
@@ -105,17 +105,13 @@ class UpdateAiFlagRequest(BaseModel):
 
 @router.get("/ai-flag", response_model=AiFlagResponse, status_code=status.HTTP_200_OK)
 async def get_ai_flag(
-        supabase=Depends(get_supabase),
-        credentials=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
 ):
     try:
-        resp = supabase.auth.get_user(credentials.get("access_token"))
-        if not resp or not resp.user:
-            raise HTTPException(status_code=401, detail="Unauthorized")
-
-        user_id = resp.user.id
+        user_id = user.id
 
-        row = (
+        row = await (
             supabase.schema("core")
             .table("users")
             .select("ai_flag")
@@ -136,17 +132,13 @@ async def get_ai_flag(
 @router.patch("/ai-flag", response_model=AiFlagResponse, status_code=status.HTTP_200_OK)
 async def update_ai_flag(
         request: UpdateAiFlagRequest,
-        supabase=Depends(get_supabase),
-        credentials=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
 ):
     try:
-        resp = supabase.auth.get_user(credentials.get("access_token"))
-        if not resp or not resp.user:
-            raise HTTPException(status_code=401, detail="Unauthorized")
-
-        user_id = resp.user.id
+        user_id = user.id
 
-        result = (
+        result = await (
             supabase.schema("core")
             .table("users")
             .update({"ai_flag": request.ai_flag})
@@ -7,7 +7,7 @@ from numpy.f2py.rules import options
 from pydantic import BaseModel, EmailStr
 from typing import Dict, Any, Optional
 
-from app.dependencies import get_supabase, get_user_token
+from app.dependencies import get_auth_client, get_current_user, get_supabase
 from starlette.responses import JSONResponse
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -51,9 +51,9 @@ class ResetPasswordRequest(BaseModel):
     password: str
 
 @router.post("/sign-in", response_model=SignInResponse, status_code=status.HTTP_200_OK)
-async def sign_in(request: SignInRequest, supabase=Depends(get_supabase)):
+async def sign_in(request: SignInRequest, auth=Depends(get_auth_client)):
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = await auth.sign_in_with_password({
             "email": request.email,
             "password": request.password
         })
@@ -74,9 +74,9 @@ async def sign_in(request: SignInRequest, supabase=Depends(get_supabase)):
         raise HTTPException(status_code=400, detail=f"Sign-in failed: {e}")
 
 @router.post("/sign-up", response_model=SignUpResponse, status_code=status.HTTP_201_CREATED)
-async def sign_up(request: SignUpRequest, supabase=Depends(get_supabase)):
+async def sign_up(request: SignUpRequest, auth=Depends(get_auth_client)):
     try:
-        response = supabase.auth.sign_up({
+        response = await auth.sign_up({
             "email": request.email,
             "password": request.password,
             "options": {
@@ -106,21 +106,21 @@ async def sign_up(request: SignUpRequest, supabase=Depends(get_supabase)):
 @router.post("/sign-out", status_code=status.HTTP_200_OK)
 async def sign_out(
         request: SignOutRequest,
-        supabase=Depends(get_supabase),
+        auth=Depends(get_auth_client),
 ):
     try:
-        supabase.auth.set_session(request.access_token, request.refresh_token)
-        supabase.auth.sign_out()
+        await auth.set_session(request.access_token, request.refresh_token)
+        await auth.sign_out()
         return {"message": "User signed out successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Sign-out failed: {e}")
 
 @router.get("/refresh-token", response_model=RefreshAccessTokenResponse, status_code=status.HTTP_200_OK)
 async def refresh_access_token(
-        supabase=Depends(get_supabase),
+        auth=Depends(get_auth_client),
         credentials: HTTPAuthorizationCredentials = Depends(auth_scheme),):
     try:
-        response = supabase.auth.refresh_session(credentials.credentials)
+        response = await auth.refresh_session(credentials.credentials)
         if not response or not response.user:
             raise HTTPException(status_code=400, detail="Refresh failed")
 
@@ -148,7 +148,7 @@ async def get_otp(
         supabase=Depends(get_supabase),
 ):
     try:
-        response = supabase.auth.sign_in_with_otp({
+        response = await supabase.auth.sign_in_with_otp({
             "email": email,
         })
 
@@ -164,10 +164,10 @@ async def get_otp(
 @router.post("/verify-otp")
 async def verify_otp(
     request: VerifyRequest,
-    supabase = Depends(get_supabase),
+    auth=Depends(get_auth_client),
 ):
     try:
-        response = supabase.auth.verify_otp({
+        response = await auth.verify_otp({
             "email": request.email,
             "token": request.otp,
             "type": "email"
@@ -193,18 +193,13 @@ async def verify_otp(
 @router.post("/reset-password")
 async def reset_password(
         supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-
-        user_resp = supabase.auth.get_user()
-        if not user_resp or not user_resp.user or not user_resp.user.email:
+        if not user.email:
             raise HTTPException(status_code=400, detail="Could not resolve user email")
 
-        supabase.auth.reset_password_email(user_resp.user.email)
+        await supabase.auth.reset_password_email(user.email)
         return {"message": "Password reset email sent successfully"}
 
     except HTTPException:
@@ -222,10 +217,10 @@ class ConfirmResetPasswordRequest(BaseModel):
 @router.post("/confirm-reset-password")
 async def confirm_reset_password(
         request: ConfirmResetPasswordRequest,
-        supabase=Depends(get_supabase),
+        auth=Depends(get_auth_client),
 ):
     try:
-        verify_resp = supabase.auth.verify_otp({
+        verify_resp = await auth.verify_otp({
             "email": request.email,
             "token": request.otp,
             "type": "recovery",
@@ -234,12 +229,12 @@ async def confirm_reset_password(
         if not verify_resp or not verify_resp.session:
             raise HTTPException(status_code=400, detail="Invalid or expired OTP")
 
-        supabase.auth.set_session(
+        await auth.set_session(
             verify_resp.session.access_token,
             verify_resp.session.refresh_token,
         )
 
-        update_resp = supabase.auth.update_user({
+        update_resp = await auth.update_user({
             "password": request.new_password,
         })
 
@@ -3,17 +3,19 @@ from decimal import Decimal, InvalidOperation
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
-from app.dependencies import get_supabase, get_user_token
+from app.dependencies import get_current_user, get_supabase_for_user
 import os
 from dotenv import load_dotenv
 from starlette.responses import JSONResponse
-import requests
-from requests.exceptions import JSONDecodeError
+import httpx
+from json import JSONDecodeError
 
 load_dotenv()
 
 router = APIRouter(prefix="/bank", tags=["bank"])
 
+TRUELAYER_TIMEOUT_SECONDS = 30.0
+
 
 class TransactionRequest(BaseModel):
     type: str
@@ -56,9 +58,14 @@ def truelayer_txs_to_transaction_requests(
     return [restructure_tx(tx) for tx in txs]
 
 
+async def truelayer_request(method: str, url: str, **kwargs) -> httpx.Response:
+    async with httpx.AsyncClient(timeout=TRUELAYER_TIMEOUT_SECONDS) as client:
+        return await client.request(method, url, **kwargs)
+
+
 async def exchange_auth_code_for_tokens(code):
     print(f"Exchanging auth code: {code[:10]}...")  # Debug: partial code for security
-    response = requests.post("https://auth.truelayer-sandbox.com/connect/token", data={
+    response = await truelayer_request("POST", "https://auth.truelayer-sandbox.com/connect/token", data={
         'grant_type': 'authorization_code',
         'redirect_uri': 'exp://--',
         'client_id': os.environ.get("TRUELAYER_CLIENT_ID"),
@@ -87,7 +94,8 @@ async def exchange_auth_code_for_tokens(code):
 
 async def fetch_accounts(access_token):
     print("Fetching accounts")
-    response_account = requests.get(
+    response_account = await truelayer_request(
+        "GET",
         "https://api.truelayer-sandbox.com/data/v1/accounts",
         headers={
             "Authorization": f"Bearer {access_token}",
@@ -123,7 +131,7 @@ async def insert_bank_connection(supabase, user_id, account, access_token, refre
     print(account)
     provider = account.get("provider", {})
     try:
-        res = supabase.schema("ext").table("bank_connections").insert({
+        res = await supabase.schema("ext").table("bank_connections").insert({
             "user_id": user_id,
             "provider": provider.get("display_name"),
             "provider_acc_id": account.get("account_id"),
@@ -137,7 +145,7 @@ async def insert_bank_connection(supabase, user_id, account, access_token, refre
         }).execute()
 
         if res.data:
-            res_account = supabase.schema("finance").table("accounts").insert({
+            res_account = await supabase.schema("finance").table("accounts").insert({
                 "user_id": user_id,
                 "name": name,
                 "institution": provider.get("display_name"),
@@ -162,7 +170,8 @@ async def insert_bank_connection(supabase, user_id, account, access_token, refre
 async def get_transactions(access_token, acct_id):
     print(f"Fetching transactions for account: {acct_id}")
     tx_url = f"https://api.truelayer-sandbox.com/data/v1/accounts/{acct_id}/transactions"
-    transaction_response = requests.get(
+    transaction_response = await truelayer_request(
+        "GET",
         tx_url,
         headers={
             "Authorization": f"Bearer {access_token}",
@@ -188,7 +197,8 @@ async def get_transactions(access_token, acct_id):
 async def get_balance(access_token, acct_id):
     print(f"Fetching balance for account: {acct_id}")
     balance_url = f"https://api.truelayer-sandbox.com/data/v1/accounts/{acct_id}/balance"
-    balance_response = requests.get(
+    balance_response = await truelayer_request(
+        "GET",
         balance_url,
         headers={
             "Authorization": f"Bearer {access_token}",
@@ -212,7 +222,7 @@ async def get_balance(access_token, acct_id):
 async def refresh_token(refresh_token):
     print("Refreshing token")
     print(f"Refresh token: {refresh_token}")
-    response = requests.post("https://auth.truelayer-sandbox.com/connect/token", data={
+    response = await truelayer_request("POST", "https://auth.truelayer-sandbox.com/connect/token", data={
         'grant_type': 'refresh_token',
         'client_id': os.environ.get("TRUELAYER_CLIENT_ID"),
         'client_secret': os.environ.get("TRUELAYER_CLIENT_SECRET"),
@@ -237,7 +247,7 @@ async def refresh_token(refresh_token):
                             detail=f"Failed to fetch access token: {response.status_code} {response.text}")
 
 
-async def connect_bank(code, supabase, name):
+async def connect_bank(code, supabase, user, name):
     print("Starting connect_bank")
     try:
         token_data = await exchange_auth_code_for_tokens(code)
@@ -254,9 +264,6 @@ async def connect_bank(code, supabase, name):
         tx_reqs = truelayer_txs_to_transaction_requests(transactions)
         balance = await get_balance(access_token, acct_id)
         print("Balance fetched")
-        user_resp = supabase.auth.get_user()
-        print(f"User response: {user_resp}")
-        user = user_resp.user
         user_id = user.id
         print(f"User ID: {user_id}")
         created_at = str(transactions[0].get("timestamp")) if transactions else None
@@ -276,31 +283,18 @@ async def connect_bank(code, supabase, name):
 @router.post("/generate-token")
 async def generate_token(
         request: dict,
-        supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
 ):
     print("Entering generate_token")
     print(f"Request body: {request}")
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        print(f"Tokens: access={access[:10]}..., refresh={refresh[:10]}...")
-        supabase.auth.set_session(access, refresh)
-        print("Session set")
-
-        user_resp = supabase.auth.get_user()
-        print(f"User response: {user_resp}")
-        user = getattr(user_resp, "user", None)
-        print(f"User: {user}")
-
-        if not user and not request.get("code"):
-            print("Not authenticated and no code")
-            raise HTTPException(status_code=401, detail="Not authenticated")
+        print(f"User: {user.id}")
 
         code = request.get("code")
         if code:
             print(f"Code provided: {code[:10]}...")
-            return await connect_bank(code, supabase, request.get("name") or "Bank Account")
+            return await connect_bank(code, supabase, user, request.get("name") or "Bank Account")
 
         print("No code provided")
         raise HTTPException(status_code=400, detail="No code provided")
@@ -315,32 +309,16 @@ async def generate_token(
 
 @router.get("/data")
 async def get_transactions_and_balance(
-        supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
 ):
     print("Entering get_transactions_and_balance")
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        print(f"Tokens: access={access[:10]}..., refresh={refresh[:10]}...")
-        supabase.auth.set_session(access, refresh)
-        print("Session set")
-
-        user_resp = supabase.auth.get_user()
-        print(f"User response: {user_resp}")
-        user = user_resp.user
-        print(f"User: {user}")
-
-        if not user:
-            print("Not authenticated")
-            raise HTTPException(status_code=401, detail="Not authenticated")
-
-
         user_id = user.id
         print(f"User ID from metadata: {user_id}")
 
         print("Fetching bank connection")
-        conn_res = supabase.schema("ext").table("bank_connections").select("*").eq("user_id", user_id).execute()
+        conn_res = await supabase.schema("ext").table("bank_connections").select("*").eq("user_id", user_id).execute()
         print(f"Connection fetch data: {conn_res.data}")
 
         connections = conn_res.data
@@ -362,7 +340,7 @@ async def get_transactions_and_balance(
         print("Token refreshed")
 
         print("Updating bank connection")
-        update_res = supabase.schema("ext").table("bank_connections").update({
+        update_res = await supabase.schema("ext").table("bank_connections").update({
             "access_token_enc": access_token,
             "refresh_token_enc": new_refresh_token
         }).eq("user_id", user_id).execute()
@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger("app.routers.finance.categories.catalogue")
+
+CATEGORY_REFRESH_SECONDS = float(os.getenv("CATEGORY_REFRESH_SECONDS", "3600"))
+# An id missing from the catalogue triggers a reload, at most this often
+CATEGORY_MISS_RELOAD_SECONDS = float(os.getenv("CATEGORY_MISS_RELOAD_SECONDS", "30"))
+
+_COLUMNS = "id, name, parent_id, icon, is_income"
+_ENRICH_FIELDS = ("id", "name", "icon", "is_income")
+
+
+class CategoryCatalogue:
+    """In-memory copy of the global ``finance.categories`` table.
+
+    Loaded in ``main.lifespan`` and reloaded every ``CATEGORY_REFRESH_SECONDS``
+    by a background task. A lookup for an unknown id reloads early, so a category
+    added in between shows up without waiting for the next refresh. If the
+    startup load fails (or the anon key cannot read the table), the first request
+    loads it with the caller's client instead.
+    """
+
+    def __init__(self, refresh_seconds: float = CATEGORY_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.rows: list[dict] = []
+        self.etag: str | None = None
+        self._by_id: dict[str, dict] = {}
+        self._loaded_at: float | None = None
+        self._miss_reload_at = 0.0
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds
+
+    async def reload(self, supabase) -> None:
+        response = await (
+            supabase.schema("finance")
+            .table("categories")
+            .select(_COLUMNS)
+            .order("name")
+            .execute()
+        )
+        rows = response.data or []
+        if not rows:
+            # Usually RLS hiding the table from this client: keep what we have,
+            # and if that is nothing, let the next caller's client try
+            if self.rows:
+                self._loaded_at = time.monotonic()
+            return
+        digest = hashlib.sha256(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()
+        self.rows = rows
+        self._by_id = {row["id"]: {field: row.get(field) for field in _ENRICH_FIELDS} for row in rows}
+        self.etag = f'"{digest[:32]}"'
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def ensure_loaded(self, supabase, force: bool = False) -> None:
+        if self._is_fresh() and not force:
+            return
+        async with self._lock:
+            if self._is_fresh() and not force:
+                return
+            try:
+                await self.reload(supabase)
+            except Exception:
+                if not self.rows:
+                    raise
+                logger.exception("Category reload failed, serving the previous catalogue")
+
+    async def all(self, supabase) -> tuple[list[dict], str | None]:
+        """Every category ordered by name, with the catalogue's ETag."""
+        await self.ensure_loaded(supabase)
+        return self.rows, self.etag
+
+    async def lookup(self, supabase, category_ids) -> dict[str, dict]:
+        """``{id: {id, name, icon, is_income}}`` for the known ids among ``category_ids``."""
+        await self.ensure_loaded(supabase)
+        wanted = {cat_id for cat_id in category_ids if cat_id}
+        if wanted - self._by_id.keys() and time.monotonic() >= self._miss_reload_at:
+            self._miss_reload_at = time.monotonic() + CATEGORY_MISS_RELOAD_SECONDS
+            await self.ensure_loaded(supabase, force=True)
+        return {cat_id: self._by_id[cat_id] for cat_id in wanted if cat_id in self._by_id}
+
+    async def run_refresh_loop(self, supabase) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.ensure_loaded(supabase, force=True)
+            except Exception:
+                logger.exception("Scheduled category reload failed")
+
+
+category_catalogue = CategoryCatalogue()
@@ -1,34 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.dependencies import get_supabase, get_user_token
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from app.dependencies import get_current_user, get_supabase_for_user
 from starlette import status
 
+from .catalogue import category_catalogue
+
 router = APIRouter(prefix="/categories", tags=["finance-categories"])
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
 async def get_categories(
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    request: Request,
+    response: Response,
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-
-        user_resp = supabase.auth.get_user()
-        if not user_resp.user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
-        response = (
-            supabase.schema("finance")
-            .table("categories")
-            .select("id, name, parent_id, icon, is_income")
-            .order("name")
-            .execute()
-        )
-
-        return {"rows": response.data}
+        rows, etag = await category_catalogue.all(supabase)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Get categories failed: {e}")
+
+    if etag:
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+    return {"rows": rows}
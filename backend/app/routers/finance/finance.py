@@ -2,7 +2,7 @@ import logging
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
-from app.dependencies import get_supabase, get_user_token
+from app.dependencies import get_current_user, get_supabase_for_user
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel
 from starlette import status
@@ -17,11 +17,13 @@ from .transactions.transactions import router as transactions_router
 from .subscriptions.subcriptions import router as subscriptions_router
 from .saving_goals.saving_goals import router as saving_goals_router
 from .categories.categories import router as categories_router
+from .summary.summary import router as summary_router
 
 router.include_router(transactions_router)
 router.include_router(subscriptions_router)
 router.include_router(saving_goals_router)
 router.include_router(categories_router)
+router.include_router(summary_router)
 
 
 
@@ -37,19 +39,12 @@ class CreateFinanceAccountRequest(BaseModel):
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
-async def get_finance(supabase=Depends(get_supabase), tokens=Depends(get_user_token)):
+async def get_finance(
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
+):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-
-        supabase.auth.set_session(access, refresh)
-
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
-        response = (
+        response = await (
             supabase.schema("finance")
             .table("accounts")
             .select("*")
@@ -69,23 +64,14 @@ async def get_finance(supabase=Depends(get_supabase), tokens=Depends(get_user_to
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def post_finance(
     request: CreateFinanceAccountRequest,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
 
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-
-        if not access or not refresh:
-            logging.warning("[post_finance] Missing access or refresh token")
-            raise HTTPException(status_code=401, detail="Missing authentication tokens")
-
-        supabase.auth.set_session(access, refresh)
-
         payload = request.model_dump(exclude_none=True, exclude={"initial_balance"})
 
-        res = (
+        res = await (
             supabase.schema("finance")
             .table("accounts")
             .insert(payload)
@@ -99,14 +85,7 @@ async def post_finance(
 
 
         if request.initial_balance and request.initial_balance > 0:
-
-            user_resp = supabase.auth.get_user()
-            user = user_resp.user
-
-            if not user:
-                logging.warning("[post_finance] Could not resolve user from session for initial balance transaction")
-
-            user_id = payload.get("user_id") or (user.id if user else None)
+            user_id = payload.get("user_id") or user.id
             logging.debug(f"[post_finance] Resolved user_id for transaction: {user_id}")
 
             txn_payload = {
@@ -123,7 +102,7 @@ async def post_finance(
             }
             logging.info(f"[post_finance] Inserting initial balance transaction: {txn_payload}")
 
-            txn_res = (
+            txn_res = await (
                 supabase.schema("finance")
                 .table("transactions")
                 .insert(txn_payload)
@@ -146,15 +125,10 @@ async def post_finance(
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_finance(
     id: str,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-
-        response = (
+        response = await (
             supabase.schema("finance")
             .table("accounts")
             .delete()
@@ -170,17 +144,11 @@ async def delete_finance(
 async def patch_finance(
     id: str,
     request: CreateFinanceAccountRequest,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-
-        supabase.auth.set_session(access, refresh)
-
         payload = request.model_dump(exclude_none=True)  # convert to dict
-        resp = (
+        resp = await (
             supabase.schema("finance")
             .table("accounts")
             .update(payload)
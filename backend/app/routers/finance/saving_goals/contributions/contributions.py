@@ -2,7 +2,7 @@ from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer
-from app.dependencies import get_supabase, get_user_token
+from app.dependencies import get_current_user, get_supabase_for_user
 from pydantic import BaseModel
 from starlette import status
 
@@ -18,20 +18,12 @@ class ContributionRequest(BaseModel):
 @router.post("/")
 async def add_contribution(
         request: ContributionRequest,
-        supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
         payload = request.model_dump(exclude_none=True)
-        contributions_response = (
+        contributions_response = await (
             supabase.schema("finance")
             .table("saving_contributions")
             .insert(
@@ -49,18 +41,11 @@ async def add_contribution(
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contribution(
     id: str,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-        contributions_response = (
+        contributions_response = await (
             supabase.schema("finance")
             .table("saving_contributions")
             .delete()
@@ -2,7 +2,7 @@ from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer
-from app.dependencies import get_supabase, get_user_token
+from app.dependencies import get_current_user, get_supabase_for_user
 from .contributions.contributions import router as contributions_router
 from pydantic import BaseModel
 from starlette import status
@@ -19,20 +19,11 @@ class SavingGoalRequest(BaseModel):
 
 @router.get("/")
 async def get_saving_goals(
-        supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
-        response = (
+        response = await (
             supabase.schema("finance")
             .table("saving_goals")
             .select("*")
@@ -42,7 +33,7 @@ async def get_saving_goals(
 
         if response.data:
             for goal in response.data:
-                contributions = (
+                contributions = await (
                     supabase.schema("finance")
                     .table("saving_contributions")
                     .select("*")
@@ -61,23 +52,14 @@ async def get_saving_goals(
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def add_saving_goal(
         request: SavingGoalRequest,
-        supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
         payload = request.model_dump(exclude_none=True)
         contributed_minor = payload.pop("contributed_minor", 0)
 
-        response = (
+        response = await (
             supabase.schema("finance")
             .table("saving_goals")
             .insert(
@@ -91,7 +73,7 @@ async def add_saving_goal(
 
         if response.data and contributed_minor > 0:
             goal_id = response.data[0]["id"]
-            (
+            await (
                 supabase.schema("finance")
                 .table("saving_contributions")
                 .insert(
@@ -113,20 +95,11 @@ async def add_saving_goal(
 @router.delete("/{id}")
 async def delete_saving_goal(
     id: str,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
-        delete_response = (
+        delete_response = await (
             supabase.schema("finance")
             .table("saving_goals")
             .delete()
@@ -143,22 +116,13 @@ async def delete_saving_goal(
 async def update_saving_goal(
         id: str,
         request: SavingGoalRequest,
-        supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
         payload = request.model_dump(exclude_none=True)
 
-        response = (
+        response = await (
             supabase.schema("finance")
             .table("saving_goals")
             .update(payload)
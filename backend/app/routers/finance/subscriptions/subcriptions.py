@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from starlette import status
 
-from app.dependencies import get_supabase, get_user_token
+from app.dependencies import get_current_user, get_supabase_for_user
 
 router = APIRouter(prefix="/subscriptions", tags=["finance-subscriptions"])
 
@@ -24,21 +24,12 @@ class AddSubscriptionRequest(BaseModel):
 
 @router.get("/{account_id}")
 async def get_subscriptions(
-        supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
         account_id: str | None = None,
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
-        response = (
+        response = await (
             supabase.schema("finance")
             .table("subscriptions")
             .select("*")
@@ -54,23 +45,14 @@ async def get_subscriptions(
 @router.post("/{account_id}")
 async def add_subscription(
         request: AddSubscriptionRequest,
-        supabase=Depends(get_supabase),
-        tokens=Depends(get_user_token),
+        supabase=Depends(get_supabase_for_user),
+        user=Depends(get_current_user),
         account_id: str | None = None,
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
         payload = request.model_dump(exclude_none=True)
 
-        subscriptions_response = (
+        subscriptions_response = await (
             supabase.schema("finance")
             .table("subscriptions")
             .insert({
@@ -88,20 +70,11 @@ async def add_subscription(
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_subscription(
     id: str,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
-        subscription_response = (
+        subscription_response = await (
             supabase.schema("finance")
             .table("subscriptions")
             .delete()
@@ -116,21 +89,12 @@ async def delete_subscription(
 async def patch_subscription(
     id: str,
     request: AddSubscriptionRequest,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
         payload = request.model_dump(exclude_none=True)
-        subscription_response = (
+        subscription_response = await (
             supabase.schema("finance")
             .table("subscriptions")
             .update(payload)
@@ -0,0 +1,74 @@
+from datetime import date
+
+GROUP_BY_FIELDS = ("month", "account", "category", "type")
+
+# Rollup column behind each group_by field
+_GROUP_COLUMNS = {"month": "month", "account": "account_id", "category": "category_id", "type": "type"}
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+async def rebuild_rollups(supabase) -> int:
+    """Recompute the calling user's rollups from ``finance.transactions``; returns the row count."""
+    response = await supabase.schema("finance").rpc("rebuild_transaction_rollups", {}).execute()
+    return int(response.data or 0)
+
+
+async def load_rollups(supabase, user_id: str, month_from: date | None, month_to: date | None) -> list[dict]:
+    """Rollup rows for the months in ``[month_from, month_to]``, rebuilding them on first use.
+
+    Users whose transactions predate the rollup table (or whose rollups were
+    deleted) get a one-off rebuild on their first read.
+    """
+    finance = supabase.schema("finance")
+
+    async def fetch() -> list[dict]:
+        query = (
+            finance.table("transaction_rollups")
+            .select("month, account_id, category_id, type, currency, amount_minor, txn_count")
+            .eq("user_id", user_id)
+        )
+        if month_from is not None:
+            query = query.gte("month", month_from.isoformat())
+        if month_to is not None:
+            query = query.lte("month", month_to.isoformat())
+        response = await query.order("month").execute()
+        return response.data or []
+
+    rows = await fetch()
+    if rows:
+        return rows
+
+    any_rollup = await finance.table("transaction_rollups").select("month").eq("user_id", user_id).limit(1).execute()
+    if any_rollup.data:
+        return []
+    any_transaction = await finance.table("transactions").select("id").eq("user_id", user_id).limit(1).execute()
+    if not any_transaction.data:
+        return []
+    await rebuild_rollups(supabase)
+    return await fetch()
+
+
+def summarize(rows: list[dict], group_by: list[str]) -> list[dict]:
+    """Fold rollup rows into totals per ``group_by`` fields, always split by currency."""
+    columns = [_GROUP_COLUMNS[field] for field in group_by]
+    totals: dict[tuple, list] = {}
+    for row in rows:
+        key = (*(row.get(column) for column in columns), row["currency"])
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = [0.0, 0]
+        total[0] += float(row["amount_minor"])
+        total[1] += int(row["txn_count"])
+
+    result = []
+    for key, (amount_minor, count) in sorted(totals.items(), key=lambda item: tuple(str(part) for part in item[0])):
+        entry = dict(zip(columns, key[:-1]))
+        entry["currency"] = key[-1]
+        entry["amount_minor"] = int(amount_minor) if amount_minor.is_integer() else amount_minor
+        entry["count"] = count
+        result.append(entry)
+    return result
+
@@ -0,0 +1,73 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.dependencies import get_current_user, get_supabase_for_user
+from starlette import status
+
+from app.routers.finance.categories.catalogue import category_catalogue
+from .rollups import GROUP_BY_FIELDS, load_rollups, month_start, rebuild_rollups, summarize
+
+router = APIRouter(prefix="/summary", tags=["finance-summary"])
+
+
+@router.get("/", status_code=status.HTTP_200_OK)
+async def get_summary(
+    date_from: Optional[date] = Query(None, alias="from", description="First day to include (YYYY-MM-DD); whole months"),
+    date_to: Optional[date] = Query(None, alias="to", description="Last day to include (YYYY-MM-DD); whole months"),
+    group_by: str = Query("month,category", description=f"Comma-separated subset of {', '.join(GROUP_BY_FIELDS)}"),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
+):
+    """
+    Transaction totals per month, account, category and/or type, read from the
+    precomputed monthly rollups instead of the raw transaction history.
+    Totals are always split by currency.
+    """
+    fields = [field.strip().lower() for field in group_by.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in GROUP_BY_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Unknown group_by field(s): {', '.join(unknown)}")
+    fields = list(dict.fromkeys(fields))
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(400, "'from' must not be after 'to'")
+
+    month_from = month_start(date_from) if date_from else None
+    month_to = month_start(date_to) if date_to else None
+    try:
+        rows = await load_rollups(supabase, user.id, month_from, month_to)
+        summary = summarize(rows, fields)
+
+        if "category" in fields:
+            try:
+                category_map = await category_catalogue.lookup(
+                    supabase, [entry["category_id"] for entry in summary if entry.get("category_id")]
+                )
+            except Exception:
+                category_map = {}
+            for entry in summary:
+                cat_id = entry["category_id"]
+                entry["category"] = category_map.get(cat_id) if cat_id else None
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Get summary failed: {e}")
+
+    return {
+        "from": month_from.isoformat() if month_from else None,
+        "to": month_to.isoformat() if month_to else None,
+        "group_by": fields,
+        "rows": summary,
+    }
+
+
+@router.post("/rebuild", status_code=status.HTTP_200_OK)
+async def rebuild_summary(
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
+):
+    """Recompute the user's monthly rollups from scratch."""
+    try:
+        return {"status": "success", "rollups": await rebuild_rollups(supabase)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Rebuild summary failed: {e}")
@@ -1,17 +1,37 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import AsyncIterator, Optional
+import codecs
 import csv
 import io
+import json
+import logging
+import os
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import Response
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from starlette import status
 
-from app.dependencies import get_supabase, get_user_token
+from app.dependencies import get_current_user, get_supabase_for_user
+from app.utils.cursor import decode_cursor, encode_cursor, quote_filter_value
+from app.utils.streams import iter_lines
+from app.routers.finance.categories.catalogue import category_catalogue
 
 router = APIRouter(prefix="/transactions", tags=["finance-transactions"])
 
+logger = logging.getLogger("app.routers.finance.transactions")
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+MAX_PAGE_SIZE = 500
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+# A JSON array is only parsed once complete, so its size is capped in bytes instead
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+class BulkTooLargeError(Exception):
+    pass
+
 
 class TransactionRequest(BaseModel):
     type: str
@@ -22,19 +42,17 @@ class TransactionRequest(BaseModel):
     category_id: Optional[str] = None
 
 
-def _build_category_map(supabase, category_ids: list[str]) -> dict:
-    """Fetch categories by IDs and return a lookup dict {id: {name, icon}}."""
+class BulkTransactionItem(TransactionRequest):
+    # Offline-entered transactions keep the day they happened; defaults to today
+    txn_date: Optional[date] = None
+
+
+async def _build_category_map(supabase, category_ids: list[str]) -> dict:
+    """Look up categories by IDs in the shared catalogue and return a dict {id: {name, icon}}."""
     if not category_ids:
         return {}
     try:
-        resp = (
-            supabase.schema("finance")
-            .table("categories")
-            .select("id, name, icon, is_income")
-            .in_("id", category_ids)
-            .execute()
-        )
-        return {c["id"]: c for c in (resp.data or [])}
+        return await category_catalogue.lookup(supabase, category_ids)
     except Exception:
         return {}
 
@@ -43,21 +61,13 @@ def _build_category_map(supabase, category_ids: list[str]) -> dict:
 async def add_transactions(
     request: TransactionRequest,
     account_id: str,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
         payload = request.model_dump(exclude_none=True)
 
-        transactions_response = (
+        transactions_response = await (
             supabase.schema("finance")
             .table("transactions")
             .insert(
@@ -79,24 +89,207 @@ async def add_transactions(
         raise HTTPException(status_code=400, detail=f"Add transaction failed: {e}")
 
 
-@router.get("/export/csv", status_code=status.HTTP_200_OK)
-async def export_transactions_csv(
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+async def _parse_bulk_body(chunks: AsyncIterator[bytes], content_type: str) -> tuple[list, dict[int, str]]:
+    """Split a JSON array or NDJSON body into raw items, plus errors for lines that are not JSON.
+
+    NDJSON is parsed line by line as it arrives. Raises ``ValueError`` when the
+    body as a whole cannot be read, and :class:`BulkTooLargeError` past
+    ``BULK_MAX_ITEMS`` items or, for a JSON array, ``BULK_MAX_BYTES`` bytes.
+    """
+    chunks = aiter(chunks)
+    head = b""
+    if "ndjson" not in content_type and "jsonl" not in content_type:
+        # Read just far enough to tell a JSON array from NDJSON
+        async for chunk in chunks:
+            head += chunk
+            if head.removeprefix(codecs.BOM_UTF8).lstrip():
+                break
+        if head.removeprefix(codecs.BOM_UTF8).lstrip().startswith(b"["):
+            body = bytearray(head)
+            async for chunk in chunks:
+                body += chunk
+                if len(body) > BULK_MAX_BYTES:
+                    raise BulkTooLargeError(f"Body larger than {BULK_MAX_BYTES} bytes")
+            try:
+                items = json.loads(body.decode("utf-8-sig"))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON array: {e}")
+            if isinstance(items, list) and len(items) > BULK_MAX_ITEMS:
+                raise BulkTooLargeError(f"At most {BULK_MAX_ITEMS} transactions per request")
+            return items, {}
+
+    async def body_chunks() -> AsyncIterator[bytes]:
+        yield head
+        async for chunk in chunks:
+            yield chunk
+
+    items: list = []
+    errors: dict[int, str] = {}
+    async for line in iter_lines(body_chunks()):
+        if not line.strip():
+            continue
+        if len(items) >= BULK_MAX_ITEMS:
+            raise BulkTooLargeError(f"At most {BULK_MAX_ITEMS} transactions per request")
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError:
+            errors[len(items)] = "invalid JSON"
+            items.append(None)
+    return items, errors
+
+
+def _validate_bulk_item(item) -> dict:
+    """Validate one bulk item and return its insert payload; raises ``ValueError`` with a readable message."""
+    if not isinstance(item, dict):
+        raise ValueError("each item must be a JSON object")
+    try:
+        parsed = BulkTransactionItem.model_validate(item)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}" for err in e.errors()
+        ))
+    try:
+        float(parsed.amount_minor)
+    except ValueError:
+        raise ValueError("amount_minor must be a number")
+    return parsed.model_dump(exclude_none=True, mode="json")
+
+
+@router.post("/{account_id}/bulk", status_code=status.HTTP_200_OK)
+async def add_transactions_bulk(
+    request: Request,
+    account_id: str,
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
+    """Insert many transactions into one account in a single request.
+
+    The body is a JSON array of transaction objects, or NDJSON (one object per
+    line, ``Content-Type: application/x-ndjson``). Items are validated up front
+    and valid ones are inserted in multi-row batches of ``BULK_BATCH_SIZE``.
+    Returns one result per item, in input order.
+    """
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
+        items, parse_errors = await _parse_bulk_body(request.stream(), request.headers.get("content-type", ""))
+    except BulkTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
 
-        supabase.auth.set_session(access, refresh)
+    try:
+        account_response = await (
+            supabase.schema("finance")
+            .table("accounts")
+            .select("id")
+            .eq("id", account_id)
+            .eq("user_id", user.id)
+            .execute()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Bulk add transactions failed: {e}")
+    if not account_response.data:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    results: list[dict | None] = [None] * len(items)
+    pending: list[tuple[int, dict]] = []
+    today = str(datetime.now().date())
+    created_at = str(datetime.now())
+    for index, item in enumerate(items):
+        if index in parse_errors:
+            results[index] = {"index": index, "status": "error", "error": parse_errors[index]}
+            continue
+        try:
+            payload = _validate_bulk_item(item)
+        except ValueError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+            continue
+        pending.append((index, {
+            "user_id": user.id,
+            "account_id": account_id,
+            "txn_date": today,
+            "source": "manual",
+            "created_at": created_at,
+            **payload,
+        }))
+
+    finance = supabase.schema("finance")
+    for start in range(0, len(pending), BULK_BATCH_SIZE):
+        batch = pending[start:start + BULK_BATCH_SIZE]
+        try:
+            response = await finance.table("transactions").insert([row for _, row in batch]).execute()
+            inserted = response.data or []
+        except Exception as batch_err:
+            logger.warning("Bulk transaction batch failed for account %s: %s", account_id, batch_err)
+            for index, _ in batch:
+                results[index] = {"index": index, "status": "error", "error": f"Insert failed: {batch_err}"}
+            continue
+        # A multi-row insert is all-or-nothing and PostgREST returns the rows in input order
+        for offset, (index, _) in enumerate(batch):
+            row = inserted[offset] if offset < len(inserted) else {}
+            results[index] = {"index": index, "status": "created", "id": row.get("id")}
+
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "user": user.model_dump(),
+        "status": "success" if created == len(items) else "partial",
+        "created": created,
+        "failed": len(items) - created,
+        "results": results,
+    }
+
+
+def _csv_chunk(rows: list[list]) -> str:
+    output = io.StringIO()
+    csv.writer(output).writerows(rows)
+    return output.getvalue()
+
+
+async def _fetch_transaction_page(
+    supabase,
+    account_ids: list[str],
+    before: tuple[str, str] | None,
+    limit: int,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> list[dict]:
+    """Up to ``limit`` transactions, newest first, strictly older than the ``(txn_date, id)`` key."""
+    query = (
+        supabase.schema("finance")
+        .table("transactions")
+        .select("*")
+        .in_("account_id", account_ids)
+    )
+    if date_from is not None:
+        query = query.gte("txn_date", date_from.isoformat())
+    if date_to is not None:
+        query = query.lte("txn_date", date_to.isoformat())
+    if before is not None:
+        d, i = (quote_filter_value(part) for part in before)
+        query = query.or_(f"txn_date.lt.{d},and(txn_date.eq.{d},id.lt.{i})")
+    response = await (
+        query
+        .order("txn_date", desc=True)
+        .order("id", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return response.data or []
 
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
 
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
+@router.get("/export/csv", status_code=status.HTTP_200_OK)
+async def export_transactions_csv(
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
+):
+    """Stream every transaction (newest first) and subscription of the user as CSV.
 
-        accounts_response = (
+    Transactions are read in keyset-paginated pages of ``EXPORT_PAGE_SIZE`` and
+    written out page by page, so memory stays flat whatever the export size.
+    """
+    try:
+        accounts_response = await (
             supabase.schema("finance")
             .table("accounts")
             .select("id, name, currency")
@@ -107,20 +300,10 @@ async def export_transactions_csv(
         account_map = {acc["id"]: acc for acc in accounts}
         account_ids = list(account_map.keys())
 
-        transactions = []
         subscriptions = []
+        first_page = []
         if account_ids:
-            transactions_response = (
-                supabase.schema("finance")
-                .table("transactions")
-                .select("*")
-                .in_("account_id", account_ids)
-                .order("txn_date", desc=True)
-                .execute()
-            )
-            transactions = transactions_response.data or []
-
-            subscriptions_response = (
+            subscriptions_response = await (
                 supabase.schema("finance")
                 .table("subscriptions")
                 .select("*")
@@ -128,18 +311,27 @@ async def export_transactions_csv(
                 .execute()
             )
             subscriptions = subscriptions_response.data or []
+            # Fetched before the response starts so an early failure is still a clean 400
+            first_page = await _fetch_transaction_page(supabase, account_ids, None, EXPORT_PAGE_SIZE)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Export CSV failed: {e}")
+
+    # Category names, looked up once per id as pages bring new ones
+    category_map: dict = {}
 
-        # Build category name lookup
-        all_category_ids = list({
-            t["category_id"] for t in transactions + subscriptions
-            if t.get("category_id")
-        })
-        category_map = _build_category_map(supabase, all_category_ids)
+    async def category_names(items: list[dict]) -> None:
+        missing = list({i["category_id"] for i in items if i.get("category_id")} - category_map.keys())
+        if missing:
+            found = await _build_category_map(supabase, missing)
+            category_map.update({cat_id: found.get(cat_id, {}) for cat_id in missing})
 
-        output = io.StringIO()
-        writer = csv.writer(output)
+    def category_name(cat_id) -> str:
+        return category_map.get(cat_id, {}).get("name", cat_id) if cat_id else ""
 
-        writer.writerow([
+    async def generate():
+        yield _csv_chunk([[
             "Account Name",
             "Account Currency",
             "Date",
@@ -149,91 +341,105 @@ async def export_transactions_csv(
             "Amount (Minor)",
             "Currency",
             "Type"
-        ])
-
-        for txn in transactions:
-            acc = account_map.get(txn.get("account_id"), {})
-            cat_id = txn.get("category_id", "")
-            cat_name = category_map.get(cat_id, {}).get("name", cat_id) if cat_id else ""
-            writer.writerow([
-                acc.get("name", "Unknown Account"),
-                acc.get("currency", ""),
-                txn.get("txn_date", ""),
-                txn.get("description", ""),
-                txn.get("merchant", ""),
-                cat_name,
-                txn.get("amount_minor", 0),
-                txn.get("currency", ""),
-                txn.get("type", "")
-            ])
-
-        for sub in subscriptions:
-            acc = account_map.get(sub.get("account_id"), {})
-            cat_id = sub.get("category_id", "")
-            cat_name = category_map.get(cat_id, {}).get("name", cat_id) if cat_id else ""
-            writer.writerow([
-                acc.get("name", "Unknown Account"),
-                acc.get("currency", ""),
-                sub.get("start_date", ""),
-                f"Subscription ({sub.get('every_n', 1)} {sub.get('unit', 'month')})",
-                sub.get("merchant", ""),
-                cat_name,
-                -abs(int(sub.get("amount_minor", 0))),
-                sub.get("currency", ""),
-                "subscription"
-            ])
-
-        return Response(
-            content=output.getvalue(),
-            media_type="text/csv",
-            headers={"Content-Disposition": 'attachment; filename="transactions_export.csv"'}
-        )
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Export CSV failed: {e}")
+        ]])
+
+        page = first_page
+        try:
+            while page:
+                await category_names(page)
+                rows = []
+                for txn in page:
+                    acc = account_map.get(txn.get("account_id"), {})
+                    rows.append([
+                        acc.get("name", "Unknown Account"),
+                        acc.get("currency", ""),
+                        txn.get("txn_date", ""),
+                        txn.get("description", ""),
+                        txn.get("merchant", ""),
+                        category_name(txn.get("category_id", "")),
+                        txn.get("amount_minor", 0),
+                        txn.get("currency", ""),
+                        txn.get("type", "")
+                    ])
+                yield _csv_chunk(rows)
+
+                # Only an empty page ends the loop: PostgREST's max-rows can cap a
+                # page below EXPORT_PAGE_SIZE, so a short page is not the last one
+                last = page[-1]
+                page = await _fetch_transaction_page(
+                    supabase, account_ids, (last["txn_date"], last["id"]), EXPORT_PAGE_SIZE
+                )
+
+            await category_names(subscriptions)
+            rows = []
+            for sub in subscriptions:
+                acc = account_map.get(sub.get("account_id"), {})
+                rows.append([
+                    acc.get("name", "Unknown Account"),
+                    acc.get("currency", ""),
+                    sub.get("start_date", ""),
+                    f"Subscription ({sub.get('every_n', 1)} {sub.get('unit', 'month')})",
+                    sub.get("merchant", ""),
+                    category_name(sub.get("category_id", "")),
+                    -abs(int(sub.get("amount_minor", 0))),
+                    sub.get("currency", ""),
+                    "subscription"
+                ])
+            if rows:
+                yield _csv_chunk(rows)
+        except Exception:
+            # Headers are already sent; re-raising aborts the chunked response so the
+            # client sees a failed download instead of a CSV that looks complete
+            logger.exception("CSV export for user %s stopped mid-stream", user.id)
+            raise
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="transactions_export.csv"'}
+    )
 
 
 @router.get("/{account_id}", status_code=status.HTTP_200_OK)
 async def get_transactions(
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
     account_id: str | None = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    before: str | None = Query(None, description="`next_cursor` of the previous page"),
+    date_from: date | None = Query(None, alias="from", description="Earliest txn_date (inclusive)"),
+    date_to: date | None = Query(None, alias="to", description="Latest txn_date (inclusive)"),
 ):
+    """One page of an account's transactions, newest first (`txn_date`, then `id`)."""
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-
-        supabase.auth.set_session(access, refresh)
-
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
         if not account_id:
             raise HTTPException(status_code=400, detail="Missing account_id")
-
-        transactions_response = (
-            supabase.schema("finance")
-            .table("transactions")
-            .select("*")
-            .eq("account_id", account_id)
-            .execute()
-        )
-        transactions = transactions_response.data or []
+        if date_from and date_to and date_from > date_to:
+            raise HTTPException(status_code=400, detail="from must be on or before to")
+
+        key = None
+        if before:
+            state = decode_cursor(before)
+            if not isinstance(state.get("d"), str) or state.get("i") is None:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            key = (state["d"], str(state["i"]))
+
+        page = await _fetch_transaction_page(supabase, [account_id], key, limit + 1, date_from, date_to)
+        transactions = page[:limit]
+        next_cursor = None
+        if len(page) > limit:
+            last = transactions[-1]
+            next_cursor = encode_cursor({"d": last["txn_date"], "i": last["id"]})
 
         # Enrich with category name + icon
         category_ids = list({t["category_id"] for t in transactions if t.get("category_id")})
-        category_map = _build_category_map(supabase, category_ids)
+        category_map = await _build_category_map(supabase, category_ids)
 
         for txn in transactions:
             cat_id = txn.get("category_id")
             txn["category"] = category_map.get(cat_id) if cat_id else None
 
-        return {"user": user.model_dump(), "rows": transactions}
+        return {"user": user.model_dump(), "rows": transactions, "next_cursor": next_cursor}
 
     except HTTPException:
         raise
@@ -245,16 +451,10 @@ async def get_transactions(
 async def delete_transaction(
     id: str,
     account_id: str,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-
-        supabase.auth.set_session(access, refresh)
-
-        response = (
+        response = await (
             supabase.schema("finance")
             .table("transactions")
             .delete()
@@ -0,0 +1,130 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from app.utils.external.exchangeRate.fx_rates import PIVOT_CURRENCY
+from .positions import DIVISOR
+
+# Calendar offsets for /investments/history; ALL starts at the first trade.
+HISTORY_RANGES = {
+    "1M": pd.DateOffset(months=1),
+    "3M": pd.DateOffset(months=3),
+    "6M": pd.DateOffset(months=6),
+    "YTD": None,
+    "1Y": pd.DateOffset(years=1),
+    "5Y": pd.DateOffset(years=5),
+    "ALL": None,
+}
+
+
+def history_start(range_: str, first_trade: date, today: date) -> date:
+    """First day of the series: the range start, never before the first trade."""
+    if range_ == "ALL":
+        start = first_trade
+    elif range_ == "YTD":
+        start = date(today.year, 1, 1)
+    else:
+        start = (pd.Timestamp(today) - HISTORY_RANGES[range_]).date()
+    return max(start, first_trade)
+
+
+def _daily_grid(closes: pd.Series | None, days: pd.DatetimeIndex) -> np.ndarray:
+    """Closes keyed by exchange-local trading day, carried forward onto every calendar day."""
+    if closes is None or closes.empty:
+        return np.full(len(days), np.nan)
+    index = closes.index
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    by_day = pd.Series(closes.to_numpy(dtype=float), index=index.normalize())
+    by_day = by_day[~by_day.index.duplicated(keep="last")].sort_index()
+    return by_day.reindex(days, method="ffill").to_numpy()
+
+
+def build_value_history(
+    trades: list[dict],
+    currency_map: dict[str, str],
+    closes: dict[str, pd.Series],
+    pivot_closes: dict[str, pd.Series],
+    fallback_rates: dict[str, float],
+    base_currency: str,
+    start: date,
+    end: date,
+) -> pd.DataFrame:
+    """Daily portfolio value in ``base_currency`` between ``start`` and ``end``.
+
+    Quantities come from a cumulative sum of signed trade quantities on a
+    day × ticker grid; prices are daily closes carried forward over weekends and
+    holidays and converted with that day's ``USDXXX=X`` close (``fallback_rates``,
+    units per USD, where no history exists). The value of each day is the row-wise
+    dot product of the two grids. ``net_invested`` is the cumulative cash put in
+    (buys plus fees, minus sale proceeds), converted at the same daily rates.
+
+    Held tickers without a close on a day (no history yet, or the download
+    failed) count as 0. Returns a frame indexed by day with ``value`` and
+    ``net_invested``.
+    """
+    days = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq="D")
+    tickers = sorted({trade["ticker"].upper() for trade in trades})
+    if not tickers or days.empty:
+        return pd.DataFrame({"value": [], "net_invested": []}, index=days[:0])
+
+    ledger = pd.DataFrame({
+        "day": pd.to_datetime([str(trade["trade_date"])[:10] for trade in trades]),
+        "ticker": [trade["ticker"].upper() for trade in trades],
+        "sign": [1.0 if trade["type"].lower() == "buy" else -1.0 for trade in trades],
+        "quantity": [float(trade["quantity"]) for trade in trades],
+        "cash": [
+            (int(trade["gross_minor"]) + (1 if trade["type"].lower() == "buy" else -1) * int(trade.get("fee_minor") or 0))
+            / DIVISOR
+            for trade in trades
+        ],
+    })
+    # Trades before the window fold into its first day so the cumulative sum starts from the right holdings
+    ledger["day"] = ledger["day"].clip(lower=days[0])
+    ledger = ledger[ledger["day"] <= days[-1]]
+
+    deltas = (
+        (ledger["sign"] * ledger["quantity"])
+        .groupby([ledger["day"], ledger["ticker"]]).sum()
+        .unstack(fill_value=0.0)
+        .reindex(index=days, columns=tickers, fill_value=0.0)
+    )
+    quantities = np.clip(deltas.to_numpy().cumsum(axis=0), 0.0, None)
+
+    invested = (
+        (ledger["sign"] * ledger["cash"])
+        .groupby([ledger["day"], ledger["ticker"]]).sum()
+        .unstack(fill_value=0.0)
+        .reindex(index=days, columns=tickers, fill_value=0.0)
+        .to_numpy()
+        .cumsum(axis=0)
+    )
+
+    prices = np.column_stack([_daily_grid(closes.get(ticker), days) for ticker in tickers])
+
+    # Units of base currency per unit of each ticker's currency, per day
+    currencies = sorted({currency_map.get(ticker, PIVOT_CURRENCY).upper() for ticker in tickers} | {base_currency})
+    per_pivot = {}
+    for cur in currencies:
+        if cur == PIVOT_CURRENCY:
+            per_pivot[cur] = np.ones(len(days))
+            continue
+        grid = _daily_grid(pivot_closes.get(cur), days)
+        # Days before the first stored rate use the earliest one, then the live rate
+        grid = pd.Series(grid).bfill().fillna(fallback_rates.get(cur, np.nan)).to_numpy()
+        per_pivot[cur] = grid
+    fx = np.column_stack([
+        per_pivot[base_currency] / per_pivot[currency_map.get(ticker, PIVOT_CURRENCY).upper()]
+        for ticker in tickers
+    ])
+
+    # A currency without any rate is counted 1:1, as in the portfolio summary
+    fx = np.nan_to_num(fx, nan=1.0)
+    values = np.einsum("ij,ij->i", quantities, np.nan_to_num(prices * fx))
+    net_invested = np.einsum("ij,ij->i", invested, fx)
+
+    return pd.DataFrame(
+        {"value": values, "net_invested": net_invested},
+        index=days,
+    )
@@ -1,185 +1,222 @@
-from fastapi import APIRouter, HTTPException, Depends, Body
-from app.dependencies import get_supabase, get_user_token
-from collections import defaultdict
+from fastapi import APIRouter, HTTPException, Depends, Body, Query, Request
+from app.dependencies import get_current_user, get_supabase_for_user
+from postgrest.types import ReturnMethod
+from app.utils.blocking import run_blocking
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.external.exchangeRate.fx_rates import PIVOT_CURRENCY, FXRates, fx_service, user_base_currency
+from app.utils.external.yfinance.quote_cache import last_quotes
+from app.utils.external.yfinance.symbol_cache import symbol_cache
+from app.utils.external.yfinance.yfinance_api import load_daily_bars
+from app.utils.single_flight import yfinance_flight
+from app.utils.streams import iter_lines
+from .history import HISTORY_RANGES, build_value_history, history_start
+from .lots import open_lots, realize_trades
+from .trade_import import IMPORT_BATCH_SIZE, ImportTooLargeError, parse_statement
+from .positions import (
+    DIVISOR,
+    InsufficientSharesError,
+    fetch_held_quantity,
+    fetch_position_currency,
+    fetch_trade_page,
+    fetch_trades,
+    insert_sell,
+    load_snapshot,
+    record_trade,
+    replay_trades,
+    resync_snapshot,
+    snapshot_trades,
+)
+import asyncio
+import csv
+import logging
+import os
+import numpy as np
 import yfinance as yf
-from datetime import date
-from typing import Any
+from datetime import date, datetime, timezone
+from typing import Any, Callable
 
 router = APIRouter(prefix="/investments", tags=["investments"])
 
-DIVISOR = 10000.0
-BASE_CURRENCY = "EUR"
+logger = logging.getLogger("app.routers.investments")
+
+YFINANCE_CALL_TIMEOUT_SECONDS = float(os.getenv("YFINANCE_CALL_TIMEOUT_SECONDS", "10"))
+PORTFOLIO_DEADLINE_SECONDS = float(os.getenv("PORTFOLIO_DEADLINE_SECONDS", "5"))
+
+
+def _iso_timestamp(epoch_seconds: float) -> str:
+    return datetime.fromtimestamp(epoch_seconds, timezone.utc).isoformat()
+
+
+def _last_price(t_obj) -> float | None:
+    return t_obj.fast_info.get("lastPrice") or t_obj.fast_info.get("previousClose")
+
+
+def _fetch_ticker_quote(ticker: str) -> dict:
+    """Blocking yfinance lookup of price and info for one ticker."""
+    t_obj = yf.Ticker(ticker)
+    price = _last_price(t_obj) or 0.0
+    return {"price": float(price), "info": t_obj.info or {}}
+
+
+async def _fetch_each(
+    symbols: list[str],
+    fetch: Callable[[str], Any],
+    timeout: float | None = None,
+) -> tuple[dict[str, Any], dict[str, float]]:
+    """Run ``fetch`` for every symbol at once on the blocking pool.
+
+    Each call is bounded by ``YFINANCE_CALL_TIMEOUT_SECONDS`` and shared with
+    concurrent requests for the same symbol; the whole batch is bounded by
+    ``timeout``. Symbols that fail or miss the deadline fall back to their last
+    known value. Returns the values and, for those fallbacks, when they were fetched.
+    """
+    if not symbols:
+        return {}, {}
+
+    async def fetch_and_remember(symbol: str) -> Any:
+        value = await asyncio.wait_for(run_blocking(fetch, symbol), YFINANCE_CALL_TIMEOUT_SECONDS)
+        last_quotes.put(symbol, value)
+        return value
+
+    tasks = {
+        asyncio.ensure_future(
+            yfinance_flight.do((symbol, "quote", None), lambda symbol=symbol: fetch_and_remember(symbol))
+        ): symbol
+        for symbol in symbols
+    }
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    # Late lookups keep running in the single-flight layer and still refresh last_quotes
+    for task in pending:
+        task.cancel()
+
+    results: dict[str, Any] = {}
+    stale_since: dict[str, float] = {}
+    for task, symbol in tasks.items():
+        if task in done and task.exception() is None:
+            results[symbol] = task.result()
+            continue
+        reason = "deadline" if task in pending else type(task.exception()).__name__
+        logger.warning("yfinance lookup for %s failed: %s", symbol, reason)
+        known = last_quotes.get(symbol)
+        if known is not None:
+            results[symbol], stale_since[symbol] = known
+    return results, stale_since
+
+
+async def _load_ticker_quotes(
+    unique_tickers: list[str],
+    timeout: float | None = None,
+) -> tuple[dict, dict, dict]:
+    """Price and info maps, plus the fetch time of any last-known fallback."""
+    quotes, stale_since = await _fetch_each(unique_tickers, _fetch_ticker_quote, timeout)
+    current_prices = {ticker: q["price"] for ticker, q in quotes.items()}
+    info_map = {ticker: q["info"] for ticker, q in quotes.items()}
+    return current_prices, info_map, stale_since
+
+
+async def _resolve_trade_tickers(tickers: list[str]) -> dict[str, str | None]:
+    """Tradable symbol per ticker (``-USD`` crypto pair as fallback), ``None`` if unsupported."""
+    symbols = await symbol_cache.resolve(tickers)
+    return {ticker: info.symbol if info else None for ticker, info in symbols.items()}
+
+
+async def _resolve_currencies(tickers: list[str]) -> dict[str, str]:
+    """Trading currency per ticker; tickers Yahoo cannot resolve right now are left out."""
+    symbols = await symbol_cache.resolve(tickers)
+    return {ticker: symbols[ticker.upper()].currency for ticker in tickers if symbols.get(ticker.upper())}
+
+
+def _portfolio_summary(
+    cash: dict[str, float],
+    total_market: float,
+    total_cost: float,
+    total_cash: float,
+    base_currency: str,
+    fx: FXRates,
+    stale: bool,
+) -> dict:
+    """The ``summary`` block of ``GET /investments/``; totals are in ``base_currency``."""
+    return {
+        "cash": cash,
+        "total_market_value": round(total_market, 2),
+        "total_cost_basis": round(total_cost, 2),
+        "total_unrealized_pl": round(total_market - total_cost, 2),
+        "total_portfolio_value": round(total_market + total_cash, 2),
+        "base_currency": base_currency,
+        "as_of_date": date.today().isoformat(),
+        "fx_as_of": _iso_timestamp(fx.fetched_at) if fx.fetched_at else None,
+        "stale": stale,
+    }
 
 
 @router.get("/")
 async def get_investments(
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    include_dates: bool = Query(
+        False, description="Embed per-trade `dates` snapshots (reads every trade of open positions); prefer /{ticker}/trades"
+    ),
+    deadline_seconds: float = Query(
+        PORTFOLIO_DEADLINE_SECONDS, gt=0, le=60, description="Time budget for live quotes and FX rates"
+    ),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_seconds
+    base_currency = user_base_currency(user)
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized: No valid session")
-
-        response = (
-            supabase.schema("invest")
-            .table("trades")
-            .select("*")
-            .eq("user_id", user.id)
-            .order("trade_date", desc=False)
-            .order("created_at", desc=False)
-            .execute()
-        )
-        trades = response.data
+        holdings, cash_minor_per_cur = await load_snapshot(supabase, user.id, _resolve_currencies)
+
+        # Positions whose currency was a fallback get rebuilt once Yahoo knows the symbol again
+        unverified = [ticker for ticker, h in holdings.items() if not h.get("currency_verified", True)]
+        if unverified and await _resolve_currencies(unverified):
+            await resync_snapshot(supabase, user.id, _resolve_currencies)
+            holdings, cash_minor_per_cur = await load_snapshot(supabase, user.id, _resolve_currencies)
 
-        if not trades:
+        if not holdings and not cash_minor_per_cur:
             return {
                 "positions": [],
-                "summary": {
-                    "cash": {},
-                    "total_market_value": 0.0,
-                    "total_cost_basis": 0.0,
-                    "total_unrealized_pl": 0.0,
-                    "total_portfolio_value": 0.0,
-                    "base_currency": BASE_CURRENCY,
-                    "as_of_date": date.today().isoformat(),
-                }
+                "summary": _portfolio_summary({}, 0.0, 0.0, 0.0, base_currency, fx_service.current, stale=False),
             }
 
-
-        unique_tickers = list({trade["ticker"].upper() for trade in trades if trade.get("ticker")})
-
-
-        info_map: dict[str, dict] = {}
-        current_prices: dict[str, float] = {}
-        ticker_currency_map: dict[str, str] = {}
-
-        if unique_tickers:
-            tickers_obj = yf.Tickers(" ".join(unique_tickers))
-            for ticker in unique_tickers:
-                t_obj = tickers_obj.tickers.get(ticker)
-                if not t_obj:
-                    current_prices[ticker] = 0.0
-                    info_map[ticker] = {}
-                    ticker_currency_map[ticker] = "USD"
-                    continue
-
-                price = t_obj.fast_info.get("lastPrice") or t_obj.fast_info.get("previousClose") or 0.0
-                current_prices[ticker] = float(price)
-                info_map[ticker] = t_obj.info
-                currency = t_obj.info.get("currency") or t_obj.info.get("financialCurrency") or "USD"
-                ticker_currency_map[ticker] = currency
-
-
-        holdings = defaultdict(lambda: {"quantity": 0.0, "cost_minor": 0.0, "currency": "USD"})
-        cash_minor_per_cur = defaultdict(int)
-        # per-ticker per-trade records in chronological order
-        dates_by_ticker: dict[str, list[dict]] = defaultdict(list)
-
-        for trade in trades:
-            ticker = trade["ticker"].upper()
-            currency = ticker_currency_map.get(ticker, "USD")
-
-            gross_minor = int(trade["gross_minor"])
-            fee_minor = int(trade.get("fee_minor") or 0)
-            qty = float(trade["quantity"])
-            ttype = trade["type"].lower()
-
-            # compute per-trade price, fee, gross
-            tdate = trade.get("trade_date")
-            trade_date_str = str(tdate) if tdate is not None else None
-            trade_gross = (gross_minor / DIVISOR)
-            trade_fee = (fee_minor / DIVISOR)
-            entry_price = (trade_gross / qty) if qty not in (0.0, 0) else 0.0
-
-            # Cash impact
-            if ttype == "buy":
-                cash_minor_per_cur[currency] -= (gross_minor + fee_minor)
-            elif ttype == "sell":
-                cash_minor_per_cur[currency] += (gross_minor - fee_minor)
-
-
-            h = holdings[ticker]
-            h["currency"] = currency
-
-            # apply trade to running position
-            if ttype == "buy":
-                h["cost_minor"] += gross_minor + fee_minor
-                h["quantity"] += qty
-            elif ttype == "sell":
-                if h["quantity"] > 1e-9:
-                    avg_cost = h["cost_minor"] / h["quantity"]
-                    cost_to_remove = avg_cost * qty
-                    h["cost_minor"] = max(0.0, h["cost_minor"] - cost_to_remove)
-                h["quantity"] -= qty
-                if h["quantity"] < 0:
-                    h["quantity"] = 0.0
-
-            # snapshot after trade
-            pos_qty = h["quantity"]
-            cost_basis_after = h["cost_minor"] / DIVISOR
-            avg_entry_after = (cost_basis_after / pos_qty) if pos_qty > 0 else 0.0
-
-            dates_by_ticker[ticker].append({
-                "id": trade.get("id"),
-                "date": trade_date_str,
-                "type": ttype,
-                "quantity": round(qty, 8),
-                "entry_price": round(entry_price, 4),
-                "gross": round(trade_gross, 2),
-                "fee": round(trade_fee, 2),
-                "position_quantity": round(pos_qty, 8),
-                "avg_entry_price": round(avg_entry_after, 4),
-                "cost_basis": round(cost_basis_after, 2),
-            })
-
         open_holdings = {t: h for t, h in holdings.items() if h["quantity"] > 0.001}
-
+        open_tickers = list(open_holdings)
 
         used_currencies = (
             {h["currency"] for h in holdings.values()}
             | set(cash_minor_per_cur.keys())
-            | {BASE_CURRENCY}
+            | {base_currency}
         )
 
-        fx_tickers = []
-        for cur in used_currencies:
-            if cur != BASE_CURRENCY:
-                fx_tickers.append(f"{cur}{BASE_CURRENCY}=X")
-                fx_tickers.append(f"{BASE_CURRENCY}{cur}=X")
-
-        fx_tickers = list(set(fx_tickers))
-        if fx_tickers:
-            fx_obj = yf.Tickers(" ".join(fx_tickers))
-            for ft in fx_tickers:
-                ft_upper = ft.upper()
-                f_obj = fx_obj.tickers.get(ft_upper)
-                if f_obj:
-                    rate = f_obj.fast_info.get("lastPrice") or f_obj.fast_info.get("previousClose") or 0.0
-                    current_prices[ft_upper] = float(rate)
-
-        def get_conversion_rate(from_cur: str) -> float:
-            if from_cur == BASE_CURRENCY:
-                return 1.0
-            direct = f"{from_cur}{BASE_CURRENCY}=X".upper()
-            rate = current_prices.get(direct)
-            if rate and rate > 0:
-                return rate
-            inverse = f"{BASE_CURRENCY}{from_cur}=X".upper()
-            inv_rate = current_prices.get(inverse)
-            if inv_rate and inv_rate > 0:
-                return 1 / inv_rate
-            return 1.0  # fallback
+        async def load_dates() -> dict[str, list[dict]]:
+            # per-ticker per-trade records in chronological order
+            if not include_dates or not open_tickers:
+                return {}
+            open_trades = await fetch_trades(supabase, user.id, open_tickers)
+            _, _, dates = replay_trades(open_trades, {t: h["currency"] for t, h in open_holdings.items()})
+            return dates
 
+        async def load_fx(timeout: float) -> tuple[FXRates, bool]:
+            try:
+                rates = await asyncio.wait_for(asyncio.shield(fx_service.get_rates(used_currencies)), timeout)
+                return rates, False
+            except asyncio.TimeoutError:
+                return fx_service.current, True
+
+        # Quotes, FX rates and the trade history all load at once; whatever
+        # misses the deadline falls back to its last known value
+        remaining = max(0.0, deadline - loop.time())
+        (current_prices, info_map, stale_since), (fx, fx_late), dates_by_ticker = await asyncio.gather(
+            _load_ticker_quotes(open_tickers, remaining),
+            load_fx(remaining),
+            load_dates(),
+        )
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        # Asset types of symbols validated earlier, without a network call
+        symbols = symbol_cache.peek(open_tickers)
 
         positions = []
-        total_market_base = 0.0
-        total_cost_base = 0.0
-        total_cash_base = 0.0
+        market_values: list[float] = []
+        cost_bases: list[float] = []
 
         for ticker, h in open_holdings.items():
             info = info_map.get(ticker, {})
@@ -196,11 +233,13 @@ async def get_investments(
                 "ticker": ticker,
                 "name": info.get("longName") or info.get("shortName") or ticker.split("-")[0],
                 "asset_type": (
+                    symbols[ticker].asset_type if ticker in symbols else
                     "cryptocurrency" if info.get("quoteType") == "CRYPTOCURRENCY" else
                     "etf" if info.get("quoteType") == "ETF" else
                     "stock"
                 ),
                 "currency": currency,
+                "currency_verified": h.get("currency_verified", True),
                 "quantity": round(quantity, 8),
                 "avg_entry_price": round(avg_entry, 4),
                 "current_price": round(price, 4),
@@ -209,29 +248,48 @@ async def get_investments(
                 "unrealized_pl": round(unrealized_pl, 2),
                 "unrealized_pl_pct": round(unrealized_pl_pct, 2),
                 "dates": dates_by_ticker.get(ticker, []),
+                "stale": ticker in stale_since or ticker not in current_prices,
+                "price_as_of": (
+                    _iso_timestamp(stale_since[ticker]) if ticker in stale_since
+                    else fetched_at if ticker in current_prices
+                    else None
+                ),
             })
-
-            rate = get_conversion_rate(currency)
-            total_market_base += market_value * rate
-            total_cost_base += cost_basis * rate
+            market_values.append(market_value)
+            cost_bases.append(cost_basis)
 
         cash_converted: dict[str, float] = {}
+        cash_amounts: list[float] = []
         for cur, minor in cash_minor_per_cur.items():
             amount = minor / DIVISOR
             if abs(amount) >= 0.01:
                 cash_converted[cur] = round(amount, 2)
-            rate = get_conversion_rate(cur)
-            total_cash_base += amount * rate
-
-        summary = {
-            "cash": cash_converted,
-            "total_market_value": round(total_market_base, 2),
-            "total_cost_basis": round(total_cost_base, 2),
-            "total_unrealized_pl": round(total_market_base - total_cost_base, 2),
-            "total_portfolio_value": round(total_market_base + total_cash_base, 2),
-            "base_currency": BASE_CURRENCY,
-            "as_of_date": date.today().isoformat(),
-        }
+            cash_amounts.append(amount)
+
+        # Convert every market value, cost basis and cash balance in one pass;
+        # amounts without a known rate are counted 1:1 and flag the summary stale
+        position_currencies = [h["currency"] for h in open_holdings.values()]
+        amounts = np.array(market_values + cost_bases + cash_amounts, dtype=float)
+        converted = fx.convert(
+            amounts, position_currencies + position_currencies + list(cash_minor_per_cur), base_currency
+        )
+        fx_unavailable = bool(np.isnan(converted).any())
+        converted = np.where(np.isnan(converted), amounts, converted)
+
+        n = len(market_values)
+        total_market_base = float(converted[:n].sum())
+        total_cost_base = float(converted[n:2 * n].sum())
+        total_cash_base = float(converted[2 * n:].sum())
+
+        summary = _portfolio_summary(
+            cash_converted,
+            total_market_base,
+            total_cost_base,
+            total_cash_base,
+            base_currency,
+            fx,
+            stale=any(p["stale"] or not p["currency_verified"] for p in positions) or fx_late or fx_unavailable,
+        )
 
         # sort by total market value per ticker
         def ticker_market_value(item: dict) -> float:
@@ -248,21 +306,168 @@ async def get_investments(
         raise HTTPException(status_code=500, detail=f"Portfolio calculation failed: {str(e)}")
 
 
+async def _trade_currencies(supabase, user_id: str, tickers: list[str]) -> dict[str, str]:
+    """Trading currency of every ticker the user has traded, from the snapshot where possible."""
+    holdings, _ = await load_snapshot(supabase, user_id, _resolve_currencies)
+    currency_map = {ticker: h["currency"] for ticker, h in holdings.items()}
+    unresolved = [ticker for ticker in tickers if ticker not in currency_map]
+    if unresolved:
+        currency_map.update(await _resolve_currencies(unresolved))
+    return currency_map
+
+
+@router.get("/history")
+async def get_investment_history(
+    range: str = Query("1Y", description=f"One of {', '.join(HISTORY_RANGES)}"),
+    format: str = Query("rows", pattern="^(rows|columnar)$"),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
+):
+    """Daily total portfolio value, valued from the trade ledger and stored daily closes."""
+    range_ = range.strip().upper()
+    if range_ not in HISTORY_RANGES:
+        raise HTTPException(400, f"Unknown range {range}; expected one of {', '.join(HISTORY_RANGES)}")
+
+    base_currency = user_base_currency(user)
+    today = date.today()
+    try:
+        trades = await fetch_trades(supabase, user.id)
+        tickers = sorted({trade["ticker"].upper() for trade in trades if trade.get("ticker")})
+        if not tickers:
+            empty = {"t": [], "v": [], "invested": []} if format == "columnar" else []
+            return {"range": range_, "base_currency": base_currency, "points": empty, "missing_prices": []}
+
+        currency_map = await _trade_currencies(supabase, user.id, tickers)
+
+        first_trade = min(date.fromisoformat(str(trade["trade_date"])[:10]) for trade in trades)
+        start = history_start(range_, first_trade, today)
+        fx_currencies = sorted(
+            ({currency_map.get(ticker, PIVOT_CURRENCY).upper() for ticker in tickers} | {base_currency}) - {PIVOT_CURRENCY}
+        )
+
+        async def closes(symbol: str):
+            try:
+                return (await load_daily_bars(symbol))["Close"].dropna()
+            except Exception as exc:
+                logger.warning("Daily bars for %s unavailable: %s", symbol, exc)
+                return None
+
+        # Every ticker's and every currency's daily closes load at once from the OHLC store
+        *series, fx = await asyncio.gather(
+            *(closes(ticker) for ticker in tickers),
+            *(closes(f"{PIVOT_CURRENCY}{cur}=X") for cur in fx_currencies),
+            fx_service.get_rates(fx_currencies),
+        )
+        ticker_closes = dict(zip(tickers, series[:len(tickers)]))
+        pivot_closes = dict(zip(fx_currencies, series[len(tickers):]))
+        fallback_rates = {cur: fx.rate(PIVOT_CURRENCY, cur) for cur in fx_currencies if fx.has(cur)}
+
+        frame = await run_blocking(
+            build_value_history,
+            trades,
+            currency_map,
+            ticker_closes,
+            pivot_closes,
+            fallback_rates,
+            base_currency,
+            start,
+            today,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Portfolio history failed: {str(e)}")
+
+    timestamps = frame.index.as_unit("ms").asi8.tolist()
+    values = frame["value"].round(2).tolist()
+    invested = frame["net_invested"].round(2).tolist()
+    if format == "columnar":
+        points = {"t": timestamps, "v": values, "invested": invested}
+    else:
+        points = [
+            {"timestamp": ts, "value": value, "net_invested": inv}
+            for ts, value, inv in zip(timestamps, values, invested)
+        ]
+    return {
+        "range": range_,
+        "base_currency": base_currency,
+        "points": points,
+        "missing_prices": [ticker for ticker, closes_ in ticker_closes.items() if closes_ is None or closes_.empty],
+    }
+
+
+@router.get("/realized")
+async def get_realized_pl(
+    method: str = Query("fifo", pattern="^(fifo|average)$", description="Lot matching method"),
+    year: int | None = Query(None, description="Only list sells from this tax (calendar) year"),
+    include_lots: bool = Query(False, description="Also return the remaining open lots per ticker"),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
+):
+    """Realized P&L per sell and per tax year from matching sells against open lots."""
+    try:
+        trades = await fetch_trades(supabase, user.id)
+        tickers = sorted({trade["ticker"].upper() for trade in trades if trade.get("ticker")})
+        currency_map = await _trade_currencies(supabase, user.id, tickers) if tickers else {}
+        sells, by_year, books = await run_blocking(realize_trades, trades, currency_map, method)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Realized P&L calculation failed: {str(e)}")
+
+    if year is not None:
+        sells = [sell for sell in sells if (sell["date"] or "").startswith(f"{year:04d}")]
+    result = {"method": method, "sells": sells, "by_year": by_year}
+    if include_lots:
+        result["open_lots"] = open_lots(books)
+    return result
+
+
+@router.get("/{ticker}/trades")
+async def get_ticker_trades(
+    ticker: str,
+    cursor: str | None = Query(None, description="`next_cursor` of the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
+):
+    """Per-trade position snapshots for one ticker, oldest first, one page at a time.
+
+    The cursor carries the last trade's sort key and the running position after
+    it, so every page costs O(limit) no matter how long the history is.
+    """
+    ticker = ticker.strip().upper()
+    state = decode_cursor(cursor) if cursor else {}
+    try:
+        after = (str(state["d"]), str(state["c"]), str(state["i"])) if state else None
+        quantity = float(state.get("q", 0.0))
+        cost_minor = float(state.get("cost", 0.0))
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(400, "Invalid cursor")
+
+    try:
+        trades = await fetch_trade_page(supabase, user.id, ticker, after, limit + 1)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Trade history failed: {str(e)}")
+
+    page = trades[:limit]
+    items, position = snapshot_trades(page, quantity, cost_minor)
+    next_cursor = None
+    if len(trades) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor({
+            "d": last["trade_date"],
+            "c": last["created_at"],
+            "i": last["id"],
+            "q": position["quantity"],
+            "cost": position["cost_minor"],
+        })
+    return {"ticker": ticker, "items": items, "next_cursor": next_cursor}
+
+
 @router.post("/")
 async def create_trade(
     request: Any = Body(...),
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized")
-
         payload = request.model_dump(exclude_none=True) if hasattr(request, "model_dump") else request
 
         ticker = payload["ticker"].strip().upper()
@@ -282,15 +487,10 @@ async def create_trade(
         trade_date = payload.get("trade_date") or date.today().isoformat()
 
 
-        test_ticker = ticker
-        t = yf.Ticker(test_ticker)
-        if not (t.fast_info.get("lastPrice") or t.fast_info.get("previousClose")):
-            crypto_ticker = f"{ticker}-USD"
-            t2 = yf.Ticker(crypto_ticker)
-            if t2.fast_info.get("lastPrice") or t2.fast_info.get("previousClose"):
-                ticker = crypto_ticker
-            else:
-                raise HTTPException(400, "Invalid or unsupported ticker")
+        resolved = (await _resolve_trade_tickers([ticker]))[ticker]
+        if not resolved:
+            raise HTTPException(400, "Invalid or unsupported ticker")
+        ticker = resolved
 
         gross = quantity * price
         gross_minor = int(round(gross * DIVISOR))
@@ -306,18 +506,92 @@ async def create_trade(
             "trade_date": trade_date,
         }
 
-        supabase.schema("invest").table("trades").insert(trade_data).execute()
+        insert_resp = await supabase.schema("invest").table("trades").insert(trade_data).execute()
+        inserted = (insert_resp.data or [trade_data])[0]
+        await record_trade(supabase, user.id, inserted, _resolve_currencies)
 
         return {"status": "success", "ticker": ticker}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Trade creation failed: {str(e)}")
 
+@router.post("/import")
+async def import_trades(
+    request: Request,
+    format: str | None = Query(
+        None, pattern="^(csv|ndjson)$", description="Statement format; defaults from Content-Type, else CSV"
+    ),
+    dry_run: bool = Query(False, description="Validate only, insert nothing"),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
+):
+    """
+    Import a broker statement streamed as CSV (with a header row) or NDJSON.
+    Columns: ticker, type, quantity, price, optional fee, optional trade_date.
+    - Distinct tickers are validated together with bulk price lookups.
+    - Valid rows are inserted in batches of IMPORT_BATCH_SIZE; invalid rows are reported, not inserted.
+    """
+    fmt = format
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+
+    try:
+        trades, errors = await parse_statement(iter_lines(request.stream()), fmt)
+    except ImportTooLargeError as e:
+        raise HTTPException(413, str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(400, "Statement must be UTF-8 encoded")
+    except csv.Error as e:
+        raise HTTPException(400, f"Malformed CSV: {str(e)}")
+    row_count = len(trades) + len(errors)
+
+    try:
+        tickers = sorted({trade["ticker"] for _, trade in trades})
+        resolved = await _resolve_trade_tickers(tickers) if tickers else {}
+
+        rows: list[tuple[int, dict]] = []
+        for row_number, trade in trades:
+            symbol = resolved.get(trade["ticker"])
+            if symbol is None:
+                errors.append({"row": row_number, "error": f"Invalid or unsupported ticker {trade['ticker']}"})
+                continue
+            rows.append((row_number, {**trade, "ticker": symbol, "user_id": user.id}))
+
+        imported = 0
+        if not dry_run:
+            invest = supabase.schema("invest")
+            for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+                batch = rows[start:start + IMPORT_BATCH_SIZE]
+                try:
+                    await invest.table("trades").insert([row for _, row in batch], returning=ReturnMethod.minimal).execute()
+                    imported += len(batch)
+                except Exception as batch_err:
+                    logger.warning("Trade import batch failed for user %s: %s", user.id, batch_err)
+                    errors.extend({"row": row_number, "error": f"Insert failed: {batch_err}"} for row_number, _ in batch)
+            if imported:
+                # One replay for the whole statement instead of one snapshot update per trade
+                await resync_snapshot(supabase, user.id, _resolve_currencies)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Trade import failed: {str(e)}")
+
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "status": "success" if not errors else "partial",
+        "dry_run": dry_run,
+        "rows": row_count,
+        "valid": len(rows),
+        "imported": imported,
+        "tickers": resolved,
+        "errors": errors,
+    }
+
+
 @router.post("/sell")
 async def sell_investment(
     request: Any = Body(...),
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     """
     Sell shares of an investment.
@@ -326,14 +600,6 @@ async def sell_investment(
     - If account_id is provided, deposits the proceeds into that finance account.
     """
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized")
-
         payload = request.model_dump(exclude_none=True) if hasattr(request, "model_dump") else request
 
         ticker = payload["ticker"].strip().upper()
@@ -346,57 +612,33 @@ async def sell_investment(
 
         account_id = payload.get("account_id")  # optional finance account
 
-        # ── Verify the user actually owns enough shares ──
-        trades_resp = (
-            supabase.schema("invest")
-            .table("trades")
-            .select("*")
-            .eq("user_id", user.id)
-            .execute()
-        )
-        user_trades = trades_resp.data or []
-
-        held_qty = 0.0
-        for t in user_trades:
-            if t["ticker"].upper() != ticker:
-                continue
-            q = float(t["quantity"])
-            if t["type"].lower() == "buy":
-                held_qty += q
-            elif t["type"].lower() == "sell":
-                held_qty -= q
-
-        if held_qty < sell_qty - 1e-9:
-            raise HTTPException(
+        def insufficient(held_qty: float) -> HTTPException:
+            return HTTPException(
                 400,
                 f"Insufficient shares. You own {round(held_qty, 8)} of {ticker}, "
                 f"but tried to sell {sell_qty}.",
             )
 
+        # ── Fail fast before the price lookup; insert_sell re-checks atomically ──
+        held_qty = await fetch_held_quantity(supabase, user.id, ticker)
+        if held_qty < sell_qty - 1e-9:
+            raise insufficient(held_qty)
+
         # ── Get current market price ──
         t_obj = yf.Ticker(ticker)
-        price = float(
-            t_obj.fast_info.get("lastPrice")
-            or t_obj.fast_info.get("previousClose")
-            or 0.0
-        )
+        price = float(await run_blocking(_last_price, t_obj) or 0.0)
         if price <= 0:
             raise HTTPException(400, "Could not determine current price for ticker")
 
         gross = sell_qty * price
         gross_minor = int(round(gross * DIVISOR))
 
-        # ── Record the sell trade ──
-        trade_data = {
-            "user_id": user.id,
-            "ticker": ticker,
-            "type": "sell",
-            "quantity": sell_qty,
-            "gross_minor": gross_minor,
-            "fee_minor": 0,
-            "trade_date": date.today().isoformat(),
-        }
-        supabase.schema("invest").table("trades").insert(trade_data).execute()
+        # ── Record the sell trade (held-quantity check and insert in one transaction) ──
+        try:
+            inserted = await insert_sell(supabase, ticker, sell_qty, gross_minor, date.today().isoformat())
+        except InsufficientSharesError as exc:
+            raise insufficient(exc.held)
+        await record_trade(supabase, user.id, inserted, _resolve_currencies)
 
         # ── Optionally deposit proceeds into a finance account ──
         deposit_result = None
@@ -405,15 +647,29 @@ async def sell_investment(
             try:
                 from datetime import datetime as dt
 
-                # Determine currency from yfinance info
-                info = t_obj.info or {}
-                currency = info.get("currency") or info.get("financialCurrency") or "USD"
+                # Proceeds are in the ticker's trading currency; book them in the account's
+                currency = await fetch_position_currency(supabase, user.id, ticker, _resolve_currencies)
+                amount = gross
+                account_resp = await (
+                    supabase.schema("finance")
+                    .table("accounts")
+                    .select("currency")
+                    .eq("id", account_id)
+                    .execute()
+                )
+                account_currency = (account_resp.data or [{}])[0].get("currency")
+                if account_currency and account_currency.upper() != currency.upper():
+                    fx = await fx_service.get_rates([currency, account_currency])
+                    rate = fx.rate(currency, account_currency)
+                    if rate is not None:
+                        amount = gross * rate
+                        currency = account_currency
 
                 txn_payload = {
                     "user_id": user.id,
                     "account_id": account_id,
                     "type": "income",
-                    "amount_minor": int(round(gross * 100)),  # finance uses cents (×100), not invest's ×10000
+                    "amount_minor": int(round(amount * 100)),  # finance uses cents (×100), not invest's ×10000
                     "currency": currency,
                     "description": f"Sale of {sell_qty} shares of {ticker}",
                     "merchant": "Investment Sale",
@@ -421,7 +677,7 @@ async def sell_investment(
                     "source": "manual",
                     "created_at": str(dt.now()),
                 }
-                deposit_resp = (
+                deposit_resp = await (
                     supabase.schema("finance")
                     .table("transactions")
                     .insert(txn_payload)
@@ -451,25 +707,20 @@ async def sell_investment(
 @router.delete("/{id}")
 async def delete_trade(
     id: str,
-    supabase=Depends(get_supabase),
-    tokens=Depends(get_user_token),
+    supabase=Depends(get_supabase_for_user),
+    user=Depends(get_current_user),
 ):
     try:
-        access = tokens.get("access_token")
-        refresh = tokens.get("refresh_token")
-        supabase.auth.set_session(access, refresh)
-        user_resp = supabase.auth.get_user()
-        user = user_resp.user
-        if not user:
-            raise HTTPException(status_code=401, detail="Unauthorized")
-
-        delete_response = (
+        delete_response = await (
             supabase.schema("invest")
             .table("trades")
             .delete()
             .eq("id", id)
             .execute()
         )
+        if delete_response.data:
+            # Removing a trade changes every later average-cost step: replay the user
+            await resync_snapshot(supabase, user.id, _resolve_currencies)
         return {"user": user.model_dump(), "rows": delete_response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Trade deletion failed: {str(e)}")
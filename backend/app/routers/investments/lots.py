@@ -0,0 +1,132 @@
+from collections import deque
+
+from .positions import DIVISOR
+
+LOT_METHODS = ("fifo", "average")
+
+# Remaining quantities below this are treated as fully consumed.
+EPSILON = 1e-9
+
+
+class LotBook:
+    """Open lots of one ticker as a deque of ``[quantity, cost_minor, trade_date]``.
+
+    ``fifo`` keeps one lot per buy and sells consume from the oldest.
+    ``average`` pools every buy into a single lot, which is the same
+    average-cost model the position snapshot uses. Each lot is appended and
+    popped at most once and a sell splits at most one lot, so a whole trade
+    history is processed in linear time.
+    """
+
+    __slots__ = ("method", "lots")
+
+    def __init__(self, method: str = "fifo"):
+        if method not in LOT_METHODS:
+            raise ValueError(f"Unknown lot method {method!r}; expected one of {', '.join(LOT_METHODS)}")
+        self.method = method
+        self.lots: deque[list] = deque()
+
+    def buy(self, quantity: float, cost_minor: float, trade_date: str | None) -> None:
+        if self.method == "average" and self.lots:
+            lot = self.lots[0]
+            lot[0] += quantity
+            lot[1] += cost_minor
+            return
+        self.lots.append([quantity, cost_minor, trade_date])
+
+    def sell(self, quantity: float) -> tuple[float, float]:
+        """Release ``quantity`` from the open lots; returns ``(matched_quantity, cost_minor)``."""
+        remaining = quantity
+        released = 0.0
+        lots = self.lots
+        while remaining > EPSILON and lots:
+            lot = lots[0]
+            if lot[0] <= remaining + EPSILON:
+                remaining -= lot[0]
+                released += lot[1]
+                lots.popleft()
+            else:
+                part = lot[1] * remaining / lot[0]
+                lot[0] -= remaining
+                lot[1] -= part
+                released += part
+                remaining = 0.0
+        return quantity - max(remaining, 0.0), released
+
+    @property
+    def quantity(self) -> float:
+        return sum(lot[0] for lot in self.lots)
+
+    @property
+    def cost_minor(self) -> float:
+        return sum(lot[1] for lot in self.lots)
+
+
+def realize_trades(
+    trades: list[dict],
+    currency_map: dict[str, str],
+    method: str = "fifo",
+) -> tuple[list[dict], dict[str, dict[str, float]], dict[str, LotBook]]:
+    """Match sells against open lots for trades in chronological order.
+
+    Returns the realized result of every sell, realized P&L per tax (calendar)
+    year and currency, and the open lots per ticker. Proceeds are net of the
+    sell fee and the cost of a lot includes its buy fee. The part of a sell that
+    exceeds the open quantity is reported as ``unmatched_quantity`` and earns no
+    P&L.
+    """
+    books: dict[str, LotBook] = {}
+    sells: list[dict] = []
+    by_year: dict[str, dict[str, float]] = {}
+
+    for trade in trades:
+        ticker = trade["ticker"].upper()
+        book = books.get(ticker)
+        if book is None:
+            book = books[ticker] = LotBook(method)
+        quantity = float(trade["quantity"])
+        gross_minor = int(trade["gross_minor"])
+        fee_minor = int(trade.get("fee_minor") or 0)
+        trade_date = str(trade.get("trade_date") or "")
+
+        if trade["type"].lower() == "buy":
+            book.buy(quantity, gross_minor + fee_minor, trade_date)
+            continue
+
+        matched, cost_minor = book.sell(quantity)
+        proceeds_minor = (gross_minor - fee_minor) * (matched / quantity) if quantity else 0.0
+        realized_minor = proceeds_minor - cost_minor
+        currency = currency_map.get(ticker, "USD")
+        year = trade_date[:4]
+        year_totals = by_year.setdefault(year, {})
+        year_totals[currency] = year_totals.get(currency, 0.0) + realized_minor
+
+        sells.append({
+            "id": trade.get("id"),
+            "ticker": ticker,
+            "date": trade_date or None,
+            "currency": currency,
+            "quantity": round(quantity, 8),
+            "unmatched_quantity": round(quantity - matched, 8),
+            "proceeds": round(proceeds_minor / DIVISOR, 2),
+            "cost_basis": round(cost_minor / DIVISOR, 2),
+            "realized_pl": round(realized_minor / DIVISOR, 2),
+        })
+
+    totals = {
+        year: {currency: round(minor / DIVISOR, 2) for currency, minor in per_currency.items()}
+        for year, per_currency in sorted(by_year.items())
+    }
+    return sells, totals, books
+
+
+def open_lots(books: dict[str, LotBook]) -> dict[str, list[dict]]:
+    return {
+        ticker: [
+            {"quantity": round(qty, 8), "cost_basis": round(cost / DIVISOR, 2), "date": trade_date}
+            for qty, cost, trade_date in book.lots
+            if qty > EPSILON
+        ]
+        for ticker, book in sorted(books.items())
+        if book.lots
+    }
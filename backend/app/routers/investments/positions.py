@@ -0,0 +1,422 @@
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from postgrest import APIError
+
+from app.utils.cursor import quote_filter_value
+
+logger = logging.getLogger("app.routers.investments.positions")
+
+DIVISOR = 10000.0
+# A replay that keeps losing the race against concurrent trade writes gives up after this many tries
+SNAPSHOT_REBUILD_ATTEMPTS = 3
+
+# Resolves the trading currency of each ticker (yfinance lookup in the router).
+# Tickers it cannot resolve are left out of the result.
+CurrencyResolver = Callable[[list[str]], Awaitable[dict[str, str]]]
+
+
+def new_position(currency: str, currency_verified: bool = True) -> dict:
+    return {
+        "quantity": 0.0,
+        "cost_minor": 0.0,
+        "currency": currency,
+        "currency_verified": currency_verified,
+        "last_trade_id": None,
+        "last_trade_date": None,
+        "last_trade_created_at": None,
+    }
+
+
+def apply_trade(position: dict, cash_minor: dict[str, int], trade: dict) -> dict:
+    """Apply one trade to a running average-cost position and the per-currency cash ledger.
+
+    Returns the per-trade snapshot (``dates`` entry) taken after the trade.
+    """
+    currency = position["currency"]
+    gross_minor = int(trade["gross_minor"])
+    fee_minor = int(trade.get("fee_minor") or 0)
+    qty = float(trade["quantity"])
+    ttype = trade["type"].lower()
+
+    if ttype == "buy":
+        cash_minor[currency] = cash_minor.get(currency, 0) - (gross_minor + fee_minor)
+        position["cost_minor"] += gross_minor + fee_minor
+        position["quantity"] += qty
+    elif ttype == "sell":
+        cash_minor[currency] = cash_minor.get(currency, 0) + (gross_minor - fee_minor)
+        if position["quantity"] > 1e-9:
+            avg_cost = position["cost_minor"] / position["quantity"]
+            position["cost_minor"] = max(0.0, position["cost_minor"] - avg_cost * qty)
+        position["quantity"] -= qty
+        if position["quantity"] < 0:
+            position["quantity"] = 0.0
+
+    position["last_trade_id"] = trade.get("id")
+    position["last_trade_date"] = trade.get("trade_date")
+    position["last_trade_created_at"] = trade.get("created_at")
+
+    trade_gross = gross_minor / DIVISOR
+    pos_qty = position["quantity"]
+    cost_basis_after = position["cost_minor"] / DIVISOR
+    tdate = trade.get("trade_date")
+    return {
+        "id": trade.get("id"),
+        "date": str(tdate) if tdate is not None else None,
+        "type": ttype,
+        "quantity": round(qty, 8),
+        "entry_price": round(trade_gross / qty, 4) if qty else 0.0,
+        "gross": round(trade_gross, 2),
+        "fee": round(fee_minor / DIVISOR, 2),
+        "position_quantity": round(pos_qty, 8),
+        "avg_entry_price": round(cost_basis_after / pos_qty, 4) if pos_qty > 0 else 0.0,
+        "cost_basis": round(cost_basis_after, 2),
+    }
+
+
+def replay_trades(
+    trades: list[dict],
+    currency_map: dict[str, str],
+    unverified: frozenset[str] = frozenset(),
+) -> tuple[dict[str, dict], dict[str, int], dict[str, list[dict]]]:
+    """Rebuild positions, cash and per-trade snapshots from trades in chronological order.
+
+    Tickers in ``unverified`` (or missing from ``currency_map``) are flagged
+    ``currency_verified=False``.
+    """
+    positions: dict[str, dict] = {}
+    cash_minor: dict[str, int] = {}
+    dates_by_ticker: dict[str, list[dict]] = {}
+
+    for trade in trades:
+        ticker = trade["ticker"].upper()
+        position = positions.get(ticker)
+        if position is None:
+            position = positions[ticker] = new_position(
+                currency_map.get(ticker, "USD"), ticker in currency_map and ticker not in unverified
+            )
+        dates_by_ticker.setdefault(ticker, []).append(apply_trade(position, cash_minor, trade))
+
+    return positions, cash_minor, dates_by_ticker
+
+
+def snapshot_trades(
+    trades: list[dict],
+    quantity: float = 0.0,
+    cost_minor: float = 0.0,
+) -> tuple[list[dict], dict]:
+    """Per-trade snapshots for one ticker's trades, continuing from a running position.
+
+    Returns the ``dates`` entries and the position after the last trade, so the
+    next page can resume from it without replaying earlier trades.
+    """
+    position = new_position("")
+    position["quantity"] = quantity
+    position["cost_minor"] = cost_minor
+    cash_minor: dict[str, int] = {}
+    return [apply_trade(position, cash_minor, trade) for trade in trades], position
+
+
+def _position_row(user_id: str, ticker: str, position: dict, now: str) -> dict:
+    return {
+        "user_id": user_id,
+        "ticker": ticker,
+        "quantity": position["quantity"],
+        "cost_minor": position["cost_minor"],
+        "currency": position["currency"],
+        "currency_verified": position.get("currency_verified", True),
+        "last_trade_id": None if position["last_trade_id"] is None else str(position["last_trade_id"]),
+        "last_trade_date": position["last_trade_date"],
+        "last_trade_created_at": position["last_trade_created_at"],
+        "updated_at": now,
+    }
+
+
+def _cash_row(user_id: str, currency: str, cash_minor: int, now: str) -> dict:
+    return {"user_id": user_id, "currency": currency, "cash_minor": int(cash_minor), "updated_at": now}
+
+
+async def fetch_trades(supabase, user_id: str, tickers: list[str] | None = None) -> list[dict]:
+    query = supabase.schema("invest").table("trades").select("*").eq("user_id", user_id)
+    if tickers is not None:
+        query = query.in_("ticker", tickers)
+    response = await (
+        query
+        .order("trade_date", desc=False)
+        .order("created_at", desc=False)
+        .execute()
+    )
+    return response.data or []
+
+
+async def fetch_trade_page(
+    supabase,
+    user_id: str,
+    ticker: str,
+    after: tuple[str, str, str] | None,
+    limit: int,
+) -> list[dict]:
+    """Up to ``limit`` trades of one ticker in trade order, strictly after the ``(trade_date, created_at, id)`` key."""
+    query = (
+        supabase.schema("invest")
+        .table("trades")
+        .select("*")
+        .eq("user_id", user_id)
+        .eq("ticker", ticker)
+    )
+    if after is not None:
+        d, c, i = (quote_filter_value(part) for part in after)
+        query = query.or_(
+            f"trade_date.gt.{d},"
+            f"and(trade_date.eq.{d},created_at.gt.{c}),"
+            f"and(trade_date.eq.{d},created_at.eq.{c},id.gt.{i})"
+        )
+    response = await (
+        query
+        .order("trade_date", desc=False)
+        .order("created_at", desc=False)
+        .order("id", desc=False)
+        .limit(limit)
+        .execute()
+    )
+    return response.data or []
+
+
+class InsufficientSharesError(Exception):
+    """A sell asked for more than the user holds of the ticker."""
+
+    def __init__(self, ticker: str, held: float):
+        super().__init__(f"Insufficient shares of {ticker}: {held} held")
+        self.ticker = ticker
+        self.held = held
+
+
+async def fetch_held_quantity(supabase, user_id: str, ticker: str) -> float:
+    """Net quantity of ``ticker`` from the ``invest.holdings`` aggregate (one row)."""
+    response = await (
+        supabase.schema("invest")
+        .table("holdings")
+        .select("quantity")
+        .eq("user_id", user_id)
+        .eq("ticker", ticker)
+        .execute()
+    )
+    return float(response.data[0]["quantity"]) if response.data else 0.0
+
+
+async def fetch_position_currency(
+    supabase,
+    user_id: str,
+    ticker: str,
+    resolve_currencies: CurrencyResolver,
+) -> str:
+    """Trading currency of ``ticker`` from its snapshot row, resolved upstream if there is none."""
+    response = await (
+        supabase.schema("invest")
+        .table("positions")
+        .select("currency")
+        .eq("user_id", user_id)
+        .eq("ticker", ticker)
+        .execute()
+    )
+    if response.data:
+        return response.data[0]["currency"]
+    return (await resolve_currencies([ticker])).get(ticker, "USD")
+
+
+async def insert_sell(
+    supabase,
+    ticker: str,
+    quantity: float,
+    gross_minor: int,
+    trade_date: str,
+    fee_minor: int = 0,
+) -> dict:
+    """Insert a sell through ``invest.sell_trade``, which checks the held quantity in the same transaction.
+
+    Raises :class:`InsufficientSharesError` when the caller does not hold ``quantity``.
+    """
+    try:
+        response = await supabase.schema("invest").rpc(
+            "sell_trade",
+            {
+                "p_ticker": ticker,
+                "p_quantity": quantity,
+                "p_gross_minor": gross_minor,
+                "p_fee_minor": fee_minor,
+                "p_trade_date": trade_date,
+            },
+        ).execute()
+    except APIError as exc:
+        if exc.code == "23514":
+            raise InsufficientSharesError(ticker, float(exc.details or 0)) from exc
+        raise
+    return response.data
+
+
+async def rebuild_snapshot(
+    supabase,
+    user_id: str,
+    resolve_currencies: CurrencyResolver,
+) -> tuple[dict[str, dict], dict[str, int]]:
+    """Full replay of the user's trades into ``invest.positions`` / ``invest.cash_balances``.
+
+    The result is swapped in atomically by ``invest.replace_snapshot``. If a trade
+    was written while the replay ran, the replay starts over.
+
+    A ticker whose currency cannot be resolved keeps the currency of its current
+    snapshot row (flagged unverified unless that row was verified), or falls back
+    to USD, flagged unverified. One unresolvable ticker never fails the rebuild.
+    """
+    for _ in range(SNAPSHOT_REBUILD_ATTEMPTS):
+        trades = await fetch_trades(supabase, user_id)
+        positions, cash_minor = await _replay_with_currencies(supabase, user_id, trades, resolve_currencies)
+
+        # Written only if no trade was added or removed since ``trades`` was read
+        now = datetime.now(timezone.utc).isoformat()
+        response = await supabase.schema("invest").rpc(
+            "replace_snapshot",
+            {
+                "p_positions": [_position_row(user_id, t, p, now) for t, p in positions.items()],
+                "p_cash": [_cash_row(user_id, cur, minor, now) for cur, minor in cash_minor.items()],
+                "p_trade_count": len(trades),
+                "p_last_created_at": max((str(trade["created_at"]) for trade in trades), default=None),
+            },
+        ).execute()
+        if response.data:
+            return positions, cash_minor
+    raise RuntimeError(f"Trades kept changing during {SNAPSHOT_REBUILD_ATTEMPTS} snapshot rebuilds")
+
+
+async def _replay_with_currencies(
+    supabase,
+    user_id: str,
+    trades: list[dict],
+    resolve_currencies: CurrencyResolver,
+) -> tuple[dict[str, dict], dict[str, int]]:
+    tickers = list({trade["ticker"].upper() for trade in trades if trade.get("ticker")})
+    currency_map = await resolve_currencies(tickers) if tickers else {}
+    unverified: set[str] = set()
+
+    unresolved = [ticker for ticker in tickers if ticker not in currency_map]
+    if unresolved:
+        logger.warning("Currency unresolved for %s, using last known values", ", ".join(sorted(unresolved)))
+        known_resp = await (
+            supabase.schema("invest")
+            .table("positions")
+            .select("ticker, currency, currency_verified")
+            .eq("user_id", user_id)
+            .in_("ticker", unresolved)
+            .execute()
+        )
+        known = {row["ticker"].upper(): row for row in known_resp.data or []}
+        for ticker in unresolved:
+            row = known.get(ticker)
+            currency_map[ticker] = row["currency"] if row else "USD"
+            if not (row and row.get("currency_verified", True)):
+                unverified.add(ticker)
+    positions, cash_minor, _ = replay_trades(trades, currency_map, frozenset(unverified))
+    return positions, cash_minor
+
+
+async def invalidate_snapshot(supabase, user_id: str) -> None:
+    """Drop the user's snapshot so the next read rebuilds it from trades."""
+    invest = supabase.schema("invest")
+    await invest.table("positions").delete().eq("user_id", user_id).execute()
+    await invest.table("cash_balances").delete().eq("user_id", user_id).execute()
+
+
+async def load_snapshot(
+    supabase,
+    user_id: str,
+    resolve_currencies: CurrencyResolver,
+) -> tuple[dict[str, dict], dict[str, int]]:
+    """Positions by ticker and cash by currency, building the snapshot on first use.
+
+    Costs O(tickers ever traded) instead of O(trades). Users whose trades predate
+    the snapshot tables get a one-off rebuild on their first read.
+    """
+    invest = supabase.schema("invest")
+    positions_resp = await invest.table("positions").select("*").eq("user_id", user_id).execute()
+    rows = positions_resp.data or []
+
+    if not rows:
+        any_trade = await (
+            invest.table("trades").select("id").eq("user_id", user_id).limit(1).execute()
+        )
+        if any_trade.data:
+            return await rebuild_snapshot(supabase, user_id, resolve_currencies)
+        return {}, {}
+
+    cash_resp = await invest.table("cash_balances").select("*").eq("user_id", user_id).execute()
+    positions = {
+        row["ticker"].upper(): {
+            "quantity": float(row["quantity"]),
+            "cost_minor": float(row["cost_minor"]),
+            "currency": row["currency"],
+            "currency_verified": row.get("currency_verified", True),
+            "last_trade_id": row.get("last_trade_id"),
+            "last_trade_date": row.get("last_trade_date"),
+            "last_trade_created_at": row.get("last_trade_created_at"),
+        }
+        for row in rows
+    }
+    cash_minor = {row["currency"]: int(row["cash_minor"]) for row in cash_resp.data or []}
+    return positions, cash_minor
+
+
+async def record_trade(
+    supabase,
+    user_id: str,
+    trade: dict,
+    resolve_currencies: CurrencyResolver,
+) -> None:
+    """Fold a newly inserted trade into the snapshot.
+
+    ``invest.apply_trade_to_snapshot`` applies trades that land after the ticker's
+    last recorded trade in place, under the ticker's advisory lock and with an
+    in-place cash increment, so concurrent trades never lose an update. A
+    back-dated trade, or a user without a snapshot yet, triggers a full replay.
+    If the update fails the snapshot is dropped so the next read rebuilds it.
+    """
+    ticker = trade["ticker"].upper()
+    try:
+        # Only used when the ticker has no snapshot row yet; normally a symbol cache hit
+        resolved = await resolve_currencies([ticker])
+        response = await supabase.schema("invest").rpc(
+            "apply_trade_to_snapshot",
+            {
+                "p_trade_id": str(trade["id"]),
+                "p_ticker": ticker,
+                "p_type": trade["type"],
+                "p_quantity": float(trade["quantity"]),
+                "p_gross_minor": int(trade["gross_minor"]),
+                "p_fee_minor": int(trade.get("fee_minor") or 0),
+                "p_trade_date": str(trade["trade_date"]),
+                "p_created_at": str(trade["created_at"]),
+                "p_currency": resolved.get(ticker, "USD"),
+                "p_currency_verified": ticker in resolved,
+            },
+        ).execute()
+        if response.data == "rebuild":
+            await rebuild_snapshot(supabase, user_id, resolve_currencies)
+    except Exception:
+        logger.exception("Position snapshot update failed for user %s, dropping snapshot", user_id)
+        await _drop_after_failure(supabase, user_id)
+
+
+async def resync_snapshot(supabase, user_id: str, resolve_currencies: CurrencyResolver) -> None:
+    """Full replay after a trade was removed; drops the snapshot if the replay fails."""
+    try:
+        await rebuild_snapshot(supabase, user_id, resolve_currencies)
+    except Exception:
+        logger.exception("Position snapshot rebuild failed for user %s, dropping snapshot", user_id)
+        await _drop_after_failure(supabase, user_id)
+
+
+async def _drop_after_failure(supabase, user_id: str) -> None:
+    try:
+        await invalidate_snapshot(supabase, user_id)
+    except Exception:
+        logger.exception("Could not drop position snapshot for user %s", user_id)
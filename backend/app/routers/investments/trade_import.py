@@ -0,0 +1,154 @@
+import csv
+import json
+import math
+import os
+from datetime import date
+from typing import AsyncIterator
+
+from .positions import DIVISOR
+
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+# Accepted header names (lower-cased) for each trade field, as broker exports name them differently
+COLUMN_ALIASES = {
+    "ticker": ("ticker", "symbol"),
+    "type": ("type", "side", "action"),
+    "quantity": ("quantity", "qty", "shares"),
+    "price": ("price", "unit_price"),
+    "fee": ("fee", "fees", "commission"),
+    "trade_date": ("trade_date", "date"),
+}
+
+
+class ImportTooLargeError(Exception):
+    pass
+
+
+def _field(record: dict, name: str):
+    for alias in COLUMN_ALIASES[name]:
+        value = record.get(alias)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def parse_trade(record: dict) -> dict:
+    """Validate one statement row and convert it to an ``invest.trades`` row (without ``user_id``).
+
+    Raises ``ValueError`` with a message suitable for the per-row error report.
+    """
+    record = {str(key).strip().lower(): value for key, value in record.items()}
+
+    ticker = str(_field(record, "ticker") or "").strip().upper()
+    if not ticker:
+        raise ValueError("ticker is required")
+
+    type_ = str(_field(record, "type") or "").strip().lower()
+    if type_ not in ("buy", "sell"):
+        raise ValueError("type must be 'buy' or 'sell'")
+
+    try:
+        quantity = float(_field(record, "quantity"))
+        price = float(_field(record, "price"))
+        fee = float(_field(record, "fee") or 0.0)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("quantity and price must be numbers")
+    if not all(math.isfinite(value) for value in (quantity, price, fee)):
+        raise ValueError("quantity, price and fee must be finite numbers")
+    if quantity <= 0:
+        raise ValueError("quantity must be > 0")
+    if price < 0 or fee < 0:
+        raise ValueError("price and fee must be >= 0")
+
+    raw_date = _field(record, "trade_date")
+    if raw_date is None:
+        trade_date = date.today().isoformat()
+    else:
+        try:
+            trade_date = date.fromisoformat(str(raw_date).strip()[:10]).isoformat()
+        except ValueError:
+            raise ValueError("trade_date must be YYYY-MM-DD")
+
+    gross_minor = quantity * price * DIVISOR
+    if not math.isfinite(gross_minor):
+        raise ValueError("quantity times price is too large")
+
+    return {
+        "ticker": ticker,
+        "type": type_,
+        "quantity": quantity,
+        "gross_minor": int(round(gross_minor)),
+        "fee_minor": int(round(fee * DIVISOR)),
+        "trade_date": trade_date,
+    }
+
+
+async def _csv_records(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Group physical lines into CSV records, so a quoted field may span lines.
+
+    Blank lines between records are skipped. A record whose quotes never
+    balance is cut off at ``csv.field_size_limit()`` characters, which the CSV
+    parser then reports as an error for that row.
+    """
+    pending: list[str] = []
+    quotes = 0
+    size = 0
+    async for line in lines:
+        if not pending and not line.strip():
+            continue
+        pending.append(line)
+        # Escaped quotes ("") come in pairs, so only an open quoted field leaves the count odd
+        quotes += line.count('"')
+        size += len(line)
+        if quotes % 2 == 0 or size > csv.field_size_limit():
+            yield "\n".join(pending)
+            pending, quotes, size = [], 0, 0
+    if pending:
+        yield "\n".join(pending)
+
+
+async def parse_statement(
+    lines: AsyncIterator[str],
+    fmt: str,
+    max_rows: int = IMPORT_MAX_ROWS,
+) -> tuple[list[tuple[int, dict]], list[dict]]:
+    """Parse a CSV (with header) or NDJSON statement into ``(row_number, trade)`` pairs and per-row errors.
+
+    Row numbers are 1-based data rows (the CSV header is not counted); a CSV row
+    may span lines inside a quoted field. Blank lines are skipped. Raises
+    :class:`ImportTooLargeError` past ``max_rows`` rows, and ``csv.Error`` only
+    for an unreadable CSV header.
+    """
+    trades: list[tuple[int, dict]] = []
+    errors: list[dict] = []
+    header: list[str] | None = None
+    row_number = 0
+
+    records = _csv_records(lines) if fmt == "csv" else lines
+    async for line in records:
+        if not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            header = [name.strip().lower() for name in next(csv.reader([line]))]
+            continue
+
+        row_number += 1
+        if row_number > max_rows:
+            raise ImportTooLargeError(f"At most {max_rows} rows per import")
+        try:
+            if fmt == "csv":
+                record = dict(zip(header, next(csv.reader([line]))))
+            else:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("each line must be a JSON object")
+            trades.append((row_number, parse_trade(record)))
+        except json.JSONDecodeError:
+            errors.append({"row": row_number, "error": "invalid JSON"})
+        except csv.Error as exc:
+            errors.append({"row": row_number, "error": f"malformed CSV: {exc}"})
+        except ValueError as exc:
+            errors.append({"row": row_number, "error": str(exc)})
+
+    return trades, errors
@@ -0,0 +1,55 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger("app.utils.blocking")
+
+T = TypeVar("T")
+
+BLOCKING_EXECUTOR_MAX_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_MAX_WORKERS", "16"))
+EVENT_LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+EVENT_LOOP_DEBUG = os.getenv("EVENT_LOOP_DEBUG", "").lower() in ("1", "true", "yes")
+
+_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_EXECUTOR_MAX_WORKERS,
+    thread_name_prefix="blocking",
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking call (yfinance, pandas, ...) on the bounded worker pool.
+
+    The pool size caps how many upstream scrapes can run at once per process, so a
+    burst of slow calls queues up here instead of starving the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def monitor_event_loop_lag(
+    interval: float = 0.5,
+    threshold_ms: float = EVENT_LOOP_BLOCK_THRESHOLD_MS,
+) -> None:
+    """Log a warning whenever the event loop wakes up later than ``threshold_ms``.
+
+    A late wake-up means something ran synchronously on the loop. Set
+    ``EVENT_LOOP_DEBUG=1`` to have asyncio also name the slow callback.
+    """
+    loop = asyncio.get_running_loop()
+    if EVENT_LOOP_DEBUG:
+        loop.set_debug(True)
+        loop.slow_callback_duration = threshold_ms / 1000
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag_ms = (time.perf_counter() - started - interval) * 1000
+        if lag_ms > threshold_ms:
+            logger.warning("Event loop was blocked for %.0f ms", lag_ms)
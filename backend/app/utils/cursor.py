@@ -0,0 +1,27 @@
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(state: dict) -> str:
+    """Opaque, URL-safe pagination cursor for ``state`` (any JSON-serializable dict)."""
+    raw = json.dumps(state, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Inverse of :func:`encode_cursor`; a malformed cursor is a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+    if not isinstance(state, dict):
+        raise HTTPException(400, "Invalid cursor")
+    return state
+
+
+def quote_filter_value(value) -> str:
+    """Quote a value for use inside a PostgREST ``or=(...)`` filter."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
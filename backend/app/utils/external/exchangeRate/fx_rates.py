@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from app.utils.blocking import run_blocking
+
+logger = logging.getLogger("app.utils.external.exchangeRate.fx_rates")
+
+FX_REFRESH_SECONDS = float(os.getenv("FX_REFRESH_SECONDS", "300"))
+# After a failed refresh, known rates are served as they are for this long before retrying
+FX_RETRY_SECONDS = float(os.getenv("FX_RETRY_SECONDS", "30"))
+# Currencies Yahoo could not quote are not asked for again for this long
+FX_NEGATIVE_TTL_SECONDS = float(os.getenv("FX_NEGATIVE_TTL_SECONDS", "600"))
+DEFAULT_BASE_CURRENCY = os.getenv("DEFAULT_BASE_CURRENCY", "EUR").upper()
+
+# Every currency is quoted against one pivot; cross rates are triangulated from it.
+PIVOT_CURRENCY = "USD"
+
+
+def _download_pivot_rates(currencies: list[str]) -> dict[str, float]:
+    """Units of each currency per one USD, from a single ``yf.download`` of ``USDXXX=X`` pairs."""
+    rates = {PIVOT_CURRENCY: 1.0}
+    symbols = {f"{PIVOT_CURRENCY}{cur}=X": cur for cur in currencies if cur != PIVOT_CURRENCY}
+    if not symbols:
+        return rates
+
+    data = yf.download(
+        list(symbols),
+        period="5d",
+        interval="1d",
+        auto_adjust=False,
+        group_by="column",
+        progress=False,
+        threads=True,
+    )
+    if data is None or data.empty:
+        return rates
+
+    closes = data["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(next(iter(symbols)))
+    latest = closes.ffill().iloc[-1]
+    for symbol, cur in symbols.items():
+        rate = latest.get(symbol)
+        if rate is not None and not math.isnan(rate) and rate > 0:
+            rates[cur] = float(rate)
+    return rates
+
+
+class FXRates:
+    """Immutable snapshot of pivot rates with triangulated cross rates."""
+
+    def __init__(self, per_pivot: dict[str, float], fetched_at: float | None):
+        self.currencies = sorted(per_pivot)
+        self._index = {cur: i for i, cur in enumerate(self.currencies)}
+        self._per_pivot = np.array([per_pivot[cur] for cur in self.currencies], dtype=float)
+        self.fetched_at = fetched_at
+
+    def has(self, currency: str) -> bool:
+        return currency.upper() in self._index
+
+    def rate(self, from_currency: str, to_currency: str) -> float | None:
+        """Units of ``to_currency`` per one ``from_currency``, ``None`` if either is unknown."""
+        i = self._index.get(from_currency.upper())
+        j = self._index.get(to_currency.upper())
+        if i is None or j is None:
+            return None
+        return float(self._per_pivot[j] / self._per_pivot[i])
+
+    def matrix(self) -> pd.DataFrame:
+        """Full cross-rate matrix: ``matrix().loc[from, to]``."""
+        return pd.DataFrame(
+            np.outer(1 / self._per_pivot, self._per_pivot),
+            index=self.currencies,
+            columns=self.currencies,
+        )
+
+    def convert(self, amounts, from_currencies, to_currency: str) -> np.ndarray:
+        """Convert each amount from its currency into ``to_currency`` in one pass.
+
+        Amounts in (or a target of) an unknown currency come back as NaN.
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        j = self._index.get(to_currency.upper())
+        if j is None:
+            return np.full(amounts.shape, np.nan)
+
+        idx = np.array([self._index.get(str(cur).upper(), -1) for cur in from_currencies], dtype=int)
+        per_pivot = np.append(self._per_pivot, np.nan)  # index -1 -> NaN
+        return amounts * (self._per_pivot[j] / per_pivot[idx])
+
+
+class FXService:
+    """Process-wide cache of FX rates refreshed on a schedule.
+
+    Rates for every currency seen so far are re-downloaded together every
+    ``FX_REFRESH_SECONDS`` by :meth:`run_refresh_loop`. A currency seen for the
+    first time is fetched inline; one Yahoo cannot quote is skipped for
+    ``FX_NEGATIVE_TTL_SECONDS`` instead of being downloaded on every call.
+    Failed refreshes keep serving the last rates.
+    """
+
+    def __init__(self, refresh_seconds: float = FX_REFRESH_SECONDS, negative_ttl: float = FX_NEGATIVE_TTL_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.negative_ttl = negative_ttl
+        self._rates = FXRates({PIVOT_CURRENCY: 1.0}, None)
+        self._lock = asyncio.Lock()
+        self._failed_at: float | None = None
+        # Currency -> time until which it is known to be unquoted
+        self._unquoted: dict[str, float] = {}
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    @property
+    def current(self) -> FXRates:
+        return self._rates
+
+    def _is_fresh(self) -> bool:
+        fetched_at = self._rates.fetched_at
+        return fetched_at is not None and time.time() - fetched_at < self.refresh_seconds
+
+    def _quotable(self, currencies: Iterable[str]) -> set[str]:
+        now = time.time()
+        return {cur.upper() for cur in currencies if cur and self._unquoted.get(cur.upper(), 0) <= now}
+
+    async def get_rates(self, currencies: Iterable[str] = ()) -> FXRates:
+        """Rates covering ``currencies``, fetching any that are new or refreshing a stale set."""
+        wanted = self._quotable(currencies)
+        if all(self._rates.has(cur) for cur in wanted):
+            recently_failed = self._failed_at is not None and time.time() - self._failed_at < FX_RETRY_SECONDS
+            if self._is_fresh() or recently_failed:
+                return self._rates
+        return await self.refresh(wanted)
+
+    async def refresh(self, extra: Iterable[str] = ()) -> FXRates:
+        async with self._lock:
+            wanted = set(self._rates.currencies) | self._quotable(extra)
+            # Another caller may have refreshed while we waited for the lock
+            if all(self._rates.has(cur) for cur in wanted) and self._is_fresh():
+                return self._rates
+            try:
+                fetched = await run_blocking(_download_pivot_rates, sorted(wanted))
+                self.refreshes += 1
+                self._failed_at = None
+            except Exception as exc:
+                self.refresh_errors += 1
+                self._failed_at = time.time()
+                logger.warning("FX refresh failed for %s: %s", ", ".join(sorted(wanted)), exc)
+                return self._rates
+
+            # Keep the previous rate for any currency this download missed
+            previous = {cur: self._rates.rate(PIVOT_CURRENCY, cur) for cur in self._rates.currencies}
+            retry_at = time.time() + self.negative_ttl
+            for cur in wanted:
+                if cur in fetched:
+                    self._unquoted.pop(cur, None)
+                elif cur not in previous:
+                    self._unquoted[cur] = retry_at
+            self._rates = FXRates({**previous, **fetched}, time.time())
+            return self._rates
+
+    async def run_refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            if len(self._rates.currencies) > 1:
+                await self.refresh()
+
+    def stats(self) -> dict:
+        return {
+            "currencies": self._rates.currencies,
+            "fetched_at": self._rates.fetched_at,
+            "refresh_seconds": self.refresh_seconds,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "unquoted": sorted(cur for cur, until in self._unquoted.items() if until > time.time()),
+        }
+
+
+def user_base_currency(user) -> str:
+    """The user's preferred currency from account metadata, else ``DEFAULT_BASE_CURRENCY``."""
+    metadata = getattr(user, "user_metadata", None)
+    currency = metadata.get("currency") if isinstance(metadata, dict) else None
+    return currency.strip().upper() if isinstance(currency, str) and currency.strip() else DEFAULT_BASE_CURRENCY
+
+
+fx_service = FXService()
@@ -0,0 +1,221 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+logger = logging.getLogger("app.utils.external.yfinance.ohlc_store")
+
+OHLC_STORE_PATH = os.getenv("OHLC_STORE_PATH", "data/ohlc.sqlite3")
+# How long the stored tail is trusted before asking Yahoo for newer bars.
+OHLC_REFRESH_SECONDS = float(os.getenv("OHLC_REFRESH_SECONDS", "900"))
+OHLC_MMAP_BYTES = int(os.getenv("OHLC_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Relative close difference on an overlapping settled bar that means Yahoo re-adjusted
+# the history (split or dividend) and the stored series must be replaced.
+ADJUSTMENT_TOLERANCE = 1e-6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_bars (
+    ticker TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (ticker, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS series_meta (
+    ticker TEXT PRIMARY KEY,
+    tz TEXT NOT NULL,
+    last_ts INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+
+-- Today's unfinished bar, replaced on every refresh and never compared for re-adjustment.
+CREATE TABLE IF NOT EXISTS provisional_bars (
+    ticker TEXT PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL
+) WITHOUT ROWID;
+"""
+
+
+class OHLCStore:
+    """On-disk store of daily OHLCV bars per ticker, backed by SQLite.
+
+    The first request for a ticker downloads its full daily history. After that
+    only the tail since the last stored bar is fetched, at most once per
+    ``OHLC_REFRESH_SECONDS``. Only settled bars (sessions before today) are stored
+    as history; today's bar is kept aside as provisional and replaced on each
+    refresh. Reads go through a memory-mapped connection and are
+    materialized column-wise into a DataFrame.
+
+    All methods block; call them through ``run_blocking``.
+    """
+
+    def __init__(self, path: str = OHLC_STORE_PATH, refresh_seconds: float = OHLC_REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={OHLC_MMAP_BYTES}")
+            if not self._schema_ready:
+                with self._write_lock:
+                    conn.executescript(_SCHEMA)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, ticker: str) -> tuple[str, int, float] | None:
+        return self._connect().execute(
+            "SELECT tz, last_ts, fetched_at FROM series_meta WHERE ticker = ?", (ticker,)
+        ).fetchone()
+
+    def read_daily(self, ticker: str) -> pd.DataFrame:
+        """Stored bars for ``ticker`` without touching the network."""
+        ticker = ticker.upper()
+        meta = self._meta(ticker)
+        if meta is None:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], tz="UTC"))
+
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT ts, open, high, low, close, volume FROM daily_bars WHERE ticker = ? ORDER BY ts",
+            (ticker,),
+        ).fetchall()
+        provisional = conn.execute(
+            "SELECT ts, open, high, low, close, volume FROM provisional_bars WHERE ticker = ?", (ticker,)
+        ).fetchone()
+        if provisional is not None and (not rows or provisional[0] > rows[-1][0]):
+            rows.append(provisional)
+        data = np.array(rows, dtype=float).reshape(-1, 6)
+        index = pd.to_datetime(data[:, 0].astype(np.int64), unit="ms", utc=True).tz_convert(meta[0])
+        return pd.DataFrame(data[:, 1:], index=index, columns=BAR_COLUMNS)
+
+    def get_daily(self, ticker: str) -> pd.DataFrame:
+        """Daily bars for ``ticker``, downloading only what is missing from disk."""
+        ticker = ticker.upper()
+        meta = self._meta(ticker)
+        if meta is not None and time.time() - meta[2] < self.refresh_seconds:
+            return self.read_daily(ticker)
+
+        try:
+            if meta is None:
+                self._download(ticker, full=True)
+            else:
+                self._download(ticker, full=False, last_ts=meta[1])
+        except Exception as exc:
+            if meta is None:
+                raise
+            logger.warning("OHLC tail refresh failed for %s, serving stored bars: %s", ticker, exc)
+        return self.read_daily(ticker)
+
+    def _download(self, ticker: str, full: bool, last_ts: int | None = None) -> None:
+        history = yf.Ticker(ticker)
+        if full:
+            df = history.history(period="max", interval="1d", auto_adjust=True)
+        else:
+            # Re-fetch from the settled bar before the last stored one: comparing it
+            # tells us whether Yahoo re-adjusted the series. The last stored bar may
+            # predate the provisional split and have been saved mid-session.
+            last_ts = self._anchor_ts(ticker, last_ts)
+            start = pd.Timestamp(last_ts, unit="ms", tz="UTC").date()
+            df = history.history(start=str(start), interval="1d", auto_adjust=True)
+
+        if df is None or df.empty:
+            if not full:
+                self._touch(ticker)
+            return
+
+        df = df[BAR_COLUMNS].dropna(subset=["Close"])
+        if not full and self._was_readjusted(ticker, df, last_ts):
+            logger.info("OHLC history for %s was re-adjusted upstream, reloading", ticker)
+            self._download(ticker, full=True)
+            return
+        self._write(ticker, df, replace=full)
+
+    def _anchor_ts(self, ticker: str, last_ts: int) -> int:
+        previous = self._connect().execute(
+            "SELECT MAX(ts) FROM daily_bars WHERE ticker = ? AND ts < ?", (ticker, last_ts)
+        ).fetchone()
+        return previous[0] if previous and previous[0] is not None else last_ts
+
+    def _was_readjusted(self, ticker: str, df: pd.DataFrame, anchor_ts: int) -> bool:
+        stored = self._connect().execute(
+            "SELECT close FROM daily_bars WHERE ticker = ? AND ts = ?", (ticker, anchor_ts)
+        ).fetchone()
+        fresh = _settled(df)
+        fresh = fresh[fresh.index.as_unit("ms").asi8 == anchor_ts]
+        if stored is None or fresh.empty or not stored[0]:
+            return False
+        return abs(float(fresh["Close"].iloc[0]) / stored[0] - 1) > ADJUSTMENT_TOLERANCE
+
+    def _write(self, ticker: str, df: pd.DataFrame, replace: bool) -> None:
+        settled = _settled(df)
+        timestamps = settled.index.as_unit("ms").asi8.tolist()
+        values = settled.to_numpy(dtype=float).tolist()
+        rows = [(ticker, ts, *bar) for ts, bar in zip(timestamps, values)]
+        provisional = df.iloc[len(settled):].tail(1)
+        tz = str(df.index.tz or "UTC")
+
+        conn = self._connect()
+        with self._write_lock, conn:
+            if replace:
+                conn.execute("DELETE FROM daily_bars WHERE ticker = ?", (ticker,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO daily_bars (ticker, ts, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("DELETE FROM provisional_bars WHERE ticker = ?", (ticker,))
+            if not provisional.empty:
+                conn.execute(
+                    "INSERT INTO provisional_bars (ticker, ts, open, high, low, close, volume) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (ticker, int(provisional.index.as_unit("ms").asi8[0]), *provisional.to_numpy(dtype=float)[0].tolist()),
+                )
+            # Before the first settled bar exists, a tail refresh downloads from the epoch
+            conn.execute(
+                "INSERT OR REPLACE INTO series_meta (ticker, tz, last_ts, fetched_at) "
+                "VALUES (?, ?, COALESCE((SELECT MAX(ts) FROM daily_bars WHERE ticker = ?), 0), ?)",
+                (ticker, tz, ticker, time.time()),
+            )
+
+    def _touch(self, ticker: str) -> None:
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.execute("UPDATE series_meta SET fetched_at = ? WHERE ticker = ?", (time.time(), ticker))
+
+
+def _settled(df: pd.DataFrame) -> pd.DataFrame:
+    """Bars of sessions before today in the exchange's timezone; today's bar still moves."""
+    if df.empty:
+        return df
+    today = pd.Timestamp.now(tz=df.index.tz).normalize()
+    return df[df.index < today]
+
+
+ohlc_store = OHLCStore()
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger("app.utils.external.yfinance.quote_cache")
+
+QUOTE_PRICE_TTL_SECONDS = float(os.getenv("QUOTE_PRICE_TTL_SECONDS", "30"))
+QUOTE_PRICE_MAX_STALE_SECONDS = float(os.getenv("QUOTE_PRICE_MAX_STALE_SECONDS", "900"))
+QUOTE_INFO_TTL_SECONDS = float(os.getenv("QUOTE_INFO_TTL_SECONDS", "86400"))
+QUOTE_INFO_MAX_STALE_SECONDS = float(os.getenv("QUOTE_INFO_MAX_STALE_SECONDS", "604800"))
+QUOTE_CACHE_MAX_SIZE = int(os.getenv("QUOTE_CACHE_MAX_SIZE", "5000"))
+PRICE_AT_DATE_CACHE_MAX_SIZE = int(os.getenv("PRICE_AT_DATE_CACHE_MAX_SIZE", "100000"))
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class StaleWhileRevalidateCache:
+    """Process-wide LRU cache with a fresh TTL and a stale-serving window.
+
+    - fresh entries are returned as-is;
+    - stale entries (past ``ttl`` but within ``max_stale``) are returned immediately
+      while one background task reloads them;
+    - missing or expired entries are loaded inline.
+    """
+
+    def __init__(self, name: str, ttl: float, max_stale: float, max_size: int = QUOTE_CACHE_MAX_SIZE):
+        self.name = name
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._refreshing: dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        self._entries[key] = _Entry(value, now + self.ttl, now + self.ttl + self.max_stale)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None and now < entry.fresh_until:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.value
+
+        if entry is not None and now < entry.stale_until:
+            self.stale_hits += 1
+            self._entries.move_to_end(key)
+            if key not in self._refreshing:
+                self._refreshing[key] = asyncio.create_task(self._refresh(key, loader))
+            return entry.value
+
+        self.misses += 1
+        value = await loader()
+        self._store(key, value)
+        return value
+
+    async def get_many(
+        self,
+        keys: list[Hashable],
+        loader: Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]],
+    ) -> dict[Hashable, Any]:
+        """Batch variant of :meth:`get`: ``loader`` receives every key that needs loading at once.
+
+        Missing keys are loaded inline in one call; stale keys are returned and
+        refreshed together in one background call.
+        """
+        now = time.monotonic()
+        result: dict[Hashable, Any] = {}
+        missing: list[Hashable] = []
+        stale: list[Hashable] = []
+
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.fresh_until:
+                self.hits += 1
+            elif entry is not None and now < entry.stale_until:
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    stale.append(key)
+            else:
+                self.misses += 1
+                missing.append(key)
+                continue
+            self._entries.move_to_end(key)
+            result[key] = entry.value
+
+        if stale:
+            task = asyncio.create_task(self._refresh_many(stale, loader))
+            for key in stale:
+                self._refreshing[key] = task
+
+        if missing:
+            loaded = await loader(missing)
+            for key, value in loaded.items():
+                self._store(key, value)
+            result.update(loaded)
+
+        return result
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            value = await loader()
+            self._store(key, value)
+            self.refreshes += 1
+        except Exception as exc:
+            self.refresh_errors += 1
+            logger.warning("%s cache refresh failed for %s: %s", self.name, key, exc)
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def _refresh_many(
+        self,
+        keys: list[Hashable],
+        loader: Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]],
+    ) -> None:
+        try:
+            for key, value in (await loader(keys)).items():
+                self._store(key, value)
+            self.refreshes += 1
+        except Exception as exc:
+            self.refresh_errors += 1
+            logger.warning("%s cache batch refresh failed for %d keys: %s", self.name, len(keys), exc)
+        finally:
+            for key in keys:
+                self._refreshing.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl if math.isfinite(self.ttl) else None,
+            "max_stale_seconds": self.max_stale,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "refreshing": len(self._refreshing),
+        }
+
+
+class LastKnownValues:
+    """Most recent successful value per key and the wall-clock time it was fetched.
+
+    Entries never expire (LRU-bounded); callers use them as a labelled fallback
+    when a live lookup fails or misses its deadline.
+    """
+
+    def __init__(self, max_size: int = QUOTE_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._values: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._values[key] = (value, time.time())
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+
+    def get(self, key: Hashable) -> tuple[Any, float] | None:
+        return self._values.get(key)
+
+
+price_cache = StaleWhileRevalidateCache("price", QUOTE_PRICE_TTL_SECONDS, QUOTE_PRICE_MAX_STALE_SECONDS)
+info_cache = StaleWhileRevalidateCache("info", QUOTE_INFO_TTL_SECONDS, QUOTE_INFO_MAX_STALE_SECONDS)
+# Closes of settled past dates never change, so entries only leave through LRU eviction.
+# Callers keep null answers out of it (see get_prices_at_dates).
+price_at_date_cache = StaleWhileRevalidateCache(
+    "price_at_date", math.inf, 0, max_size=PRICE_AT_DATE_CACHE_MAX_SIZE
+)
+# Last live portfolio quotes and FX rates, served when Yahoo is slow or down.
+last_quotes = LastKnownValues()
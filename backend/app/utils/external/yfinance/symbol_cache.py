@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import yfinance as yf
+
+from app.utils.blocking import run_blocking
+from app.utils.single_flight import yfinance_flight
+
+logger = logging.getLogger("app.utils.external.yfinance.symbol_cache")
+
+SYMBOL_CACHE_PATH = os.getenv("SYMBOL_CACHE_PATH", "data/symbols.sqlite3")
+SYMBOL_CACHE_TTL_SECONDS = float(os.getenv("SYMBOL_CACHE_TTL_SECONDS", str(30 * 86400)))
+# Unknown symbols are remembered briefly so repeated bad input does not hit Yahoo every time
+SYMBOL_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("SYMBOL_CACHE_NEGATIVE_TTL_SECONDS", "600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (
+    input TEXT PRIMARY KEY,
+    symbol TEXT,
+    quote_type TEXT,
+    currency TEXT,
+    valid_until REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class SymbolInfo:
+    symbol: str
+    quote_type: str | None
+    currency: str
+
+    @property
+    def asset_type(self) -> str:
+        if self.quote_type == "CRYPTOCURRENCY":
+            return "cryptocurrency"
+        if self.quote_type == "ETF":
+            return "etf"
+        return "stock"
+
+
+def _lookup_symbol(ticker: str) -> SymbolInfo | None:
+    """Blocking: the tradable symbol for ``ticker``, trying the ``-USD`` crypto pair as fallback."""
+    candidates = [ticker] if ticker.endswith("-USD") else [ticker, f"{ticker}-USD"]
+    for candidate in candidates:
+        fast_info = yf.Ticker(candidate).fast_info
+        if fast_info.get("lastPrice") or fast_info.get("previousClose"):
+            quote_type = fast_info.get("quoteType")
+            return SymbolInfo(
+                symbol=candidate,
+                quote_type=str(quote_type).upper() if quote_type else None,
+                currency=fast_info.get("currency") or "USD",
+            )
+    return None
+
+
+class SymbolCache:
+    """Input symbol -> canonical symbol, quote type and currency, persisted in SQLite.
+
+    Entries live in memory and on disk, so a restart keeps every symbol seen so
+    far. Resolved symbols are trusted for ``SYMBOL_CACHE_TTL_SECONDS`` and unknown
+    ones for ``SYMBOL_CACHE_NEGATIVE_TTL_SECONDS``. A lookup that fails (network
+    error) is not cached.
+    """
+
+    def __init__(
+        self,
+        path: str = SYMBOL_CACHE_PATH,
+        ttl: float = SYMBOL_CACHE_TTL_SECONDS,
+        negative_ttl: float = SYMBOL_CACHE_NEGATIVE_TTL_SECONDS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: dict[str, tuple[SymbolInfo | None, float]] = {}
+        self._loaded = False
+        self._conn: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lookup_errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _read_all(self) -> dict[str, tuple[SymbolInfo | None, float]]:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT input, symbol, quote_type, currency, valid_until FROM symbols WHERE valid_until > ?",
+                (time.time(),),
+            ).fetchall()
+        return {
+            key: (SymbolInfo(symbol, quote_type, currency) if symbol else None, valid_until)
+            for key, symbol, quote_type, currency, valid_until in rows
+        }
+
+    def _write(self, entries: dict[str, tuple[SymbolInfo | None, float]]) -> None:
+        rows = [
+            (key, info.symbol, info.quote_type, info.currency, valid_until) if info
+            else (key, None, None, None, valid_until)
+            for key, (info, valid_until) in entries.items()
+        ]
+        with self._db_lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO symbols (input, symbol, quote_type, currency, valid_until) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    async def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            stored = await run_blocking(self._read_all)
+            for key, entry in stored.items():
+                self._entries.setdefault(key, entry)
+            self._loaded = True
+
+    def peek(self, inputs: list[str]) -> dict[str, SymbolInfo]:
+        """Resolved entries already in memory; never touches disk or the network."""
+        now = time.time()
+        result = {}
+        for key in inputs:
+            entry = self._entries.get(key.upper())
+            if entry is not None and entry[0] is not None and now < entry[1]:
+                result[key.upper()] = entry[0]
+        return result
+
+    async def resolve(self, inputs: list[str]) -> dict[str, SymbolInfo | None]:
+        """Symbol info per (upper-cased) input, ``None`` for symbols Yahoo does not know.
+
+        Unknown or expired inputs are looked up concurrently, one shared lookup per symbol.
+        """
+        await self._ensure_loaded()
+        now = time.time()
+        result: dict[str, SymbolInfo | None] = {}
+        missing: list[str] = []
+        for key in dict.fromkeys(i.strip().upper() for i in inputs):
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                self.hits += 1
+                result[key] = entry[0]
+            else:
+                self.misses += 1
+                missing.append(key)
+        if not missing:
+            return result
+
+        looked_up = await asyncio.gather(
+            *(
+                yfinance_flight.do((key, "symbol", None), lambda key=key: run_blocking(_lookup_symbol, key))
+                for key in missing
+            ),
+            return_exceptions=True,
+        )
+        fresh: dict[str, tuple[SymbolInfo | None, float]] = {}
+        for key, info in zip(missing, looked_up):
+            if isinstance(info, Exception):
+                self.lookup_errors += 1
+                logger.warning("Symbol lookup for %s failed: %s", key, info)
+                result[key] = None
+                continue
+            result[key] = info
+            fresh[key] = (info, now + (self.ttl if info else self.negative_ttl))
+            if info is not None and info.symbol != key:
+                # The canonical symbol resolves to itself
+                fresh[info.symbol] = (info, now + self.ttl)
+
+        if fresh:
+            self._entries.update(fresh)
+            try:
+                await run_blocking(self._write, fresh)
+            except Exception as exc:
+                logger.warning("Could not persist %d symbol(s): %s", len(fresh), exc)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "lookup_errors": self.lookup_errors,
+            "ttl_seconds": self.ttl,
+            "negative_ttl_seconds": self.negative_ttl,
+        }
+
+
+symbol_cache = SymbolCache()
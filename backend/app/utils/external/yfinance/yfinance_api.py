@@ -1,83 +1,313 @@
 import yfinance as yf
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
 import math
+import numpy as np
+import pandas as pd
 from urllib.parse import urlparse
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from app.utils.blocking import run_blocking
+from app.utils.external.exchangeRate.fx_rates import fx_service
+from app.utils.single_flight import yfinance_flight
+from .ohlc_store import ohlc_store
+from .quote_cache import info_cache, price_at_date_cache, price_cache
+from .symbol_cache import symbol_cache
+import asyncio
 #https://ranaroussi.github.io/yfinance
 router = APIRouter(prefix="/stock", tags=["stock"])
 
+MAX_BATCH_TICKERS = 100
+
+def _weekly_change(closes) -> float:
+    """Percent change across the last five closes, 0.0 when it can't be computed."""
+    last_week = closes.tail(5)
+    if len(last_week) >= 2:
+        first = last_week.iloc[0]
+        last = last_week.iloc[-1]
+        if first not in (0, None) and not (isinstance(first, float) and math.isnan(first)):
+            percent_change = ((last - first) / first) * 100
+            if percent_change is not None and not (isinstance(percent_change, float) and math.isnan(percent_change)):
+                return round(float(percent_change), 2)
+    return 0.0
+
+
+def _fetch_price_data(ticker_symbol: str) -> dict:
+    """Fast-moving part of a quote: latest close and weekly change from one history call."""
+    data = yf.Ticker(ticker_symbol).history(period="1mo")
+    if data is None or data.empty:
+        return {"price": None, "weekly_change": 0.0}
+
+    closes = data["Close"].dropna()
+    if closes.empty:
+        return {"price": None, "weekly_change": 0.0}
+    return {"price": float(closes.iloc[-1]), "weekly_change": _weekly_change(closes)}
+
+
+def _weekly_changes(closes: pd.DataFrame) -> pd.Series:
+    """Vectorized :func:`_weekly_change` for a date x ticker frame of closes."""
+    present = closes.notna()
+    # 1 for the newest non-NaN close of each column, 2 for the one before, ...
+    rank_from_end = present[::-1].cumsum()[::-1]
+    window = present.sum().clip(upper=5)
+    first = closes.where(present & rank_from_end.eq(window, axis=1)).max()
+    last = closes.ffill().iloc[-1]
+    change = ((last - first) / first * 100).round(2)
+    valid = (window >= 2) & first.ne(0) & change.notna()
+    return change.where(valid, 0.0)
+
+
+def _fetch_price_data_bulk(symbols: list[str]) -> dict[str, dict]:
+    """Price data for many tickers from a single ``yf.download`` call."""
+    empty = {symbol: {"price": None, "weekly_change": 0.0} for symbol in symbols}
+    data = yf.download(
+        symbols,
+        period="1mo",
+        interval="1d",
+        auto_adjust=True,
+        group_by="column",
+        progress=False,
+        threads=True,
+    )
+    if data is None or data.empty:
+        return empty
+
+    closes = data["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(symbols[0])
+    closes = closes.reindex(columns=symbols).astype(float)
+
+    prices = closes.ffill().iloc[-1]
+    changes = _weekly_changes(closes)
+    result = {}
+    for symbol in symbols:
+        price = prices[symbol]
+        result[symbol] = {
+            "price": None if math.isnan(price) else float(price),
+            "weekly_change": float(changes[symbol]),
+        }
+    return result
+
+
+def _fetch_profile(ticker_symbol: str) -> dict:
+    """Slow-changing part of a quote: display name and website domain from ``ticker.info``."""
+    info = yf.Ticker(ticker_symbol).info or {}
+
+    # Domain (website can be missing or not a string)
+    website = info.get("website")
+    domain = ""
+    if isinstance(website, str) and website:
+        try:
+            domain = urlparse(website).netloc or ""
+            domain = domain.removeprefix("www.")
+        except Exception:
+            domain = ""
+
+    return {"longname": info.get("longName"), "domain": domain}
+
+
+def _load_price_data(key: str):
+    return yfinance_flight.do((key, "1mo", "1d"), lambda: run_blocking(_fetch_price_data, key))
+
+
+def _load_price_data_bulk(keys: list[str]):
+    return yfinance_flight.do_many(
+        keys, lambda missing: run_blocking(_fetch_price_data_bulk, missing), scope=("1mo", "1d")
+    )
+
+
+def _load_profile(key: str):
+    return yfinance_flight.do((key, "info", None), lambda: run_blocking(_fetch_profile, key))
+
+
+async def load_daily_bars(ticker_symbol: str) -> pd.DataFrame:
+    """Daily OHLC bars from the local store, one concurrent refresh per ticker."""
+    key = ticker_symbol.upper()
+    return await yfinance_flight.do((key, "max", "1d"), lambda: run_blocking(ohlc_store.get_daily, key))
+
+
+async def get_quote(ticker_symbol: str) -> dict:
+    """Quote for one ticker, served from the price and info caches."""
+    key = ticker_symbol.upper()
+    price_data, profile = await asyncio.gather(
+        price_cache.get(key, lambda: _load_price_data(key)),
+        info_cache.get(key, lambda: _load_profile(key)),
+    )
+    return {
+        "price": price_data["price"],
+        "weekly_change": price_data["weekly_change"],
+        "longname": profile["longname"],
+        "domain": profile["domain"],
+    }
+
+
+async def get_quotes(ticker_symbols: list[str]) -> dict[str, dict]:
+    """Quotes for many tickers: one bulk download for uncached prices, cached profiles."""
+    keys = list(dict.fromkeys(symbol.upper() for symbol in ticker_symbols))
+
+    async def load_profile(key: str) -> dict:
+        try:
+            return await info_cache.get(key, lambda: _load_profile(key))
+        except Exception:
+            return {"longname": None, "domain": ""}
+
+    price_data, profiles = await asyncio.gather(
+        price_cache.get_many(keys, _load_price_data_bulk),
+        asyncio.gather(*(load_profile(key) for key in keys)),
+    )
+    return {
+        key: {
+            "price": price_data[key]["price"],
+            "weekly_change": price_data[key]["weekly_change"],
+            "longname": profile["longname"],
+            "domain": profile["domain"],
+        }
+        for key, profile in zip(keys, profiles)
+    }
+
+
+@router.get("/prices")
+async def get_stock_prices(tickers: str = Query(..., description="Comma-separated ticker symbols")):
+    symbols = [t.strip() for t in tickers.split(",") if t.strip()]
+    if not symbols:
+        raise HTTPException(status_code=400, detail="tickers is required")
+    if len(symbols) > MAX_BATCH_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_TICKERS} tickers per request")
+    try:
+        return await get_quotes(symbols)
+    except Exception as e:
+        return JSONResponse(
+            status_code=502,
+            content={"detail": f"Failed to fetch data for {tickers}: {type(e).__name__}"},
+        )
+
+
+@router.get("/cache/stats")
+async def get_quote_cache_stats():
+    return {
+        "price": price_cache.stats(),
+        "info": info_cache.stats(),
+        "price_at_date": price_at_date_cache.stats(),
+        "single_flight": yfinance_flight.stats(),
+        "fx": fx_service.stats(),
+        "symbols": symbol_cache.stats(),
+    }
+
+
 @router.get("/{ticker_symbol}/price")
-def get_stock_price(ticker_symbol: str):
+async def get_stock_price(ticker_symbol: str):
     try:
-        ticker = yf.Ticker(ticker_symbol)
-
-        info = ticker.info or {}
-        price = info.get("regularMarketPrice")
-
-        # Weekly change (fallback-safe)
-        rounded = 0.0
-        data = ticker.history(period="1mo")
-        if data is not None and not data.empty:
-            last_week = data.tail(5)
-            if len(last_week) >= 2:
-                first = last_week["Close"].iloc[0]
-                last = last_week["Close"].iloc[-1]
-                if first not in (0, None) and not (isinstance(first, float) and math.isnan(first)):
-                    percent_change = ((last - first) / first) * 100
-                    if percent_change is not None and not (isinstance(percent_change, float) and math.isnan(percent_change)):
-                        rounded = round(float(percent_change), 2)
-
-        # Domain (website can be missing or not a string)
-        website = info.get("website")
-        domain = ""
-        if isinstance(website, str) and website:
-            try:
-                domain = urlparse(website).netloc or ""
-                domain = domain.removeprefix("www.")
-            except Exception:
-                domain = ""
-
-        return {
-            "price": price,
-            "weekly_change": rounded,
-            "longname": info.get("longName"),
-            "domain": domain,
-        }
+        return await get_quote(ticker_symbol)
     except Exception as e:
         return JSONResponse(
             status_code=502,
             content={"detail": f"Failed to fetch data for {ticker_symbol}: {type(e).__name__}"},
         )
 
+
+PRICE_AT_DATE_LOOKBACK_DAYS = 6
+MAX_BATCH_PRICE_AT_DATE = 1000
+
+
+class PriceAtDateItem(BaseModel):
+    ticker: str = Field(min_length=1)
+    day: date = Field(alias="date")
+
+
+class PriceAtDateBatchRequest(BaseModel):
+    items: list[PriceAtDateItem] = Field(min_length=1, max_length=MAX_BATCH_PRICE_AT_DATE)
+
+
+def _prices_at_dates(df: pd.DataFrame, dates: list[str]) -> dict[str, dict]:
+    """Close of the last trading day on or before each date, resolved with one ``searchsorted``.
+
+    Dates with no bar in the ``PRICE_AT_DATE_LOOKBACK_DAYS`` before them resolve to nulls.
+    """
+    empty = {"price": None, "date": None}
+    if df.empty:
+        return {day: empty for day in dates}
+
+    # Exchange-local trading days, sorted ascending
+    days = df.index.tz_localize(None).normalize().to_numpy(dtype="datetime64[D]")
+    closes = df["Close"].to_numpy(dtype=float)
+    targets = np.array(dates, dtype="datetime64[D]")
+
+    pos = days.searchsorted(targets, side="right") - 1
+    found = pos >= 0
+    pos = pos.clip(min=0)
+    found &= days[pos] >= targets - np.timedelta64(PRICE_AT_DATE_LOOKBACK_DAYS, "D")
+    found &= ~np.isnan(closes[pos])
+
+    prices = closes[pos].round(4).tolist()
+    matched = days[pos].astype(str).tolist()
+    return {
+        day: {"price": prices[i], "date": matched[i]} if found[i] else empty
+        for i, day in enumerate(dates)
+    }
+
+
+def _is_settled(day: str) -> bool:
+    """Dates at least two days back can no longer gain a newer bar, so their answer is final."""
+    return date.fromisoformat(day) < datetime.now().date() - timedelta(days=1)
+
+
+async def get_prices_at_dates(pairs: list[tuple[str, str]]) -> tuple[dict, dict[str, Exception]]:
+    """Resolve ``(ticker, date)`` pairs, loading each ticker's daily bars once.
+
+    Returns the resolved prices keyed by pair and an error per ticker whose bars
+    could not be loaded. Settled dates that resolved to a price are cached for
+    the life of the process; a null answer may be a transient Yahoo miss and is
+    looked up again next time.
+    """
+    errors: dict[str, Exception] = {}
+
+    async def load(keys: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+        dates_by_ticker: dict[str, list[str]] = {}
+        for ticker, day in keys:
+            dates_by_ticker.setdefault(ticker, []).append(day)
+
+        tickers = list(dates_by_ticker)
+        frames = await asyncio.gather(*(load_daily_bars(t) for t in tickers), return_exceptions=True)
+
+        def resolve() -> dict[tuple[str, str], dict]:
+            resolved = {}
+            for ticker, df in zip(tickers, frames):
+                if isinstance(df, Exception):
+                    errors[ticker] = df
+                    continue
+                for day, value in _prices_at_dates(df, dates_by_ticker[ticker]).items():
+                    resolved[(ticker, day)] = value
+            return resolved
+
+        return await run_blocking(resolve)
+
+    unpriced: dict[tuple[str, str], dict] = {}
+
+    async def load_settled(keys: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+        loaded = await load(keys)
+        unpriced.update((key, value) for key, value in loaded.items() if value["price"] is None)
+        return {key: value for key, value in loaded.items() if value["price"] is not None}
+
+    keys = list(dict.fromkeys((ticker.upper(), day) for ticker, day in pairs))
+    settled = [key for key in keys if _is_settled(key[1])]
+    recent = [key for key in keys if not _is_settled(key[1])]
+
+    results = {}
+    if settled:
+        results.update(await price_at_date_cache.get_many(settled, load_settled))
+        results.update(unpriced)
+    if recent:
+        results.update(await load(recent))
+    return results, errors
+
+
 @router.get("/{ticker_symbol}/price-at-date")
-def get_price_at_date(ticker_symbol: str, date: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$")):
+async def get_price_at_date(ticker_symbol: str, day: date = Query(..., alias="date")):
     try:
-        target = datetime.strptime(date, "%Y-%m-%d").date()
-        start = target - timedelta(days=6)
-        end = target + timedelta(days=1)
-
-        ticker = yf.Ticker(ticker_symbol)
-        df = ticker.history(start=str(start), end=str(end))
-
-        if df.empty:
-            return {"price": None, "date": None}
-
-        # Find the closest trading day on or before the target date
-        valid = df[df.index.date <= target]
-        if valid.empty:
-            # All available dates are after target; take the earliest
-            row = df.iloc[0]
-            return {
-                "price": round(float(row["Close"]), 4),
-                "date": str(df.index[0].date()),
-            }
-
-        row = valid.iloc[-1]
-        return {
-            "price": round(float(row["Close"]), 4),
-            "date": str(valid.index[-1].date()),
-        }
+        results, errors = await get_prices_at_dates([(ticker_symbol, day.isoformat())])
+        if errors:
+            raise next(iter(errors.values()))
+        return results[(ticker_symbol.upper(), day.isoformat())]
     except Exception as e:
         return JSONResponse(
             status_code=502,
@@ -85,68 +315,143 @@ def get_price_at_date(ticker_symbol: str, date: str = Query(..., pattern=r"^\d{4
         )
 
 
-@router.get("/{ticker_symbol}/history")
-def get_chart_history(ticker_symbol: str):
-    try:
-        ticker = yf.Ticker(ticker_symbol)
-
-        periods = {
-            "1D": ("1d", "5m"),      # 1-day, 5-minute resolution
-            "1W": ("5d", "1h"),      # 5-day, 1-hour resolution
-            "1M": ("1mo", "1d"),     # 1-month, 1-day resolution
-            "1Y": ("1y", "1wk"),     # 1-year, 1-week resolution
-            "ALL": ("max", "1mo")    # all history, monthly resolution
-        }
+@router.post("/price-at-date/batch")
+async def get_price_at_date_batch(request: PriceAtDateBatchRequest):
+    pairs = [(item.ticker.strip().upper(), item.day.isoformat()) for item in request.items]
+    results, errors = await get_prices_at_dates(pairs)
 
-        result = {}
+    items = []
+    for ticker, day in pairs:
+        item = {"ticker": ticker, "date": day}
+        if ticker in errors:
+            item.update(price=None, price_date=None, error=f"Failed to fetch historical price: {type(errors[ticker]).__name__}")
+        else:
+            resolved = results[(ticker, day)]
+            item.update(price=resolved["price"], price_date=resolved["date"])
+        items.append(item)
+    return {"items": items}
 
-        # First, get 1D data to have the most recent price
-        df_1d = ticker.history(period="1d", interval="5m")
-        latest_entry = None
 
-        if not df_1d.empty:
-            last_ts = df_1d.index[-1]
-            last_price = df_1d["Close"].iloc[-1]
-            if last_price is not None and not (isinstance(last_price, float) and math.isnan(last_price)):
-                latest_entry = {
-                    "timestamp": int(last_ts.timestamp() * 1000),
-                    "value": float(last_price)
-                }
+CHART_RANGES = ("1D", "1W", "1M", "1Y", "ALL")
+INTRADAY_RANGES = {"1D", "1W"}
 
-        for label, (period, interval) in periods.items():
-            df = ticker.history(period=period, interval=interval)
 
-            if df.empty:
-                result[label] = []
-                continue
+def _close_arrays(closes: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Epoch-millisecond timestamps and float closes, NaN rows dropped."""
+    closes = closes.dropna()
+    timestamps = closes.index.as_unit("ms").asi8
+    return timestamps, closes.to_numpy(dtype=float)
 
-            entries = []
-            for ts, row in df.iterrows():
-                price = row["Close"]
 
-                # Sometimes Close is NaN → skip it
-                if price is None or (isinstance(price, float) and math.isnan(price)):
-                    continue
+def _format_points(timestamps: np.ndarray, values: np.ndarray, columnar: bool) -> list[dict] | dict:
+    t = timestamps.tolist()
+    v = values.tolist()
+    if columnar:
+        return {"t": t, "v": v}
+    return [{"timestamp": ts, "value": value} for ts, value in zip(t, v)]
+
+
+def _build_chart_ranges(
+    intraday: pd.Series | None,
+    daily: pd.Series | None,
+    ranges: list[str],
+    columnar: bool = False,
+) -> dict:
+    """Derive every requested range from one 5-minute and one daily close series.
+
+    - 1D: 5-minute closes of the most recent trading day
+    - 1W: 5-minute closes resampled to hourly bars
+    - 1M: daily closes of the last month
+    - 1Y: daily closes of the last year resampled to weekly bars (week starting Monday)
+    - ALL: all daily closes resampled to monthly bars (month start)
+
+    Points are returned as ``[{"timestamp", "value"}, ...]`` or, with ``columnar``,
+    as ``{"t": [...], "v": [...]}``.
+    """
+    series: dict[str, pd.Series] = {}
+
+    if intraday is not None and not intraday.empty:
+        last_day = intraday.index[-1].date()
+        series["1D"] = intraday[intraday.index.date == last_day]
+        series["1W"] = intraday.resample("1h", origin="start").last()
+    if daily is not None and not daily.empty:
+        last_ts = daily.index[-1]
+        series["1M"] = daily[daily.index >= last_ts - pd.DateOffset(months=1)]
+        series["1Y"] = (
+            daily[daily.index >= last_ts - pd.DateOffset(years=1)]
+            .resample("W-MON", label="left", closed="left")
+            .last()
+        )
+        series["ALL"] = daily.resample("MS").last()
+
+    latest = None
+    latest_source = intraday if intraday is not None and not intraday.empty else daily
+    if latest_source is not None and not latest_source.empty:
+        latest_ts, latest_values = _close_arrays(latest_source.tail(1))
+        if len(latest_ts):
+            latest = (latest_ts[0], latest_values[0])
+
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=float))
+    result = {}
+    for label in ranges:
+        timestamps, values = _close_arrays(series[label]) if label in series else empty
+
+        # For non-1D timeframes, ensure the last price matches the latest known price
+        if label != "1D" and latest is not None and len(timestamps):
+            if latest[0] > timestamps[-1]:
+                # Latest price is newer than the last entry → append it
+                timestamps = np.append(timestamps, latest[0])
+                values = np.append(values, latest[1])
+            else:
+                # The last candle (e.g. incomplete week/month) already covers this time,
+                # but its close price may differ from the current price → update it
+                values = values.copy()
+                values[-1] = latest[1]
+
+        result[label] = _format_points(timestamps, values, columnar)
 
-                entries.append({
-                    "timestamp": int(ts.timestamp() * 1000),
-                    "value": float(price)
-                })
-
-            # For non-1D timeframes, ensure the last price matches the latest known price
-            if label != "1D" and latest_entry and entries:
-                last_entry_ts = entries[-1]["timestamp"]
-                if latest_entry["timestamp"] > last_entry_ts:
-                    # Latest price is newer than the last entry → append it
-                    entries.append(latest_entry)
-                else:
-                    # The last candle (e.g. incomplete week/month) already covers this time,
-                    # but its close price may differ from the current price → update it
-                    entries[-1]["value"] = latest_entry["value"]
-
-            result[label] = entries
-
-        return result
+    return result
+
+
+def _fetch_intraday_closes(ticker_symbol: str) -> pd.Series:
+    return yf.Ticker(ticker_symbol).history(period="5d", interval="5m")["Close"].dropna()
+
+
+async def _fetch_chart_history(ticker_symbol: str, ranges: list[str], columnar: bool = False) -> dict:
+    """5 days of 5-minute bars from upstream; daily closes from the local OHLC store."""
+    key = ticker_symbol.upper()
+
+    async def intraday_closes() -> pd.Series | None:
+        if not INTRADAY_RANGES.intersection(ranges):
+            return None
+        return await yfinance_flight.do((key, "5d", "5m"), lambda: run_blocking(_fetch_intraday_closes, key))
+
+    async def daily_closes() -> pd.Series | None:
+        if not set(ranges) - INTRADAY_RANGES:
+            return None
+        return (await load_daily_bars(key))["Close"].dropna()
+
+    intraday, daily = await asyncio.gather(intraday_closes(), daily_closes())
+    return await run_blocking(_build_chart_ranges, intraday, daily, ranges, columnar)
+
+
+@router.get("/{ticker_symbol}/history")
+async def get_chart_history(
+    ticker_symbol: str,
+    ranges: str | None = Query(None, description="Comma-separated subset of 1D,1W,1M,1Y,ALL"),
+    format: str = Query("rows", pattern="^(rows|columnar)$"),
+):
+    requested = list(CHART_RANGES)
+    if ranges:
+        requested = list(dict.fromkeys(r.strip().upper() for r in ranges.split(",") if r.strip()))
+        unknown = [r for r in requested if r not in CHART_RANGES]
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown ranges {unknown}; expected a subset of {', '.join(CHART_RANGES)}",
+            )
+    try:
+        return await _fetch_chart_history(ticker_symbol, requested, format == "columnar")
     except Exception as e:
         return JSONResponse(
             status_code=502,
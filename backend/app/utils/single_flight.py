@@ -0,0 +1,91 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Coalesce concurrent identical upstream calls into one in-flight fetch.
+
+    The first caller for a key starts the fetch; callers arriving while it runs
+    await the same result (or exception). Nothing is kept once the fetch
+    finishes, so this only deduplicates concurrent work; caching is left to the
+    callers. A cancelled waiter does not cancel the shared fetch.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _track(self, key: Hashable, future: asyncio.Future) -> None:
+        self._calls[key] = future
+
+        def forget(done: asyncio.Future) -> None:
+            if self._calls.get(key) is done:
+                del self._calls[key]
+            if not done.cancelled():
+                # Mark the exception retrieved even if every waiter went away.
+                done.exception()
+
+        future.add_done_callback(forget)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            self.started += 1
+            future = asyncio.ensure_future(fn())
+            self._track(key, future)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    async def do_many(
+        self,
+        keys: list[Hashable],
+        loader: Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]],
+        scope: tuple = (),
+    ) -> dict[Hashable, Any]:
+        """Batch variant of :meth:`do`: keys already in flight are awaited, the rest
+        are loaded together in one ``loader`` call that later callers can join per key.
+
+        Each key is tracked as ``(key, *scope)`` so a batch shares flights with
+        single calls such as ``do((ticker, period, interval), ...)``; ``loader``
+        receives and returns plain keys.
+        """
+        def flight_key(key: Hashable) -> Hashable:
+            return (key, *scope) if scope else key
+
+        futures: dict[Hashable, asyncio.Future] = {}
+        missing: list[Hashable] = []
+        for key in dict.fromkeys(keys):
+            future = self._calls.get(flight_key(key))
+            if future is None:
+                missing.append(key)
+            else:
+                self.coalesced += 1
+                futures[key] = future
+
+        if missing:
+            self.started += 1
+            batch = asyncio.ensure_future(loader(missing))
+
+            async def pick(key: Hashable) -> Any:
+                return (await batch).get(key)
+
+            for key in missing:
+                futures[key] = asyncio.ensure_future(pick(key))
+                self._track(flight_key(key), futures[key])
+
+        values = await asyncio.gather(*(asyncio.shield(future) for future in futures.values()))
+        return dict(zip(futures.keys(), values))
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+# Shared by every route that calls yfinance. Keys are (ticker, period, interval).
+yfinance_flight = SingleFlight("yfinance")
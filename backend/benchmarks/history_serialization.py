@@ -0,0 +1,86 @@
+"""Microbenchmark: chart history serialization, iterrows vs. vectorized.
+
+Run from ``backend/``:
+
+    uv run python -m benchmarks.history_serialization
+
+Frames mimic what ``yf.Ticker.history`` returns (OHLCV columns, tz-aware index)
+at the sizes each chart range produces.
+"""
+import math
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from app.utils.external.yfinance.yfinance_api import _close_arrays, _format_points
+
+# label -> (rows, frequency)
+RANGES = {
+    "1D (5m)": (78, "5min"),
+    "1W (1h)": (35, "1h"),
+    "1M (1d)": (22, "1D"),
+    "1Y (1wk)": (52, "7D"),
+    "ALL (1mo)": (540, "30D"),
+    "5d intraday source (5m)": (390, "5min"),
+    "max daily source (1d)": (11000, "1D"),
+}
+
+
+def make_history(rows: int, freq: str) -> pd.DataFrame:
+    index = pd.date_range("2000-01-03 09:30", periods=rows, freq=freq, tz="America/New_York")
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(rows).cumsum()
+    close[rng.random(rows) < 0.01] = np.nan
+    return pd.DataFrame(
+        {
+            "Open": close,
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close,
+            "Volume": rng.integers(1_000, 1_000_000, rows),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        },
+        index=index,
+    )
+
+
+def serialize_iterrows(df: pd.DataFrame) -> list[dict]:
+    """The previous per-row implementation from ``get_chart_history``."""
+    entries = []
+    for ts, row in df.iterrows():
+        price = row["Close"]
+        if price is None or (isinstance(price, float) and math.isnan(price)):
+            continue
+        entries.append({"timestamp": int(ts.timestamp() * 1000), "value": float(price)})
+    return entries
+
+
+def serialize_vectorized(df: pd.DataFrame, columnar: bool) -> list[dict] | dict:
+    return _format_points(*_close_arrays(df["Close"]), columnar)
+
+
+def best_of(func, repeat: int = 5) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main() -> None:
+    print(f"{'range':<26}{'rows':>7}{'iterrows µs':>14}{'rows µs':>10}{'columnar µs':>13}{'speedup':>10}")
+    for label, (rows, freq) in RANGES.items():
+        df = make_history(rows, freq)
+        assert serialize_iterrows(df) == serialize_vectorized(df, columnar=False)
+
+        old = best_of(lambda: serialize_iterrows(df))
+        new_rows = best_of(lambda: serialize_vectorized(df, columnar=False))
+        new_columnar = best_of(lambda: serialize_vectorized(df, columnar=True))
+        print(
+            f"{label:<26}{rows:>7}{old * 1e6:>14.0f}{new_rows * 1e6:>10.0f}"
+            f"{new_columnar * 1e6:>13.0f}{old / new_rows:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+-- Materialized portfolio state, maintained by the API on every trade write.
+-- Rows are rebuilt from invest.trades whenever a trade is deleted or written
+-- out of order, so both tables can be truncated safely at any time.
+
+create table if not exists invest.positions (
+    user_id uuid not null references auth.users (id) on delete cascade,
+    ticker text not null,
+    quantity double precision not null default 0,
+    cost_minor double precision not null default 0,
+    currency text not null default 'USD',
+    last_trade_id text,
+    last_trade_date date,
+    last_trade_created_at timestamptz,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, ticker)
+);
+
+create table if not exists invest.cash_balances (
+    user_id uuid not null references auth.users (id) on delete cascade,
+    currency text not null,
+    cash_minor bigint not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, currency)
+);
+
+alter table invest.positions enable row level security;
+alter table invest.cash_balances enable row level security;
+
+create policy "positions are owned by their user" on invest.positions
+    for all to authenticated
+    using (user_id = auth.uid())
+    with check (user_id = auth.uid());
+
+create policy "cash balances are owned by their user" on invest.cash_balances
+    for all to authenticated
+    using (user_id = auth.uid())
+    with check (user_id = auth.uid());
+
+grant select, insert, update, delete on invest.positions to authenticated;
+grant select, insert, update, delete on invest.cash_balances to authenticated;
+
+-- Per-ticker replays read one user's trades for one ticker in trade order.
+create index if not exists trades_user_ticker_order_idx
+    on invest.trades (user_id, ticker, trade_date, created_at);
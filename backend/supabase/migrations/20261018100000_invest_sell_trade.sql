@@ -0,0 +1,65 @@
+-- Net held quantity per ticker, and an atomic check-and-insert for sells.
+-- Both run as the calling user, so the RLS policies on invest.trades apply.
+
+create or replace view invest.holdings
+with (security_invoker = true) as
+select
+    user_id,
+    ticker,
+    sum(case when lower(type) = 'sell' then -quantity else quantity end) as quantity
+from invest.trades
+group by user_id, ticker;
+
+grant select on invest.holdings to authenticated;
+
+-- Lets the per-ticker sum above run as an index-only scan.
+create index if not exists trades_user_ticker_quantity_idx
+    on invest.trades (user_id, ticker) include (type, quantity);
+
+-- Inserts a sell for the calling user only if they hold at least p_quantity of
+-- p_ticker. Concurrent sells of the same ticker by the same user are serialized
+-- by a transaction-scoped advisory lock, so two of them cannot both pass the
+-- check. Raises check_violation (23514) with the held quantity in DETAIL otherwise.
+create or replace function invest.sell_trade(
+    p_ticker text,
+    p_quantity numeric,
+    p_gross_minor bigint,
+    p_fee_minor bigint default 0,
+    p_trade_date date default current_date
+)
+returns invest.trades
+language plpgsql
+security invoker
+set search_path = ''
+as $$
+declare
+    v_user_id uuid := auth.uid();
+    v_held numeric;
+    v_trade invest.trades;
+begin
+    if v_user_id is null then
+        raise exception 'not authenticated' using errcode = '42501';
+    end if;
+
+    perform pg_advisory_xact_lock(hashtextextended(v_user_id::text || ':' || p_ticker, 0));
+
+    select coalesce(sum(case when lower(t.type) = 'sell' then -t.quantity else t.quantity end), 0)
+      into v_held
+      from invest.trades t
+     where t.user_id = v_user_id
+       and t.ticker = p_ticker;
+
+    if v_held < p_quantity - 1e-9 then
+        raise exception 'insufficient shares'
+            using errcode = 'check_violation', detail = v_held::text;
+    end if;
+
+    insert into invest.trades (user_id, ticker, type, quantity, gross_minor, fee_minor, trade_date)
+    values (v_user_id, p_ticker, 'sell', p_quantity, p_gross_minor, p_fee_minor, p_trade_date)
+    returning * into v_trade;
+
+    return v_trade;
+end;
+$$;
+
+grant execute on function invest.sell_trade(text, numeric, bigint, bigint, date) to authenticated;
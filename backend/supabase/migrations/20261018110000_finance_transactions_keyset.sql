@@ -0,0 +1,4 @@
+-- Keyset pagination over an account's transactions, newest first:
+-- the CSV export and GET /finance/transactions/{account_id} page on (txn_date, id).
+create index if not exists transactions_account_date_id_idx
+    on finance.transactions (account_id, txn_date desc, id desc);
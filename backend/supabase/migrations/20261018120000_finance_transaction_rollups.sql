@@ -0,0 +1,117 @@
+-- Monthly transaction totals per account, category, type and currency,
+-- maintained by the API on every transaction write through the functions
+-- below. The table can be truncated safely at any time: a user without
+-- rollup rows gets a rebuild from finance.transactions on their next read.
+
+create table if not exists finance.transaction_rollups (
+    user_id uuid not null references auth.users (id) on delete cascade,
+    account_id uuid not null references finance.accounts (id) on delete cascade,
+    month date not null,
+    category_id uuid,
+    type text not null,
+    currency text not null,
+    amount_minor numeric not null default 0,
+    txn_count integer not null default 0,
+    updated_at timestamptz not null default now(),
+    constraint transaction_rollups_key
+        unique nulls not distinct (user_id, month, account_id, category_id, type, currency)
+);
+
+alter table finance.transaction_rollups enable row level security;
+
+create policy "transaction rollups are owned by their user" on finance.transaction_rollups
+    for all to authenticated
+    using (user_id = auth.uid())
+    with check (user_id = auth.uid());
+
+grant select, insert, update, delete on finance.transaction_rollups to authenticated;
+
+-- Rebuilds group one user's transactions by month.
+create index if not exists transactions_user_date_idx
+    on finance.transactions (user_id, txn_date);
+
+-- Adds (p_sign = 1) or removes (p_sign = -1) a batch of the calling user's
+-- transactions, given as a JSON array of transaction rows. Increments are
+-- applied in one upsert, so concurrent writers never lose an update, and
+-- groups that drop to zero transactions are deleted. A user without any
+-- rollup rows is skipped: their next read rebuilds from scratch, which also
+-- covers rollups dropped after a failed update.
+create or replace function finance.apply_transaction_rollups(
+    p_transactions jsonb,
+    p_sign integer default 1
+)
+returns void
+language sql
+security invoker
+set search_path = ''
+as $$
+    select pg_advisory_xact_lock(hashtextextended('rollups:' || auth.uid()::text, 0));
+
+    insert into finance.transaction_rollups as r
+        (user_id, month, account_id, category_id, type, currency, amount_minor, txn_count)
+    select
+        auth.uid(),
+        date_trunc('month', t.txn_date)::date,
+        t.account_id,
+        t.category_id,
+        upper(t.type),
+        upper(t.currency),
+        p_sign * sum(t.amount_minor),
+        p_sign * count(*)
+    from jsonb_to_recordset(p_transactions) as t(
+        account_id uuid, txn_date date, category_id uuid, type text, currency text, amount_minor numeric
+    )
+    where exists (select 1 from finance.transaction_rollups e where e.user_id = auth.uid())
+    group by 1, 2, 3, 4, 5, 6
+    on conflict on constraint transaction_rollups_key do update
+        set amount_minor = r.amount_minor + excluded.amount_minor,
+            txn_count = r.txn_count + excluded.txn_count,
+            updated_at = now();
+
+    delete from finance.transaction_rollups
+     where user_id = auth.uid()
+       and txn_count <= 0;
+$$;
+
+-- Replaces the calling user's rollups with totals recomputed from
+-- finance.transactions. Returns the number of rollup rows written.
+create or replace function finance.rebuild_transaction_rollups()
+returns integer
+language plpgsql
+security invoker
+set search_path = ''
+as $$
+declare
+    v_user_id uuid := auth.uid();
+    v_rows integer;
+begin
+    if v_user_id is null then
+        raise exception 'not authenticated' using errcode = '42501';
+    end if;
+
+    perform pg_advisory_xact_lock(hashtextextended('rollups:' || v_user_id::text, 0));
+
+    delete from finance.transaction_rollups where user_id = v_user_id;
+
+    insert into finance.transaction_rollups
+        (user_id, month, account_id, category_id, type, currency, amount_minor, txn_count)
+    select
+        v_user_id,
+        date_trunc('month', t.txn_date)::date,
+        t.account_id,
+        t.category_id,
+        upper(t.type),
+        upper(t.currency),
+        sum(t.amount_minor),
+        count(*)
+    from finance.transactions t
+    where t.user_id = v_user_id
+    group by 1, 2, 3, 4, 5, 6;
+
+    get diagnostics v_rows = row_count;
+    return v_rows;
+end;
+$$;
+
+grant execute on function finance.apply_transaction_rollups(jsonb, integer) to authenticated;
+grant execute on function finance.rebuild_transaction_rollups() to authenticated;
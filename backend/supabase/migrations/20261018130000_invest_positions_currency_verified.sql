@@ -0,0 +1,5 @@
+-- False when the ticker's trading currency could not be resolved upstream
+-- (delisted symbol, Yahoo outage) and the snapshot fell back to a guess.
+-- The portfolio read retries those tickers and rebuilds once they resolve.
+alter table invest.positions
+    add column if not exists currency_verified boolean not null default true;
@@ -0,0 +1,169 @@
+-- Atomic writes for the position snapshot (invest.positions / invest.cash_balances).
+--
+-- apply_trade_to_snapshot folds one trade in under the per-ticker advisory
+-- lock invest.sell_trade uses, and adds to the cash row with an in-place
+-- increment, so concurrent trades (same ticker or same currency) never lose
+-- an update. replace_snapshot swaps in a full replay computed by the API, but
+-- only if invest.trades still matches what was replayed. Incremental updates
+-- hold a shared per-user lock and replacements an exclusive one, so the two
+-- never interleave.
+
+-- Returns 'applied' (also when the trade is already in the snapshot) or
+-- 'rebuild' when the snapshot cannot be updated in place: the user has no
+-- snapshot yet, or the trade sorts before the ticker's last applied trade.
+create or replace function invest.apply_trade_to_snapshot(
+    p_trade_id text,
+    p_ticker text,
+    p_type text,
+    p_quantity double precision,
+    p_gross_minor bigint,
+    p_fee_minor bigint,
+    p_trade_date date,
+    p_created_at timestamptz,
+    p_currency text,
+    p_currency_verified boolean default true
+)
+returns text
+language plpgsql
+security invoker
+set search_path = ''
+as $$
+declare
+    v_user_id uuid := auth.uid();
+    v_pos invest.positions;
+    v_quantity double precision := 0;
+    v_cost double precision := 0;
+    v_cash bigint := 0;
+    v_currency text := p_currency;
+    v_verified boolean := p_currency_verified;
+begin
+    if v_user_id is null then
+        raise exception 'not authenticated' using errcode = '42501';
+    end if;
+
+    perform pg_advisory_xact_lock_shared(hashtextextended('snapshot:' || v_user_id::text, 0));
+    perform pg_advisory_xact_lock(hashtextextended(v_user_id::text || ':' || p_ticker, 0));
+
+    select * into v_pos
+      from invest.positions p
+     where p.user_id = v_user_id
+       and p.ticker = p_ticker
+       for update;
+
+    if not found then
+        if not exists (select 1 from invest.positions p where p.user_id = v_user_id) then
+            return 'rebuild';
+        end if;
+    else
+        -- A replay that ran after the trade was inserted already counted it
+        if v_pos.last_trade_id = p_trade_id then
+            return 'applied';
+        end if;
+        if ((p_trade_date, p_created_at) < (v_pos.last_trade_date, v_pos.last_trade_created_at)) is true then
+            return 'rebuild';
+        end if;
+        v_quantity := v_pos.quantity;
+        v_cost := v_pos.cost_minor;
+        v_currency := v_pos.currency;
+        v_verified := v_pos.currency_verified;
+    end if;
+
+    if lower(p_type) = 'buy' then
+        v_cash := -(p_gross_minor + p_fee_minor);
+        v_cost := v_cost + p_gross_minor + p_fee_minor;
+        v_quantity := v_quantity + p_quantity;
+    elsif lower(p_type) = 'sell' then
+        v_cash := p_gross_minor - p_fee_minor;
+        if v_quantity > 1e-9 then
+            v_cost := greatest(0, v_cost - v_cost / v_quantity * p_quantity);
+        end if;
+        v_quantity := greatest(0, v_quantity - p_quantity);
+    end if;
+
+    insert into invest.positions as p (
+        user_id, ticker, quantity, cost_minor, currency, currency_verified,
+        last_trade_id, last_trade_date, last_trade_created_at, updated_at
+    )
+    values (
+        v_user_id, p_ticker, v_quantity, v_cost, v_currency, v_verified,
+        p_trade_id, p_trade_date, p_created_at, now()
+    )
+    on conflict (user_id, ticker) do update
+        set quantity = excluded.quantity,
+            cost_minor = excluded.cost_minor,
+            last_trade_id = excluded.last_trade_id,
+            last_trade_date = excluded.last_trade_date,
+            last_trade_created_at = excluded.last_trade_created_at,
+            updated_at = excluded.updated_at;
+
+    insert into invest.cash_balances as c (user_id, currency, cash_minor, updated_at)
+    values (v_user_id, v_currency, v_cash, now())
+    on conflict (user_id, currency) do update
+        set cash_minor = c.cash_minor + excluded.cash_minor,
+            updated_at = excluded.updated_at;
+
+    return 'applied';
+end;
+$$;
+
+-- Replaces the calling user's snapshot with p_positions / p_cash (JSON arrays
+-- of invest.positions / invest.cash_balances rows). Returns false, writing
+-- nothing, if invest.trades no longer has p_trade_count rows ending at
+-- p_last_created_at, i.e. a trade was added or removed since the replay read it.
+create or replace function invest.replace_snapshot(
+    p_positions jsonb,
+    p_cash jsonb,
+    p_trade_count bigint,
+    p_last_created_at timestamptz
+)
+returns boolean
+language plpgsql
+security invoker
+set search_path = ''
+as $$
+declare
+    v_user_id uuid := auth.uid();
+    v_count bigint;
+    v_last timestamptz;
+begin
+    if v_user_id is null then
+        raise exception 'not authenticated' using errcode = '42501';
+    end if;
+
+    perform pg_advisory_xact_lock(hashtextextended('snapshot:' || v_user_id::text, 0));
+
+    select count(*), max(t.created_at) into v_count, v_last
+      from invest.trades t
+     where t.user_id = v_user_id;
+
+    if v_count <> p_trade_count or v_last is distinct from p_last_created_at then
+        return false;
+    end if;
+
+    delete from invest.positions where user_id = v_user_id;
+    delete from invest.cash_balances where user_id = v_user_id;
+
+    insert into invest.positions (
+        user_id, ticker, quantity, cost_minor, currency, currency_verified,
+        last_trade_id, last_trade_date, last_trade_created_at
+    )
+    select
+        v_user_id, p.ticker, p.quantity, p.cost_minor, p.currency, coalesce(p.currency_verified, true),
+        p.last_trade_id, p.last_trade_date, p.last_trade_created_at
+    from jsonb_to_recordset(p_positions) as p(
+        ticker text, quantity double precision, cost_minor double precision, currency text,
+        currency_verified boolean, last_trade_id text, last_trade_date date, last_trade_created_at timestamptz
+    );
+
+    insert into invest.cash_balances (user_id, currency, cash_minor)
+    select v_user_id, c.currency, c.cash_minor
+    from jsonb_to_recordset(p_cash) as c(currency text, cash_minor bigint);
+
+    return true;
+end;
+$$;
+
+grant execute on function invest.apply_trade_to_snapshot(
+    text, text, text, double precision, bigint, bigint, date, timestamptz, text, boolean
+) to authenticated;
+grant execute on function invest.replace_snapshot(jsonb, jsonb, bigint, timestamptz) to authenticated;
@@ -0,0 +1,100 @@
+-- Maintain finance.transaction_rollups from triggers on finance.transactions
+-- instead of a separate API call after each write.
+--
+-- finance.apply_transaction_rollups ran in its own transaction after the
+-- transaction row had committed. A rebuild that ran in between counted the
+-- row, and the following increment counted it again. The triggers apply the
+-- increment inside the writing transaction, under the per-user advisory lock
+-- finance.rebuild_transaction_rollups takes. A rebuild therefore either sees
+-- the row after its increment has committed, or runs before the row exists
+-- and the increment lands on top of the rebuilt totals. Writes made outside
+-- the API are now counted too.
+
+-- Applies one statement's inserted (new_rows) and/or deleted (old_rows)
+-- transactions, aggregated per rollup key. Users without any rollup rows are
+-- skipped: their next read rebuilds from scratch. Security definer so writes
+-- by any role keep the rollups in step.
+create or replace function finance.transactions_rollup_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = ''
+as $$
+begin
+    if tg_op in ('DELETE', 'UPDATE') then
+        perform pg_advisory_xact_lock(hashtextextended('rollups:' || u.user_id::text, 0))
+           from (select distinct o.user_id from old_rows o order by o.user_id) u;
+
+        -- Update only: groups a cascaded account delete already removed stay removed
+        update finance.transaction_rollups r
+           set amount_minor = r.amount_minor - d.amount_minor,
+               txn_count = r.txn_count - d.txn_count,
+               updated_at = now()
+          from (
+              select o.user_id,
+                     date_trunc('month', o.txn_date)::date as month,
+                     o.account_id,
+                     o.category_id,
+                     upper(o.type) as type,
+                     upper(o.currency) as currency,
+                     sum(o.amount_minor) as amount_minor,
+                     count(*) as txn_count
+                from old_rows o
+               group by 1, 2, 3, 4, 5, 6
+          ) d
+         where r.user_id = d.user_id
+           and r.month = d.month
+           and r.account_id = d.account_id
+           and r.category_id is not distinct from d.category_id
+           and r.type = d.type
+           and r.currency = d.currency;
+
+        delete from finance.transaction_rollups r
+         where r.user_id in (select o.user_id from old_rows o)
+           and r.txn_count <= 0;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform pg_advisory_xact_lock(hashtextextended('rollups:' || u.user_id::text, 0))
+           from (select distinct n.user_id from new_rows n order by n.user_id) u;
+
+        insert into finance.transaction_rollups as r
+            (user_id, month, account_id, category_id, type, currency, amount_minor, txn_count)
+        select
+            n.user_id,
+            date_trunc('month', n.txn_date)::date,
+            n.account_id,
+            n.category_id,
+            upper(n.type),
+            upper(n.currency),
+            sum(n.amount_minor),
+            count(*)
+        from new_rows n
+        where exists (select 1 from finance.transaction_rollups e where e.user_id = n.user_id)
+        group by 1, 2, 3, 4, 5, 6
+        on conflict on constraint transaction_rollups_key do update
+            set amount_minor = r.amount_minor + excluded.amount_minor,
+                txn_count = r.txn_count + excluded.txn_count,
+                updated_at = now();
+    end if;
+
+    return null;
+end;
+$$;
+
+create trigger transactions_rollups_insert
+    after insert on finance.transactions
+    referencing new table as new_rows
+    for each statement execute function finance.transactions_rollup_trigger();
+
+create trigger transactions_rollups_update
+    after update on finance.transactions
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function finance.transactions_rollup_trigger();
+
+create trigger transactions_rollups_delete
+    after delete on finance.transactions
+    referencing old table as old_rows
+    for each statement execute function finance.transactions_rollup_trigger();
+
+drop function if exists finance.apply_transaction_rollups(jsonb, integer);
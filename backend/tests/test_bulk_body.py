@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+
+from app.routers.finance.transactions import transactions
+from app.routers.finance.transactions.transactions import BulkTooLargeError, _parse_bulk_body
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def parse(*parts: bytes, content_type: str = "application/json"):
+    return asyncio.run(_parse_bulk_body(chunks(*parts), content_type))
+
+
+def test_json_array():
+    assert parse(b'  [{"a": 1},', b' {"b": 2}]') == ([{"a": 1}, {"b": 2}], {})
+
+
+def test_json_array_with_bom():
+    assert parse("﻿[1]".encode()) == ([1], {})
+
+
+def test_invalid_json_array_is_a_value_error():
+    with pytest.raises(ValueError, match="Invalid JSON array"):
+        parse(b"[1,")
+
+
+def test_ndjson_collects_per_line_errors_in_input_order():
+    items, errors = parse(b'{"a": 1}\n\n{bad\n{"b"', b': 2}\n', content_type="application/x-ndjson")
+
+    assert items == [{"a": 1}, None, {"b": 2}]
+    assert errors == {1: "invalid JSON"}
+
+
+def test_body_without_array_is_read_as_ndjson():
+    assert parse(b'\n{"a": 1}\n{"a": 2}') == ([{"a": 1}, {"a": 2}], {})
+
+
+def test_ndjson_stops_reading_past_the_item_limit(monkeypatch):
+    monkeypatch.setattr(transactions, "BULK_MAX_ITEMS", 3)
+    read = 0
+
+    async def endless():
+        nonlocal read
+        while True:
+            read += 1
+            yield b'{"a": 1}\n'
+
+    with pytest.raises(BulkTooLargeError):
+        asyncio.run(_parse_bulk_body(endless(), "application/x-ndjson"))
+    assert read == 4
+
+
+def test_json_array_past_the_item_limit(monkeypatch):
+    monkeypatch.setattr(transactions, "BULK_MAX_ITEMS", 2)
+    with pytest.raises(BulkTooLargeError):
+        parse(json.dumps([1, 2, 3]).encode())
+
+
+def test_json_array_past_the_byte_limit(monkeypatch):
+    monkeypatch.setattr(transactions, "BULK_MAX_BYTES", 8)
+    with pytest.raises(BulkTooLargeError):
+        parse(b"[1, ", b"2, 3, 4]")
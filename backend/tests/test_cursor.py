@@ -0,0 +1,29 @@
+import pytest
+from fastapi import HTTPException
+
+from app.utils.cursor import decode_cursor, encode_cursor, quote_filter_value
+
+
+def test_cursor_round_trips():
+    state = {"d": "2024-05-01", "i": "4f1c", "q": 1.5, "c": None}
+    cursor = encode_cursor(state)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == state
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"d": "\xff\xfe>>>???"})
+    assert all(ch.isalnum() or ch in "-_" for ch in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor({}).replace("e", "!"), "WzFd"])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_quote_filter_value_escapes_quotes_and_backslashes():
+    assert quote_filter_value('a"b\\c') == '"a\\"b\\\\c"'
+    assert quote_filter_value(12) == '"12"'
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app import dependencies
+from app.dependencies import VerifiedUserCache, _decode_access_token, _user_from_claims, get_current_user
+
+SECRET = "test-secret-" + "x" * 64
+USER_ID = "11111111-1111-1111-1111-111111111111"
+
+
+def make_token(key=SECRET, algorithm="HS256", **overrides) -> str:
+    claims = {
+        "sub": USER_ID,
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": "user@example.com",
+        "iat": int(time.time()),
+        "exp": int(time.time()) + 3600,
+        **overrides,
+    }
+    return jwt.encode(claims, key, algorithm=algorithm)
+
+
+@pytest.fixture(autouse=True)
+def jwt_config(monkeypatch):
+    monkeypatch.setattr(dependencies, "SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setattr(dependencies, "SUPABASE_JWT_AUDIENCE", "authenticated")
+    monkeypatch.setattr(dependencies, "verified_user_cache", VerifiedUserCache(100, 300))
+
+
+def fake_request(get_user=None):
+    calls = []
+
+    async def auth_get_user(token):
+        calls.append(token)
+        return get_user(token)
+
+    supabase = SimpleNamespace(auth=SimpleNamespace(get_user=auth_get_user))
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(supabase=supabase))), calls
+
+
+def current_user(token, request=None):
+    request = request or fake_request()[0]
+    return asyncio.run(get_current_user(request, {"access_token": token, "refresh_token": None}))
+
+
+def test_valid_hs256_token_is_verified_locally():
+    request, calls = fake_request()
+    user = current_user(make_token(), request)
+
+    assert user.id == USER_ID
+    assert user.aud == "authenticated"
+    assert user.email == "user@example.com"
+    assert calls == []
+
+
+@pytest.mark.parametrize("token, detail", [
+    (make_token(exp=int(time.time()) - 10), "token expired"),
+    (make_token(aud="someone-else"), "invalid token"),
+    (make_token(key="a-different-secret-that-is-long-enough"), "invalid token"),
+    (make_token(key=None, algorithm="none"), "unsupported token algorithm"),
+    (make_token(algorithm="HS512"), "unsupported token algorithm"),
+    ("not-a-jwt", "invalid token"),
+])
+def test_rejected_tokens_are_401(token, detail):
+    with pytest.raises(HTTPException) as exc:
+        current_user(token)
+    assert exc.value.status_code == 401
+    assert detail in exc.value.detail
+
+
+def test_missing_sub_is_401():
+    token = jwt.encode({"aud": "authenticated", "exp": int(time.time()) + 60}, SECRET, algorithm="HS256")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_decode_access_token(token))
+    assert exc.value.status_code == 401
+
+
+def test_user_from_claims_handles_list_audience():
+    user = _user_from_claims({"sub": USER_ID, "aud": ["authenticated", "other"], "iat": 0})
+    assert user.aud == "authenticated"
+    assert user.app_metadata == {}
+    assert user.is_anonymous is False
+
+
+def test_cache_ttl_is_capped_at_token_exp(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(dependencies.time, "time", lambda: now)
+    cache = VerifiedUserCache(max_size=10, ttl_seconds=300)
+    user = _user_from_claims({"sub": USER_ID, "aud": "authenticated"})
+
+    cache.put("short", user, token_exp=now + 30)
+    cache.put("long", user, token_exp=now + 3600)
+    assert cache.get("short") is user
+
+    now += 31
+    assert cache.get("short") is None
+    assert cache.get("long") is user
+
+    now += 300
+    assert cache.get("long") is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = VerifiedUserCache(max_size=2, ttl_seconds=300)
+    user = _user_from_claims({"sub": USER_ID, "aud": "authenticated"})
+    cache.put("a", user, None)
+    cache.put("b", user, None)
+    cache.get("a")
+    cache.put("c", user, None)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is user
+
+
+def test_verified_user_is_cached():
+    token = make_token()
+    first = current_user(token)
+    assert current_user(token) is first
+
+
+def test_falls_back_to_auth_get_user_without_a_key(monkeypatch):
+    monkeypatch.setattr(dependencies, "SUPABASE_JWT_SECRET", None)
+    remote_user = _user_from_claims({"sub": USER_ID, "aud": "authenticated"})
+    request, calls = fake_request(lambda token: SimpleNamespace(user=remote_user))
+    token = make_token()
+
+    assert current_user(token, request) is remote_user
+    assert current_user(token, request) is remote_user
+    assert calls == [token]
+
+
+def test_fallback_rejection_is_401(monkeypatch):
+    monkeypatch.setattr(dependencies, "SUPABASE_JWT_SECRET", None)
+    request, _ = fake_request(lambda token: SimpleNamespace(user=None))
+
+    with pytest.raises(HTTPException) as exc:
+        current_user(make_token(), request)
+    assert exc.value.status_code == 401
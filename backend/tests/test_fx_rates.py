@@ -0,0 +1,76 @@
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+from app.utils.external.exchangeRate import fx_rates
+from app.utils.external.exchangeRate.fx_rates import FXRates, FXService
+
+RATES = FXRates({"USD": 1.0, "EUR": 0.5, "GBP": 0.25}, fetched_at=None)
+
+
+async def fake_run_blocking(func, *args):
+    return func(*args)
+
+
+def test_rate_triangulates_through_the_pivot():
+    assert RATES.rate("EUR", "GBP") == 0.5
+    assert RATES.rate("gbp", "usd") == 4.0
+    assert RATES.rate("EUR", "JPY") is None
+
+
+def test_convert_each_amount_from_its_currency():
+    result = RATES.convert([10, 10, 10], ["USD", "eur", "GBP"], "EUR")
+    np.testing.assert_allclose(result, [5.0, 10.0, 20.0])
+
+
+def test_convert_unknown_source_currency_is_nan():
+    result = RATES.convert([1, 2], ["XYZ", "USD"], "USD")
+    assert math.isnan(result[0])
+    assert result[1] == 2.0
+
+
+def test_convert_unknown_target_currency_is_all_nan():
+    assert np.isnan(RATES.convert([1, 2], ["USD", "EUR"], "JPY")).all()
+
+
+def test_matrix_matches_rate():
+    matrix = RATES.matrix()
+    for source in RATES.currencies:
+        for target in RATES.currencies:
+            assert matrix.loc[source, target] == pytest.approx(RATES.rate(source, target))
+
+
+def test_unquoted_currency_is_not_downloaded_again(monkeypatch):
+    downloads = []
+
+    def download(currencies):
+        downloads.append(currencies)
+        return {cur: 2.0 for cur in currencies if cur != "XYZ"} | {"USD": 1.0}
+
+    monkeypatch.setattr(fx_rates, "_download_pivot_rates", download)
+    monkeypatch.setattr(fx_rates, "run_blocking", fake_run_blocking)
+    service = FXService(refresh_seconds=300, negative_ttl=600)
+
+    rates = asyncio.run(service.get_rates(["EUR", "XYZ"]))
+    assert rates.has("EUR") and not rates.has("XYZ")
+    asyncio.run(service.get_rates(["EUR", "XYZ"]))
+    assert downloads == [["EUR", "USD", "XYZ"]]
+    assert service.stats()["unquoted"] == ["XYZ"]
+
+
+def test_unquoted_currency_is_retried_after_the_negative_ttl(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(fx_rates.time, "time", lambda: now)
+    monkeypatch.setattr(fx_rates, "_download_pivot_rates", lambda currencies: {"USD": 1.0})
+    monkeypatch.setattr(fx_rates, "run_blocking", fake_run_blocking)
+    service = FXService(refresh_seconds=3600, negative_ttl=600)
+
+    asyncio.run(service.get_rates(["XYZ"]))
+    monkeypatch.setattr(fx_rates, "_download_pivot_rates", lambda currencies: {"USD": 1.0, "XYZ": 3.0})
+    assert not asyncio.run(service.get_rates(["XYZ"])).has("XYZ")
+
+    now += 601
+    assert asyncio.run(service.get_rates(["XYZ"])).rate("USD", "XYZ") == 3.0
+    assert service.stats()["unquoted"] == []
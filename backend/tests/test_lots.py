@@ -0,0 +1,97 @@
+import pytest
+
+from app.routers.investments.lots import LotBook, open_lots, realize_trades
+from app.routers.investments.positions import DIVISOR
+
+
+def trade(type_, quantity, price, date, fee=0.0, ticker="AAPL"):
+    return {
+        "ticker": ticker,
+        "type": type_,
+        "quantity": quantity,
+        "gross_minor": int(round(quantity * price * DIVISOR)),
+        "fee_minor": int(round(fee * DIVISOR)),
+        "trade_date": date,
+    }
+
+
+def test_fifo_sell_consumes_oldest_lot_first():
+    book = LotBook("fifo")
+    book.buy(10, 1000, "2024-01-01")
+    book.buy(10, 2000, "2024-02-01")
+
+    assert book.sell(15) == (15, 2000)
+    assert book.quantity == 5
+    assert book.cost_minor == 1000
+    assert list(book.lots) == [[5, 1000, "2024-02-01"]]
+
+
+def test_average_pools_every_buy_into_one_lot():
+    book = LotBook("average")
+    book.buy(10, 1000, "2024-01-01")
+    book.buy(10, 2000, "2024-02-01")
+
+    assert book.sell(5) == (5, 750)
+    assert len(book.lots) == 1
+    assert book.quantity == 15
+    assert book.cost_minor == 2250
+
+
+def test_sell_beyond_open_quantity_reports_matched_part():
+    book = LotBook()
+    book.buy(3, 300, None)
+
+    assert book.sell(5) == (3, 300)
+    assert not book.lots
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        LotBook("lifo")
+
+
+def test_realize_trades_fifo_per_year_and_currency():
+    trades = [
+        trade("buy", 10, 100, "2023-01-10", fee=1),
+        trade("buy", 10, 120, "2023-06-10"),
+        trade("sell", 15, 130, "2024-03-01", fee=2),
+        trade("buy", 5, 50, "2024-01-01", ticker="SAP"),
+        trade("sell", 5, 40, "2024-05-01", ticker="SAP"),
+    ]
+
+    sells, totals, books = realize_trades(trades, {"AAPL": "USD", "SAP": "EUR"})
+
+    assert [s["ticker"] for s in sells] == ["AAPL", "SAP"]
+    aapl = sells[0]
+    assert aapl["proceeds"] == 1948.0
+    assert aapl["cost_basis"] == 1601.0
+    assert aapl["realized_pl"] == 347.0
+    assert aapl["unmatched_quantity"] == 0
+    assert totals == {"2024": {"USD": 347.0, "EUR": -50.0}}
+    assert open_lots(books) == {"AAPL": [{"quantity": 5, "cost_basis": 600.0, "date": "2023-06-10"}]}
+
+
+def test_realize_trades_unmatched_sell_earns_no_pl():
+    sells, totals, _ = realize_trades(
+        [trade("buy", 2, 10, "2024-01-01"), trade("sell", 4, 15, "2024-02-01")], {}
+    )
+
+    assert sells[0]["unmatched_quantity"] == 2
+    assert sells[0]["proceeds"] == 30.0
+    assert sells[0]["realized_pl"] == 10.0
+    assert sells[0]["currency"] == "USD"
+    assert totals == {"2024": {"USD": 10.0}}
+
+
+def test_realize_trades_average_matches_pooled_cost():
+    trades = [
+        trade("buy", 10, 100, "2024-01-01"),
+        trade("buy", 10, 200, "2024-01-02"),
+        trade("sell", 10, 150, "2024-01-03"),
+    ]
+
+    fifo, _, _ = realize_trades(trades, {}, method="fifo")
+    average, _, _ = realize_trades(trades, {}, method="average")
+
+    assert fifo[0]["realized_pl"] == 500.0
+    assert average[0]["realized_pl"] == 0.0
@@ -0,0 +1,43 @@
+from datetime import date
+
+from app.routers.finance.summary.rollups import month_start, summarize
+
+ROWS = [
+    {"month": "2024-01-01", "account_id": "a1", "category_id": "food", "type": "EXPENSE", "currency": "EUR", "amount_minor": -500, "txn_count": 2},
+    {"month": "2024-01-01", "account_id": "a2", "category_id": "food", "type": "EXPENSE", "currency": "EUR", "amount_minor": -250, "txn_count": 1},
+    {"month": "2024-01-01", "account_id": "a2", "category_id": "food", "type": "EXPENSE", "currency": "USD", "amount_minor": -100, "txn_count": 1},
+    {"month": "2024-02-01", "account_id": "a1", "category_id": None, "type": "INCOME", "currency": "EUR", "amount_minor": "1000.5", "txn_count": 1},
+]
+
+
+def test_month_start():
+    assert month_start(date(2024, 2, 29)) == date(2024, 2, 1)
+
+
+def test_summarize_by_month_and_category_keeps_currencies_apart():
+    assert summarize(ROWS, ["month", "category"]) == [
+        {"month": "2024-01-01", "category_id": "food", "currency": "EUR", "amount_minor": -750, "count": 3},
+        {"month": "2024-01-01", "category_id": "food", "currency": "USD", "amount_minor": -100, "count": 1},
+        {"month": "2024-02-01", "category_id": None, "currency": "EUR", "amount_minor": 1000.5, "count": 1},
+    ]
+
+
+def test_summarize_without_fields_totals_per_currency():
+    assert summarize(ROWS, []) == [
+        {"currency": "EUR", "amount_minor": 250.5, "count": 4},
+        {"currency": "USD", "amount_minor": -100, "count": 1},
+    ]
+
+
+def test_summarize_by_account_and_type():
+    result = summarize(ROWS, ["account", "type"])
+    assert [(r["account_id"], r["type"], r["currency"], r["count"]) for r in result] == [
+        ("a1", "EXPENSE", "EUR", 2),
+        ("a1", "INCOME", "EUR", 1),
+        ("a2", "EXPENSE", "EUR", 1),
+        ("a2", "EXPENSE", "USD", 1),
+    ]
+
+
+def test_summarize_empty():
+    assert summarize([], ["month"]) == []
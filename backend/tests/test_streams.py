@@ -0,0 +1,28 @@
+import asyncio
+
+from app.utils.streams import iter_lines
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def collect(iterator):
+    async def run():
+        return [item async for item in iterator]
+    return asyncio.run(run())
+
+
+def test_iter_lines_joins_lines_split_across_chunks():
+    body = "ticker,type\r\nAAPL,buy\nSAP,sell".encode()
+    assert collect(iter_lines(chunks(body[:9], body[9:15], body[15:]))) == ["ticker,type", "AAPL,buy", "SAP,sell"]
+
+
+def test_iter_lines_strips_bom_and_decodes_split_characters():
+    body = "﻿café\n".encode()
+    assert collect(iter_lines(chunks(body[:5], body[5:]))) == ["café"]
+
+
+def test_iter_lines_empty_body():
+    assert collect(iter_lines(chunks())) == []
@@ -0,0 +1,114 @@
+import asyncio
+import csv
+from datetime import date
+
+import pytest
+
+from app.routers.investments.positions import DIVISOR
+from app.routers.investments.trade_import import ImportTooLargeError, parse_statement, parse_trade
+
+
+async def lines(*items: str):
+    for item in items:
+        yield item
+
+
+def test_parse_trade_accepts_broker_aliases():
+    row = parse_trade({"Symbol": " aapl ", "Side": "BUY", "Qty": "2", "Unit_Price": "10.5", "Commission": "1", "Date": "2024-03-01T10:00:00"})
+
+    assert row == {
+        "ticker": "AAPL",
+        "type": "buy",
+        "quantity": 2.0,
+        "gross_minor": int(21 * DIVISOR),
+        "fee_minor": int(1 * DIVISOR),
+        "trade_date": "2024-03-01",
+    }
+
+
+def test_parse_trade_defaults_date_to_today():
+    assert parse_trade({"ticker": "X", "type": "sell", "quantity": 1, "price": 1})["trade_date"] == date.today().isoformat()
+
+
+@pytest.mark.parametrize("record, message", [
+    ({"type": "buy", "quantity": 1, "price": 1}, "ticker is required"),
+    ({"ticker": "X", "type": "hold", "quantity": 1, "price": 1}, "type must be"),
+    ({"ticker": "X", "type": "buy", "quantity": "a", "price": 1}, "must be numbers"),
+    ({"ticker": "X", "type": "buy", "quantity": 0, "price": 1}, "quantity must be > 0"),
+    ({"ticker": "X", "type": "buy", "quantity": 1, "price": -1}, ">= 0"),
+    ({"ticker": "X", "type": "buy", "quantity": 1, "price": 1, "date": "01/02/2024"}, "YYYY-MM-DD"),
+    ({"ticker": "X", "type": "buy", "quantity": "inf", "price": 1}, "finite"),
+    ({"ticker": "X", "type": "buy", "quantity": 1, "price": "1e400"}, "finite"),
+    ({"ticker": "X", "type": "buy", "quantity": 1, "price": 1, "fee": "nan"}, "finite"),
+    ({"ticker": "X", "type": "buy", "quantity": 10**400, "price": 1}, "must be numbers"),
+    ({"ticker": "X", "type": "buy", "quantity": 1e200, "price": 1e200}, "too large"),
+])
+def test_parse_trade_rejects_invalid_rows(record, message):
+    with pytest.raises(ValueError, match=message):
+        parse_trade(record)
+
+
+def test_parse_statement_csv_numbers_data_rows_and_skips_blanks():
+    trades, errors = asyncio.run(parse_statement(
+        lines("Ticker,Type,Quantity,Price", "", "AAPL,buy,1,10", "SAP,short,1,10", "MSFT,sell,2,5"),
+        "csv",
+    ))
+
+    assert [(row, trade["ticker"]) for row, trade in trades] == [(1, "AAPL"), (3, "MSFT")]
+    assert errors == [{"row": 2, "error": "type must be 'buy' or 'sell'"}]
+
+
+def test_parse_statement_ndjson_reports_bad_lines():
+    trades, errors = asyncio.run(parse_statement(
+        lines('{"ticker":"AAPL","type":"buy","quantity":1,"price":10}', "{bad", "[1]"),
+        "ndjson",
+    ))
+
+    assert [row for row, _ in trades] == [1]
+    assert errors == [
+        {"row": 2, "error": "invalid JSON"},
+        {"row": 3, "error": "each line must be a JSON object"},
+    ]
+
+
+def test_parse_statement_stops_past_max_rows():
+    with pytest.raises(ImportTooLargeError):
+        asyncio.run(parse_statement(lines("a,b", "1,2", "3,4", "5,6"), "csv", max_rows=2))
+
+
+def test_parse_statement_csv_quoted_field_may_span_lines():
+    trades, errors = asyncio.run(parse_statement(
+        lines("ticker,type,quantity,price,note", 'AAPL,buy,1,10,"first', "", 'second ""quoted"""', "SAP,buy,2,5,"),
+        "csv",
+    ))
+
+    assert [(row, trade["ticker"]) for row, trade in trades] == [(1, "AAPL"), (2, "SAP")]
+    assert errors == []
+
+
+@pytest.fixture
+def small_csv_fields():
+    previous = csv.field_size_limit(20)
+    yield
+    csv.field_size_limit(previous)
+
+
+def test_parse_statement_csv_error_is_reported_per_row(small_csv_fields):
+    trades, errors = asyncio.run(parse_statement(
+        lines("ticker,type,quantity,price,note", 'AAPL,buy,1,10,"' + "x" * 30, "SAP,buy,2,5,"),
+        "csv",
+    ))
+
+    assert [row for row, _ in trades] == [2]
+    assert errors[0]["row"] == 1
+    assert errors[0]["error"].startswith("malformed CSV")
+
+
+def test_parse_statement_ndjson_non_finite_numbers_are_row_errors():
+    trades, errors = asyncio.run(parse_statement(
+        lines('{"ticker":"A","type":"buy","quantity":1e400,"price":1}', '{"ticker":"A","type":"buy","quantity":1,"price":NaN}'),
+        "ndjson",
+    ))
+
+    assert trades == []
+    assert [error["row"] for error in errors] == [1, 2]
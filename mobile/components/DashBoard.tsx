@@ -21,6 +21,7 @@ import { useAuthStore } from "@/utils/authStore";
 import {
   getAccounts,
   getTransactions,
+  getSummary,
   getCategories,
   exportTransactionsToCSV,
 } from "@/utils/db/finance/finance";
@@ -56,6 +57,17 @@ export default function DashBoard() {
   const [transactionsByAccount, setTransactionsByAccount] = useState<
     Record<number, any[]>
   >({});
+  // next_cursor of the last loaded page; null once the history is exhausted
+  const [nextCursorByAccount, setNextCursorByAccount] = useState<
+    Record<number, string | null>
+  >({});
+  const [loadingMoreByAccount, setLoadingMoreByAccount] = useState<
+    Record<number, boolean>
+  >({});
+  // All-time transaction total per account, from the summary rollups
+  const [ledgerTotalByAccount, setLedgerTotalByAccount] = useState<
+    Record<number, number>
+  >({});
   const [subscriptionsByAccount, setSubscriptionsByAccount] = useState<
     Record<number, any[]>
   >({});
@@ -225,15 +237,13 @@ export default function DashBoard() {
         session.refresh_token,
         accountId,
       );
-      const list = (data.rows || data) as any[];
-      const normalized = normalizeTransactions(list);
-      const sorted = normalized.sort((a: any, b: any) => {
-        if (a.date && b.date) return Date.parse(b.date) - Date.parse(a.date);
-        return 0;
-      });
       setTransactionsByAccount((prev) => ({
         ...prev,
-        [accountId]: sorted,
+        [accountId]: normalizeTransactions(data.rows || []),
+      }));
+      setNextCursorByAccount((prev) => ({
+        ...prev,
+        [accountId]: data.next_cursor ?? null,
       }));
     } catch (e: any) {
       console.error(
@@ -245,6 +255,61 @@ export default function DashBoard() {
     }
   };
 
+  const loadMoreTransactions = async (accountId: number) => {
+    const cursor = nextCursorByAccount[accountId];
+    if (!session?.access_token || !cursor || loadingMoreByAccount[accountId])
+      return;
+    try {
+      setLoadingMoreByAccount((prev) => ({ ...prev, [accountId]: true }));
+      const data = await getTransactions(
+        session.access_token,
+        session.refresh_token,
+        accountId,
+        { before: cursor },
+      );
+      // Pages arrive newest first, so the next page appends below the current one
+      setTransactionsByAccount((prev) => ({
+        ...prev,
+        [accountId]: (prev[accountId] || []).concat(
+          normalizeTransactions(data.rows || []),
+        ),
+      }));
+      setNextCursorByAccount((prev) => ({
+        ...prev,
+        [accountId]: data.next_cursor ?? null,
+      }));
+    } catch (e: any) {
+      console.error(
+        "Failed to load more transactions:",
+        e?.message || "Unknown error",
+      );
+    } finally {
+      setLoadingMoreByAccount((prev) => ({ ...prev, [accountId]: false }));
+    }
+  };
+
+  const loadLedgerTotals = async () => {
+    if (!session?.access_token) return;
+    try {
+      const data = await getSummary(
+        session.access_token,
+        session.refresh_token,
+        { groupBy: "account" },
+      );
+      const totals: Record<number, number> = {};
+      for (const row of data.rows || []) {
+        totals[row.account_id] =
+          (totals[row.account_id] || 0) + Number(row.amount_minor || 0);
+      }
+      setLedgerTotalByAccount(totals);
+    } catch (e: any) {
+      console.error(
+        "Failed to load account totals:",
+        e?.message || "Unknown error",
+      );
+    }
+  };
+
   const loadSubscriptionsForAccount = async (accountId: number) => {
     if (!session?.access_token || !accountId) return;
     try {
@@ -273,12 +338,11 @@ export default function DashBoard() {
 
   const computeAccountBalance = (
     accountId: number,
-    txByAcc: Record<number, any[]>,
+    ledgerTotals: Record<number, number>,
     subsByAcc: Record<number, any[]>,
   ) => {
-    const tx = txByAcc[accountId] || [];
     const subs = subsByAcc[accountId] || [];
-    const txTotal = tx.reduce((sum, t) => sum + (t.amount_minor || 0), 0);
+    const txTotal = ledgerTotals[accountId] || 0;
     const subsTotal = subs
       .filter((s) => s.active)
       .reduce((sum, s) => sum + (s.amount_minor || 0), 0);
@@ -289,6 +353,7 @@ export default function DashBoard() {
     const init = async () => {
       await loadCategories();
       const accs = await loadAccounts();
+      await loadLedgerTotals();
       if (accs.length > 0) {
         setAccountIndex(0);
         const firstId = accs[0].id;
@@ -315,6 +380,7 @@ export default function DashBoard() {
 
   const handleTransactionAdded = async () => {
     const accId = accounts[accountIndex]?.id;
+    await loadLedgerTotals();
     if (accId) await loadTransactionsForAccount(accId);
   };
 
@@ -325,6 +391,7 @@ export default function DashBoard() {
 
   const handleAccountAdded = async () => {
     const result = await loadAccounts();
+    await loadLedgerTotals();
     if (result.length > 0) {
       setAccountIndex(0);
       const id = result[0].id;
@@ -345,6 +412,7 @@ export default function DashBoard() {
       await loadCategories();
       const accs = await loadAccounts();
       const accId = accs[accountIndex]?.id;
+      await loadLedgerTotals();
       if (accId) {
         await Promise.all([
           loadTransactionsForAccount(accId, accs[accountIndex]),
@@ -391,13 +459,13 @@ export default function DashBoard() {
               ...acc,
               balance_minor: computeAccountBalance(
                 selectedAccountId,
-                transactionsByAccount,
+                ledgerTotalByAccount,
                 subscriptionsByAccount,
               ),
             },
       ),
     );
-  }, [selectedAccountId, transactionsByAccount, subscriptionsByAccount]);
+  }, [selectedAccountId, ledgerTotalByAccount, subscriptionsByAccount]);
 
   // ── Build combined list ──────────────────────────────────────────────
   const combinedRaw = filteredTransactions
@@ -601,10 +669,22 @@ export default function DashBoard() {
               ))}
             </ScrollView>
 
-            {/* Transaction list */}
+            {/* Transaction list; the next page loads near the bottom */}
             <ScrollView
               style={{ maxHeight: maxListHeight }}
               showsVerticalScrollIndicator={false}
+              scrollEventThrottle={200}
+              onScroll={({ nativeEvent }) => {
+                const { layoutMeasurement, contentOffset, contentSize } =
+                  nativeEvent;
+                if (
+                  selectedAccountId &&
+                  layoutMeasurement.height + contentOffset.y >=
+                    contentSize.height - 200
+                ) {
+                  loadMoreTransactions(selectedAccountId);
+                }
+              }}
             >
               <View className="gap-5 pb-5">
                 {isLoadingSelectedAccount ? (
@@ -683,6 +763,10 @@ export default function DashBoard() {
                     </View>
                   ))
                 )}
+                {!!selectedAccountId &&
+                  loadingMoreByAccount[selectedAccountId] && (
+                    <Skeleton mode="light" className="h-5 w-44" animated />
+                  )}
               </View>
             </ScrollView>
           </View>
@@ -8,7 +8,7 @@ import {
   Platform,
 } from "react-native";
 import React, { useCallback, useEffect, useRef, useState } from "react";
-import { getInvestments } from "@/utils/db/invest/invest";
+import { getInvestmentTrades, getInvestments } from "@/utils/db/invest/invest";
 import { useAuthStore } from "@/utils/authStore";
 import StockModal from "@/components/modals/StockModal";
 import SearchInvestmentsModal from "@/components/modals/SearchInvestmentsModal";
@@ -153,6 +153,24 @@ export function InvestmentView() {
     reloadPositions();
   }, [reloadPositions]);
 
+  // The portfolio call carries no trade history; the chart pages through it per ticker.
+  const loadTrades = async (ticker: string) => {
+    if (!session?.access_token) return [];
+    const items: any[] = [];
+    let cursor: string | null = null;
+    do {
+      const page = await getInvestmentTrades(
+        session.access_token,
+        session.refresh_token,
+        ticker,
+        cursor,
+      );
+      items.push(...(page?.items || []));
+      cursor = page?.next_cursor ?? null;
+    } while (cursor);
+    return items;
+  };
+
   useEffect(() => {
     let active = true;
     const buildCombinedHistory = async () => {
@@ -167,6 +185,31 @@ export function InvestmentView() {
           new Set((positions || []).map((p: any) => p?.ticker)),
         );
 
+        // Fetch each ticker's trades and price history together
+        type HistoryResp = Record<TimeframeKey, Point[]>;
+        const tradesByTicker: Record<string, any[]> = {};
+        const historyByTicker: Record<string, HistoryResp> = {};
+        await Promise.all(
+          uniqueTickers.flatMap((ticker) => [
+            loadTrades(ticker)
+              .then((items) => {
+                tradesByTicker[ticker] = items;
+              })
+              .catch((e) => {
+                console.error(`Trades fetch failed for ${ticker}:`, e);
+              }),
+            (async () => {
+              try {
+                const res = await fetch(`${API_BASE}/stock/${ticker}/history`);
+                if (!res.ok) return;
+                historyByTicker[ticker] = (await res.json()) as HistoryResp;
+              } catch (e) {
+                console.error(`History fetch failed for ${ticker}:`, e);
+              }
+            })(),
+          ]),
+        );
+
         // Build trade events per ticker: sorted list of { tsMs, runningQty, costBasis }
         const tradeInfoByTicker: Record<
           string,
@@ -178,7 +221,7 @@ export function InvestmentView() {
 
         for (const p of positions) {
           const ticker = p?.ticker;
-          const ds: any[] = p?.dates || [];
+          const ds: any[] = tradesByTicker[ticker] || [];
           const events = ds
             .filter((d: any) => d?.date)
             .map((d: any) => {
@@ -224,21 +267,6 @@ export function InvestmentView() {
           return total;
         };
 
-        // Fetch stock price history for each ticker
-        type HistoryResp = Record<TimeframeKey, Point[]>;
-        const historyByTicker: Record<string, HistoryResp> = {};
-        await Promise.all(
-          uniqueTickers.map(async (ticker) => {
-            try {
-              const res = await fetch(`${API_BASE}/stock/${ticker}/history`);
-              if (!res.ok) return;
-              historyByTicker[ticker] = (await res.json()) as HistoryResp;
-            } catch (e) {
-              console.error(`History fetch failed for ${ticker}:`, e);
-            }
-          }),
-        );
-
         const tfs: TimeframeKey[] = ["1D", "1W", "1M", "1Y", "ALL"];
         const combined: HistoryMap = {
           "1D": [],
@@ -1,7 +1,13 @@
 import { View, ScrollView, Text, TouchableOpacity } from "react-native";
 import { useAuthStore } from "@/utils/authStore";
-import { useEffect, useMemo, useState } from "react";
-import { getTransactions } from "@/utils/db/finance/finance";
+import { useEffect, useMemo, useRef, useState } from "react";
+import {
+  accountFlowTotals,
+  getSummary,
+  getTransactions,
+  summaryDateRange,
+  toDateParam,
+} from "@/utils/db/finance/finance";
 
 import SpendingChart from "@/components/analysis/SpendingChart";
 import { Skeleton } from "@/components/ui/skeleton";
@@ -103,28 +109,81 @@ export default function Expenses({ account }: Props) {
     return code;
   };
 
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [summaryTotal, setSummaryTotal] = useState(0);
+  const [summaryRange, setSummaryRange] = useState<{
+    start: Date;
+    end: Date;
+  } | null>(null);
+  const viewportHeight = useRef(0);
+  const contentHeight = useRef(0);
+
+  // The list is paged from the server; the chart total comes from the summary rollups.
   const loadTransactions = async () => {
     if (!session?.access_token || !account) return;
     try {
       setIsLoading(true);
 
+      const from = toDateParam(dateRange.start);
+      const to = toDateParam(dateRange.end);
+      const [data, summary] = await Promise.all([
+        getTransactions(session.access_token, session.refresh_token, account, {
+          from,
+          to,
+        }),
+        getSummary(session.access_token, session.refresh_token, {
+          from,
+          to,
+          groupBy: "account,type",
+        }),
+      ]);
+      const normalized = normalizeTransactions(data.rows);
+      setExpenses(normalized.filter((t: any) => t.amount_minor < 0));
+      setNextCursor(data.next_cursor ?? null);
+      setSummaryTotal(accountFlowTotals(summary.rows, account).expenses);
+      setSummaryRange(summaryDateRange(summary));
+    } catch (e: any) {
+      console.error("Failed to load expenses:", e?.message || "Unknown error");
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
+  const loadMoreTransactions = async () => {
+    if (
+      !session?.access_token ||
+      !account ||
+      !nextCursor ||
+      isLoading ||
+      isLoadingMore
+    )
+      return;
+    try {
+      setIsLoadingMore(true);
+
       const data = await getTransactions(
         session.access_token,
         session.refresh_token,
         account,
+        {
+          before: nextCursor,
+          from: toDateParam(dateRange.start),
+          to: toDateParam(dateRange.end),
+        },
+      );
+      const normalized = normalizeTransactions(data.rows);
+      setExpenses((prev) =>
+        prev.concat(normalized.filter((t: any) => t.amount_minor < 0)),
       );
-      const list = (data.rows || data) as any[];
-      const normalized = normalizeTransactions(list);
-      const sorted = normalized.sort((a: any, b: any) => {
-        if (a.date && b.date) return Date.parse(b.date) - Date.parse(a.date);
-        return 0;
-      });
-      const filtered = sorted.filter((t: any) => t.amount_minor < 0);
-      setExpenses(filtered);
+      setNextCursor(data.next_cursor ?? null);
     } catch (e: any) {
-      console.error("Failed to load expenses:", e?.message || "Unknown error");
+      console.error(
+        "Failed to load more expenses:",
+        e?.message || "Unknown error",
+      );
     } finally {
-      setIsLoading(false);
+      setIsLoadingMore(false);
     }
   };
 
@@ -132,35 +191,38 @@ export default function Expenses({ account }: Props) {
     if (account) {
       loadTransactions();
     }
-  }, [account, session?.access_token]);
+  }, [account, session?.access_token, dateRange.start, dateRange.end]);
+
+  // Keep paging while the filtered list is too short to scroll
+  const fillViewport = () => {
+    if (
+      viewportHeight.current > 0 &&
+      contentHeight.current <= viewportHeight.current
+    ) {
+      loadMoreTransactions();
+    }
+  };
+
+  useEffect(() => {
+    if (nextCursor) fillViewport();
+  }, [nextCursor]);
 
+  // The server already applied the date range
   const monthlyExpenses = useMemo(() => {
+    if (!amountRange) return expenses;
     return expenses.filter((tx: any) => {
-      if (!tx.date) return false;
-      const txDate = new Date(tx.date);
       const amount = Math.abs(tx.amount_minor) / 100;
-
-      const dateMatch = txDate >= dateRange.start && txDate <= dateRange.end;
-      const amountMatch = amountRange
-        ? amount >= amountRange.min && amount <= amountRange.max
-        : true;
-
-      return dateMatch && amountMatch;
+      return amount >= amountRange.min && amount <= amountRange.max;
     });
-  }, [expenses, dateRange.start, dateRange.end, amountRange]);
+  }, [expenses, amountRange]);
 
-  const rangeLabel = useMemo(
-    () => formatRangeLabel(dateRange.start, dateRange.end),
-    [dateRange.start, dateRange.end],
-  );
+  // Rollups are monthly, so the chart covers the whole months around the range
+  const rangeLabel = useMemo(() => {
+    const range = summaryRange ?? dateRange;
+    return formatRangeLabel(range.start, range.end);
+  }, [summaryRange, dateRange.start, dateRange.end]);
 
-  const totalExpensesAmount = useMemo(() => {
-    const txTotal = monthlyExpenses.reduce(
-      (sum: number, tx: any) => sum + Math.abs(tx.amount_minor),
-      0,
-    );
-    return txTotal;
-  }, [monthlyExpenses]);
+  const totalExpensesAmount = summaryTotal;
 
   const combinedExpenses = monthlyExpenses;
 
@@ -179,6 +241,23 @@ export default function Expenses({ account }: Props) {
     <ScrollView
       className="flex-1 bg-white"
       showsVerticalScrollIndicator={false}
+      scrollEventThrottle={200}
+      onLayout={(e) => {
+        viewportHeight.current = e.nativeEvent.layout.height;
+      }}
+      onContentSizeChange={(_, height) => {
+        contentHeight.current = height;
+        fillViewport();
+      }}
+      onScroll={({ nativeEvent }) => {
+        const { layoutMeasurement, contentOffset, contentSize } = nativeEvent;
+        if (
+          layoutMeasurement.height + contentOffset.y >=
+          contentSize.height - 200
+        ) {
+          loadMoreTransactions();
+        }
+      }}
     >
       <View className="px-4 py-6">
         <View className="mb-6 flex items-center">
@@ -258,6 +337,9 @@ export default function Expenses({ account }: Props) {
               ))}
             </View>
           )}
+          {isLoadingMore && (
+            <Skeleton mode="light" className="h-5 w-44 mt-4" animated />
+          )}
         </View>
       </View>
       <FilterModal
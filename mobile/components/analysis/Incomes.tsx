@@ -1,7 +1,13 @@
 import { View, Text, ScrollView, TouchableOpacity } from "react-native";
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 import { useAuthStore } from "@/utils/authStore";
-import { getTransactions } from "@/utils/db/finance/finance";
+import {
+  accountFlowTotals,
+  getSummary,
+  getTransactions,
+  summaryDateRange,
+  toDateParam,
+} from "@/utils/db/finance/finance";
 import SpendingChart from "@/components/analysis/SpendingChart";
 import { Skeleton } from "@/components/ui/skeleton";
 import { Feather } from "@expo/vector-icons";
@@ -100,27 +106,81 @@ export default function Incomes({ account }: Props) {
     return code;
   };
 
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [summaryTotal, setSummaryTotal] = useState(0);
+  const [summaryRange, setSummaryRange] = useState<{
+    start: Date;
+    end: Date;
+  } | null>(null);
+  const viewportHeight = useRef(0);
+  const contentHeight = useRef(0);
+
+  // The list is paged from the server; the chart total comes from the summary rollups.
   const loadTransactions = async () => {
     if (!session?.access_token || !account) return;
     try {
       setIsLoading(true);
+
+      const from = toDateParam(dateRange.start);
+      const to = toDateParam(dateRange.end);
+      const [data, summary] = await Promise.all([
+        getTransactions(session.access_token, session.refresh_token, account, {
+          from,
+          to,
+        }),
+        getSummary(session.access_token, session.refresh_token, {
+          from,
+          to,
+          groupBy: "account,type",
+        }),
+      ]);
+      const normalized = normalizeTransactions(data.rows);
+      setIncomes(normalized.filter((t: any) => t.amount_minor > 0));
+      setNextCursor(data.next_cursor ?? null);
+      setSummaryTotal(accountFlowTotals(summary.rows, account).income);
+      setSummaryRange(summaryDateRange(summary));
+    } catch (e: any) {
+      console.error("Failed to load incomes:", e?.message || "Unknown error");
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
+  const loadMoreTransactions = async () => {
+    if (
+      !session?.access_token ||
+      !account ||
+      !nextCursor ||
+      isLoading ||
+      isLoadingMore
+    )
+      return;
+    try {
+      setIsLoadingMore(true);
+
       const data = await getTransactions(
         session.access_token,
         session.refresh_token,
         account,
+        {
+          before: nextCursor,
+          from: toDateParam(dateRange.start),
+          to: toDateParam(dateRange.end),
+        },
+      );
+      const normalized = normalizeTransactions(data.rows);
+      setIncomes((prev) =>
+        prev.concat(normalized.filter((t: any) => t.amount_minor > 0)),
       );
-      const list = (data.rows || data) as any[];
-      const normalized = normalizeTransactions(list);
-      const sorted = normalized.sort((a: any, b: any) => {
-        if (a.date && b.date) return Date.parse(b.date) - Date.parse(a.date);
-        return 0;
-      });
-      const filtered = sorted.filter((t: any) => t.amount_minor > 0);
-      setIncomes(filtered);
+      setNextCursor(data.next_cursor ?? null);
     } catch (e: any) {
-      console.error("Failed to load incomes:", e?.message || "Unknown error");
+      console.error(
+        "Failed to load more incomes:",
+        e?.message || "Unknown error",
+      );
     } finally {
-      setIsLoading(false);
+      setIsLoadingMore(false);
     }
   };
 
@@ -128,34 +188,38 @@ export default function Incomes({ account }: Props) {
     if (account) {
       loadTransactions();
     }
-  }, [account, session?.access_token]);
+  }, [account, session?.access_token, dateRange.start, dateRange.end]);
+
+  // Keep paging while the filtered list is too short to scroll
+  const fillViewport = () => {
+    if (
+      viewportHeight.current > 0 &&
+      contentHeight.current <= viewportHeight.current
+    ) {
+      loadMoreTransactions();
+    }
+  };
+
+  useEffect(() => {
+    if (nextCursor) fillViewport();
+  }, [nextCursor]);
 
+  // The server already applied the date range
   const monthlyIncomes = useMemo(() => {
+    if (!amountRange) return incomes;
     return incomes.filter((tx: any) => {
-      if (!tx.date) return false;
-      const txDate = new Date(tx.date);
       const amount = tx.amount_minor / 100;
-
-      const dateMatch = txDate >= dateRange.start && txDate <= dateRange.end;
-      const amountMatch = amountRange
-        ? amount >= amountRange.min && amount <= amountRange.max
-        : true;
-
-      return dateMatch && amountMatch;
+      return amount >= amountRange.min && amount <= amountRange.max;
     });
-  }, [incomes, dateRange.start, dateRange.end, amountRange]);
+  }, [incomes, amountRange]);
 
-  const rangeLabel = useMemo(
-    () => formatRangeLabel(dateRange.start, dateRange.end),
-    [dateRange.start, dateRange.end],
-  );
+  // Rollups are monthly, so the chart covers the whole months around the range
+  const rangeLabel = useMemo(() => {
+    const range = summaryRange ?? dateRange;
+    return formatRangeLabel(range.start, range.end);
+  }, [summaryRange, dateRange.start, dateRange.end]);
 
-  const totalIncome = useMemo(() => {
-    return monthlyIncomes.reduce(
-      (sum: number, tx: any) => sum + tx.amount_minor,
-      0,
-    );
-  }, [monthlyIncomes]);
+  const totalIncome = summaryTotal;
 
   const currency = monthlyIncomes[0]?.currency || "EUR";
   const currencySymbol = getCurrencySymbol(currency);
@@ -172,6 +236,23 @@ export default function Incomes({ account }: Props) {
     <ScrollView
       className="flex-1 bg-white"
       showsVerticalScrollIndicator={false}
+      scrollEventThrottle={200}
+      onLayout={(e) => {
+        viewportHeight.current = e.nativeEvent.layout.height;
+      }}
+      onContentSizeChange={(_, height) => {
+        contentHeight.current = height;
+        fillViewport();
+      }}
+      onScroll={({ nativeEvent }) => {
+        const { layoutMeasurement, contentOffset, contentSize } = nativeEvent;
+        if (
+          layoutMeasurement.height + contentOffset.y >=
+          contentSize.height - 200
+        ) {
+          loadMoreTransactions();
+        }
+      }}
     >
       <View className="px-4 py-6">
         <View className="mb-6 flex items-center">
@@ -251,6 +332,9 @@ export default function Incomes({ account }: Props) {
               ))}
             </View>
           )}
+          {isLoadingMore && (
+            <Skeleton mode="light" className="h-5 w-44 mt-4" animated />
+          )}
         </View>
       </View>
       <FilterModal
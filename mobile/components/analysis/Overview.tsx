@@ -1,6 +1,12 @@
 import { View, Text, ScrollView, TouchableOpacity } from "react-native";
 import { useEffect, useMemo, useState } from "react";
-import { getTransactions } from "@/utils/db/finance/finance";
+import {
+  accountFlowTotals,
+  getSummary,
+  getTransactions,
+  summaryDateRange,
+  toDateParam,
+} from "@/utils/db/finance/finance";
 
 import { useAuthStore } from "@/utils/authStore";
 import { getData } from "@/utils/db/connect_accounts/connectAccounts";
@@ -52,6 +58,15 @@ const normalizeTransactions = (list?: any[]) => {
 export default function Overview({ account, accounts }: Props) {
   const { session } = useAuthStore();
   const [transactions, setTransactions] = useState<any[]>([]);
+  // Totals from the summary rollups; null for connected accounts, which are summed locally
+  const [flowTotals, setFlowTotals] = useState<{
+    income: number;
+    expenses: number;
+  } | null>(null);
+  const [summaryRange, setSummaryRange] = useState<{
+    start: Date;
+    end: Date;
+  } | null>(null);
 
   const [isLoading, setIsLoading] = useState(false);
   const [connectBalance, setConnectBalance] = useState<number | null>(null);
@@ -114,24 +129,31 @@ export default function Overview({ account, accounts }: Props) {
           return 0;
         });
         setTransactions(sorted);
+        setFlowTotals(null);
+        setSummaryRange(null);
         setConnectBalance(availableCents);
         return;
       }
 
-      const data = await getTransactions(
-        session.access_token,
-        session.refresh_token,
-        accountId,
-      );
+      // Only the first page is needed for the recent list; totals come from the summary
+      const from = toDateParam(dateRange.start);
+      const to = toDateParam(dateRange.end);
+      const [data, summary] = await Promise.all([
+        getTransactions(session.access_token, session.refresh_token, accountId, {
+          from,
+          to,
+        }),
+        getSummary(session.access_token, session.refresh_token, {
+          from,
+          to,
+          groupBy: "account,type",
+        }),
+      ]);
       console.log(data);
 
-      const list = (data.rows || data) as any[];
-      const normalized = normalizeTransactions(list);
-      const sorted = normalized.sort((a: any, b: any) => {
-        if (a.date && b.date) return Date.parse(b.date) - Date.parse(a.date);
-        return 0;
-      });
-      setTransactions(sorted);
+      setTransactions(normalizeTransactions(data.rows));
+      setFlowTotals(accountFlowTotals(summary.rows, accountId));
+      setSummaryRange(summaryDateRange(summary));
     } catch (e: any) {
       console.error(
         "Failed to load transactions:",
@@ -146,33 +168,46 @@ export default function Overview({ account, accounts }: Props) {
     if (account) {
       loadTransactions(account);
     }
-  }, [account, session?.access_token, accounts, connectBalance]);
+  }, [
+    account,
+    session?.access_token,
+    accounts,
+    connectBalance,
+    dateRange.start,
+    dateRange.end,
+  ]);
 
   const filteredTransactions = useMemo(() => {
     console.log("In filtered transactions");
     console.log(transactions);
     console.log(dateRange);
     return transactions.filter((tx: any) => {
-      if (!tx.date) return false;
-      const txDate = new Date(tx.date);
       const amount = Math.abs(tx.amount_minor || 0) / 100;
 
-      const dateMatch = txDate >= dateRange.start && txDate <= dateRange.end;
+      // Pages from the API are already limited to the date range
+      const txDate = tx.date ? new Date(tx.date) : null;
+      const dateMatch = flowTotals
+        ? true
+        : !!txDate && txDate >= dateRange.start && txDate <= dateRange.end;
       const amountMatch = amountRange
         ? amount >= amountRange.min && amount <= amountRange.max
         : true;
 
       return dateMatch && amountMatch;
     });
-  }, [transactions, dateRange.start, dateRange.end, amountRange]);
+  }, [transactions, flowTotals, dateRange.start, dateRange.end, amountRange]);
 
-  const monthlyIncome = filteredTransactions
-    .filter((tx: any) => tx.amount_minor > 0)
-    .reduce((sum: number, tx: any) => sum + tx.amount_minor, 0);
+  const monthlyIncome =
+    flowTotals?.income ??
+    filteredTransactions
+      .filter((tx: any) => tx.amount_minor > 0)
+      .reduce((sum: number, tx: any) => sum + tx.amount_minor, 0);
 
-  const monthlyExpenses = filteredTransactions
-    .filter((tx: any) => tx.amount_minor < 0)
-    .reduce((sum: number, tx: any) => sum + Math.abs(tx.amount_minor), 0);
+  const monthlyExpenses =
+    flowTotals?.expenses ??
+    filteredTransactions
+      .filter((tx: any) => tx.amount_minor < 0)
+      .reduce((sum: number, tx: any) => sum + Math.abs(tx.amount_minor), 0);
 
   const totalExpenses = monthlyExpenses;
   const netIncome = monthlyIncome - totalExpenses;
@@ -199,8 +234,10 @@ export default function Overview({ account, accounts }: Props) {
     return `${day}. ${monthNames[date.getMonth()]}`;
   };
 
-  const rangeLabel = `${formatDate(dateRange.start)} - ${formatDate(
-    dateRange.end,
+  // Rollups are monthly, so summary totals cover the whole months around the range
+  const chartRange = summaryRange ?? dateRange;
+  const rangeLabel = `${formatDate(chartRange.start)} - ${formatDate(
+    chartRange.end,
   )}.`;
 
   const getCurrencySymbol = (code?: string) =>
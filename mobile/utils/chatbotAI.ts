@@ -280,6 +280,7 @@ async function executeTool(
         return JSON.stringify({
           transactions: transactions.slice(0, 15),
           total: transactions.length,
+          has_more: !!txData.next_cursor,
         });
       }
 
@@ -340,6 +341,7 @@ async function executeTool(
           return JSON.stringify({ error: errData.detail || "Update failed" });
         }
         invalidateCache(`/finance/transactions/${accountId}`);
+        invalidateCache("/finance/summary/");
         return JSON.stringify({ success: true, id: args.transaction_id });
       }
 
@@ -358,6 +360,7 @@ async function executeTool(
           return JSON.stringify({ error: errData.detail || "Delete failed" });
         }
         invalidateCache(`/finance/transactions/${accountId}`);
+        invalidateCache("/finance/summary/");
         return JSON.stringify({ success: true, id: args.transaction_id });
       }
 
@@ -279,6 +279,7 @@ async function handleUpdate(
     }
 
     invalidateCache(`/finance/transactions/${accountId}`);
+    invalidateCache("/finance/summary/");
     return {
       success: true,
       message: `✅ Transaction #${cmd.id} updated successfully.`,
@@ -318,6 +319,7 @@ async function handleDelete(
     }
 
     invalidateCache(`/finance/transactions/${accountId}`);
+    invalidateCache("/finance/summary/");
     return {
       success: true,
       message: `✅ Transaction #${cmd.id} has been deleted.`,
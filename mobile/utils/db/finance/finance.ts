@@ -30,29 +30,41 @@ export const getAccounts = async (accessToken, refreshToken) => {
   );
 };
 
+type TransactionPageOptions = {
+  before?: string | null;
+  from?: string | null;
+  to?: string | null;
+  limit?: number;
+};
+
+// One page per call; pass the previous page's next_cursor as `before` to get the next.
 export const getTransactions = async (
   accessToken,
   refreshToken,
   account_id,
+  { before, from, to, limit = 50 }: TransactionPageOptions = {},
 ) => {
   if (!accessToken) {
     throw new Error("Missing access token");
   }
 
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (before) params.set("before", before);
+  if (from) params.set("from", from);
+  if (to) params.set("to", to);
+  const url = `${BASE_URL}/finance/transactions/${account_id}?${params}`;
+
   return cachedFetch(
-    `${BASE_URL}/finance/transactions/${account_id}`,
+    url,
     async () => {
-      const res = await fetch(
-        `${BASE_URL}/finance/transactions/${account_id}`,
-        {
-          method: "GET",
-          headers: {
-            "Content-Type": "application/json",
-            Authorization: `Bearer ${accessToken}`,
-            "x-refresh-token": refreshToken,
-          },
+      const res = await fetch(url, {
+        method: "GET",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${accessToken}`,
+          "x-refresh-token": refreshToken,
         },
-      );
+      });
 
       if (!res.ok) {
         const error = await res.json().catch(() => ({}));
@@ -61,10 +73,87 @@ export const getTransactions = async (
 
       return res.json();
     },
-    { account_id, accessToken },
+    { accessToken },
   );
 };
 
+// Totals from the server-side monthly rollups; `from`/`to` are widened to whole months.
+export const getSummary = async (
+  accessToken: string,
+  refreshToken: string,
+  {
+    from,
+    to,
+    groupBy = "month,category",
+  }: { from?: string | null; to?: string | null; groupBy?: string } = {},
+) => {
+  if (!accessToken) {
+    throw new Error("Missing access token");
+  }
+
+  const params = new URLSearchParams({ group_by: groupBy });
+  if (from) params.set("from", from);
+  if (to) params.set("to", to);
+  const url = `${BASE_URL}/finance/summary/?${params}`;
+
+  return cachedFetch(
+    url,
+    async () => {
+      const res = await fetch(url, {
+        method: "GET",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${accessToken}`,
+          "x-refresh-token": refreshToken,
+        },
+      });
+
+      if (!res.ok) {
+        const error = await res.json().catch(() => ({}));
+        throw new Error(error.detail || "Failed to fetch summary");
+      }
+
+      return res.json();
+    },
+    { accessToken },
+  );
+};
+
+// YYYY-MM-DD in local time, as the transactions and summary filters expect.
+export const toDateParam = (date: Date) => {
+  const month = String(date.getMonth() + 1).padStart(2, "0");
+  const day = String(date.getDate()).padStart(2, "0");
+  return `${date.getFullYear()}-${month}-${day}`;
+};
+
+// First and last day covered by a summary response (its months are whole months).
+export const summaryDateRange = (summary: any) => {
+  if (!summary?.from || !summary?.to) return null;
+  const [fromYear, fromMonth] = summary.from.split("-").map(Number);
+  const [toYear, toMonth] = summary.to.split("-").map(Number);
+  return {
+    start: new Date(fromYear, fromMonth - 1, 1),
+    end: new Date(toYear, toMonth, 0),
+  };
+};
+
+// Income and expense totals (positive minor units) for one account, from summary
+// rows grouped by at least account and type.
+export const accountFlowTotals = (
+  rows: any[] | undefined,
+  account_id: string | number,
+) => {
+  let income = 0;
+  let expenses = 0;
+  for (const row of rows || []) {
+    if (String(row.account_id) !== String(account_id)) continue;
+    const amount = Number(row.amount_minor || 0);
+    if (row.type === "EXPENSE") expenses += Math.abs(amount);
+    else if (row.type === "INCOME") income += amount;
+  }
+  return { income, expenses };
+};
+
 export const addTransaction = async (
   accessToken,
   refreshToken,
@@ -101,6 +190,7 @@ export const addTransaction = async (
   const result = await res.json();
 
   invalidateCache(`/finance/transactions/${account_id}`);
+  invalidateCache("/finance/summary/");
 
   return result;
 };
@@ -30,6 +30,45 @@ export const getInvestments = async (accessToken, refreshToken) => {
   );
 };
 
+// One page of a ticker's trade snapshots, oldest first; pass next_cursor to continue.
+export const getInvestmentTrades = async (
+  accessToken: string,
+  refreshToken: string,
+  ticker: string,
+  cursor?: string | null,
+  limit = 500,
+) => {
+  if (!accessToken) {
+    throw new Error("Missing access token");
+  }
+
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) params.set("cursor", cursor);
+  const url = `${BASE_URL}/investments/${encodeURIComponent(ticker)}/trades?${params}`;
+
+  return cachedFetch(
+    url,
+    async () => {
+      const res = await fetch(url, {
+        method: "GET",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${accessToken}`,
+          "x-refresh-token": refreshToken,
+        },
+      });
+
+      if (!res.ok) {
+        const error = await res.json().catch(() => ({}));
+        throw new Error(error.detail || "Failed to fetch trades");
+      }
+
+      return res.json();
+    },
+    { accessToken },
+  );
+};
+
 export const sellInvestment = async (
   accessToken: string,
   refreshToken: string,